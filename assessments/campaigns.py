@@ -0,0 +1,168 @@
+"""
+Bulk assignment of one Template to many vendors.
+
+A campaign selects vendors with a stored filter (tier, status, ids) and
+creates their Assessment rows with bulk_create, one chunk per transaction,
+together with the chunk's audit entries and dashboard counter update.
+Small campaigns run inside the request; larger ones run on a background
+thread and report progress through AssessmentCampaign.processed / total.
+
+Runs are idempotent: each campaign assigns a vendor at most once
+(assessment_campaign_vendor_uniq), so a retried or resumed campaign only
+creates the assignments that are still missing. Campaigns interrupted by a
+restart are picked up again by ``manage.py resume_assessment_campaigns``.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from audit.services import log_events
+from dashboard import counters
+from vendors.models import Vendor
+from .models import Assessment, AssessmentCampaign
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "CHUNK_SIZE": 500,
+    "INLINE_LIMIT": 200,  # campaigns up to this many vendors finish inside the request
+}
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "ASSESSMENT_CAMPAIGNS", {}))
+    return config
+
+
+def vendor_queryset(campaign):
+    """Vendors of the campaign's org matching its vendor_filter"""
+    qs = Vendor.objects.filter(org_id=campaign.org_id)
+    vendor_filter = campaign.vendor_filter or {}
+    if vendor_filter.get("tier"):
+        qs = qs.filter(tier__in=vendor_filter["tier"])
+    if vendor_filter.get("status"):
+        qs = qs.filter(status__in=vendor_filter["status"])
+    if vendor_filter.get("ids"):
+        qs = qs.filter(pk__in=vendor_filter["ids"])
+    return qs
+
+
+def _claim(campaign_id, statuses):
+    """Conditionally move a campaign to running; False if another runner has it"""
+    return AssessmentCampaign.objects.filter(pk=campaign_id, status__in=statuses).update(
+        status=AssessmentCampaign.STATUS_RUNNING, started_at=timezone.now(), error=""
+    ) == 1
+
+
+def _assign_chunk(campaign, vendor_ids, question_count):
+    """Create the missing assessments for one chunk of vendors; returns how many were created"""
+    with transaction.atomic():
+        done = set(
+            Assessment.objects.filter(campaign=campaign, vendor_id__in=vendor_ids)
+            .values_list("vendor_id", flat=True)
+        )
+        missing = [vendor_id for vendor_id in vendor_ids if vendor_id not in done]
+        if missing:
+            Assessment.objects.bulk_create(
+                [
+                    Assessment(org_id=campaign.org_id, vendor_id=vendor_id, template_id=campaign.template_id,
+                               campaign=campaign, question_count=question_count)
+                    for vendor_id in missing
+                ],
+                ignore_conflicts=True,
+            )
+            created = list(
+                Assessment.objects.filter(campaign=campaign, vendor_id__in=missing)
+                .values_list("pk", "vendor_id")
+            )
+            counters.apply(campaign.org_id, {
+                counters.counter_key("assessments.status", Assessment.STATUS_ASSIGNED): len(created),
+            })
+            log_events(campaign.created_by, [
+                ("create_assessment", pk, {
+                    "vendor_id": vendor_id,
+                    "template_id": campaign.template_id,
+                    "status": Assessment.STATUS_ASSIGNED,
+                    "org_id": campaign.org_id,
+                    "campaign_id": campaign.id,
+                })
+                for pk, vendor_id in created
+            ])
+        else:
+            created = []
+
+        AssessmentCampaign.objects.filter(pk=campaign.pk).update(
+            processed=campaign.processed + len(vendor_ids),
+            created=campaign.created + len(created),
+        )
+    campaign.processed += len(vendor_ids)
+    campaign.created += len(created)
+    return len(created)
+
+
+def run(campaign_id, claim_statuses=(AssessmentCampaign.STATUS_PENDING, AssessmentCampaign.STATUS_FAILED)):
+    """
+    Execute a campaign to completion. Returns the campaign, or None if it is
+    already being run (or finished) elsewhere.
+    """
+    if not _claim(campaign_id, claim_statuses):
+        return None
+    campaign = AssessmentCampaign.objects.select_related("created_by", "template").get(pk=campaign_id)
+    chunk_size = get_config()["CHUNK_SIZE"]
+
+    try:
+        vendors = vendor_queryset(campaign)
+        question_count = campaign.template.question_count()
+        campaign.total = vendors.count()
+        campaign.processed = 0
+        # Assignments made by an earlier, interrupted run already exist
+        campaign.created = Assessment.objects.filter(campaign=campaign).count()
+        AssessmentCampaign.objects.filter(pk=campaign.pk).update(
+            total=campaign.total, processed=0, created=campaign.created
+        )
+
+        last_id = 0
+        while True:
+            vendor_ids = list(vendors.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:chunk_size])
+            if not vendor_ids:
+                break
+            last_id = vendor_ids[-1]
+            _assign_chunk(campaign, vendor_ids, question_count)
+    except Exception as exc:
+        logger.exception("Assessment campaign %s failed", campaign_id)
+        AssessmentCampaign.objects.filter(pk=campaign_id).update(
+            status=AssessmentCampaign.STATUS_FAILED, error=str(exc), finished_at=timezone.now()
+        )
+        campaign.status = AssessmentCampaign.STATUS_FAILED
+        campaign.error = str(exc)
+        return campaign
+
+    campaign.status = AssessmentCampaign.STATUS_COMPLETED
+    campaign.finished_at = timezone.now()
+    AssessmentCampaign.objects.filter(pk=campaign_id).update(
+        status=campaign.status, finished_at=campaign.finished_at
+    )
+    return campaign
+
+
+def _run_in_background(campaign_id):
+    try:
+        run(campaign_id)
+    finally:
+        close_old_connections()
+
+
+def start(campaign):
+    """Run small campaigns inline and hand large ones to a background thread"""
+    if vendor_queryset(campaign).count() <= get_config()["INLINE_LIMIT"]:
+        run(campaign.pk)
+    else:
+        # The thread must not start before the campaign row is committed
+        transaction.on_commit(lambda: threading.Thread(
+            target=_run_in_background, args=(campaign.pk,), name=f"campaign-{campaign.pk}", daemon=True
+        ).start())
+    campaign.refresh_from_db()
+    return campaign
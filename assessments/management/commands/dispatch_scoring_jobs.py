@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from assessments import scoring
+
+
+class Command(BaseCommand):
+    help = "Deliver queued scoring jobs to the scoring service (once, or continuously with --loop)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep polling the outbox (dedicated worker)")
+        parser.add_argument("--batch-size", type=int, help="Jobs per batch (default SCORING_OUTBOX['BATCH_SIZE'])")
+        parser.add_argument("--retry-failed", action="store_true", help="Queue jobs that ran out of attempts again")
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            self.stdout.write(f"ℹ️ Re-queued {scoring.retry_failed()} failed scoring jobs")
+
+        while True:
+            totals = scoring.dispatch(batch_size=options["batch_size"])
+            if totals["batches"] or not options["loop"]:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ Scored {totals['scored']} assessments for {totals['jobs']} jobs "
+                    f"({totals['retried']} to retry, {totals['failed']} failed)"
+                ))
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(scoring.get_config()["POLL_INTERVAL"])
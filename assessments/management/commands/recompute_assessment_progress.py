@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from responses.progress import recompute
+
+
+class Command(BaseCommand):
+    help = "Recompute Assessment answered/question counters from live responses and templates"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", type=int, action="append", help="Only this org (repeatable)")
+
+    def handle(self, *args, **options):
+        checked, fixed = recompute(options["org"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Checked {checked} assessments, corrected {fixed}"))
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assessments import scoring
+from assessments.models import Assessment
+
+
+class Command(BaseCommand):
+    help = "Rescore assessments in batches through the scoring service (e.g. after a methodology change)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", type=int, help="Only this org's assessments")
+        parser.add_argument("--template", type=int, help="Only assessments of this template")
+        parser.add_argument("--all", action="store_true", help="Every assessment")
+        parser.add_argument("--batch-size", type=int, help="Assessments per call (default SCORING_SERVICE['BATCH_SIZE'])")
+        parser.add_argument("--concurrency", type=int, help="Batches in flight (default SCORING_SERVICE['BATCH_CONCURRENCY'])")
+
+    def handle(self, *args, **options):
+        if not (options["org"] or options["template"] or options["all"]):
+            raise CommandError("Pass --org, --template or --all")
+
+        qs = Assessment.objects.all()
+        if options["org"]:
+            qs = qs.filter(org_id=options["org"])
+        if options["template"]:
+            qs = qs.filter(template_id=options["template"])
+        total = qs.count()
+        self.stdout.write(f"ℹ️ Rescoring {total} assessments")
+
+        started = time.monotonic()
+
+        def progress(totals):
+            done = totals["scored"] + totals["failed"]
+            rate = done / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"ℹ️ {done}/{total} ({rate:.0f}/s)")
+
+        totals = scoring.rescore(
+            qs, batch_size=options["batch_size"], concurrency=options["concurrency"], on_batch=progress
+        )
+        elapsed = time.monotonic() - started
+        rate = (totals["scored"] + totals["failed"]) / max(elapsed, 1e-6)
+        summary = (
+            f"Rescored {totals['scored']} assessments in {totals['batches']} batches, "
+            f"{elapsed:.1f}s ({rate:.0f}/s)"
+        )
+        if totals["failed"]:
+            self.stdout.write(self.style.WARNING(f"⚠️ {summary}; {totals['failed']} could not be scored"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {summary}"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from assessments import campaigns
+from assessments.models import AssessmentCampaign
+
+
+class Command(BaseCommand):
+    help = "Run assessment campaigns that are pending, failed or were interrupted by a restart"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campaign", type=int, action="append", help="Only this campaign (repeatable)")
+        parser.add_argument(
+            "--include-running", action="store_true",
+            help="Also take over campaigns marked running (only after their worker process has died)",
+        )
+
+    def handle(self, *args, **options):
+        statuses = [AssessmentCampaign.STATUS_PENDING, AssessmentCampaign.STATUS_FAILED]
+        if options["include_running"]:
+            statuses.append(AssessmentCampaign.STATUS_RUNNING)
+
+        qs = AssessmentCampaign.objects.filter(status__in=statuses).order_by("id")
+        if options["campaign"]:
+            qs = qs.filter(pk__in=options["campaign"])
+
+        for campaign_id in qs.values_list("id", flat=True):
+            campaign = campaigns.run(campaign_id, claim_statuses=statuses)
+            if campaign is None:
+                continue
+            if campaign.status == AssessmentCampaign.STATUS_FAILED:
+                self.stdout.write(self.style.ERROR(f"❌ Campaign {campaign_id} failed: {campaign.error}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ Campaign {campaign_id}: {campaign.created} assessments for {campaign.total} vendors"
+                ))
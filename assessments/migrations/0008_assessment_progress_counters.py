@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0007_assessmentcampaign'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessment',
+            name='answered_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assessment',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
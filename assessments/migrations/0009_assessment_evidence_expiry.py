@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0008_assessment_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessment',
+            name='evidence_expiry',
+            field=models.CharField(blank=True, choices=[('', 'Current'), ('expiring', 'Expiring'), ('expired', 'Expired')], default='', max_length=20),
+        ),
+    ]
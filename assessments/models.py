@@ -1,8 +1,11 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from orgs.models import Organization
 from vendors.models import Vendor
 from templates.models import Template
+from .signals import status_changed
 
 
 class Assessment(models.Model):
@@ -26,6 +29,17 @@ class Assessment(models.Model):
         STATUS_APPROVED: [],  # Final state
     }
 
+    # Worst expiry state of the assessment's evidence (set by evidence.expiry)
+    EVIDENCE_CURRENT = ""
+    EVIDENCE_EXPIRING = "expiring"
+    EVIDENCE_EXPIRED = "expired"
+
+    EVIDENCE_EXPIRY = [
+        (EVIDENCE_CURRENT, "Current"),
+        (EVIDENCE_EXPIRING, "Expiring"),
+        (EVIDENCE_EXPIRED, "Expired"),
+    ]
+
     org = models.ForeignKey(Organization, on_delete=models.CASCADE)
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
     score = models.FloatField(null=True, blank=True)
@@ -33,46 +47,234 @@ class Assessment(models.Model):
 
     template = models.ForeignKey(Template, on_delete=models.PROTECT)
     status = models.CharField(max_length=20, choices=STATUS, default=STATUS_ASSIGNED)
+    # Denormalized progress: non-blank responses / questions in the template.
+    # Kept current by response writes; recompute_assessment_progress repairs drift.
+    answered_count = models.PositiveIntegerField(default=0)
+    question_count = models.PositiveIntegerField(default=0)
+    evidence_expiry = models.CharField(max_length=20, choices=EVIDENCE_EXPIRY, default=EVIDENCE_CURRENT, blank=True)
+    campaign = models.ForeignKey(
+        "AssessmentCampaign",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="assessments"
+    )
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # A campaign assigns each vendor at most once, so re-running it is safe
+            models.UniqueConstraint(fields=["campaign", "vendor"], name="assessment_campaign_vendor_uniq"),
+        ]
 
     def __str__(self):
         return f"Assessment {self.id} - {self.vendor.name} ({self.status})"
     
-    def is_valid_transition(self, new_status: str) -> bool:
-        """Check if transition from current status to new_status is valid"""
-        if self.status not in self.VALID_TRANSITIONS:
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so save() can validate without re-reading the row
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    @classmethod
+    def predecessors(cls, new_status: str) -> list[str]:
+        """Statuses that may move to new_status"""
+        return [current for current, targets in cls.VALID_TRANSITIONS.items() if new_status in targets]
+
+    def is_valid_transition(self, new_status: str, current: str = None) -> bool:
+        """Check if transition from current status (default: self.status) to new_status is valid"""
+        current = self.status if current is None else current
+        if current not in self.VALID_TRANSITIONS:
             return False
-        return new_status in self.VALID_TRANSITIONS[self.status]
+        return new_status in self.VALID_TRANSITIONS[current]
     
-    def can_transition_to(self, new_status: str) -> tuple[bool, str]:
+    def can_transition_to(self, new_status: str, current: str = None) -> tuple[bool, str]:
         """
         Validate if the assessment can transition to a new status.
         Returns: (is_valid, error_message)
         """
-        if new_status == self.status:
+        current = self.status if current is None else current
+        if new_status == current:
             return True, ""
         
-        if not self.is_valid_transition(new_status):
-            valid_transitions = self.VALID_TRANSITIONS.get(self.status, [])
+        if not self.is_valid_transition(new_status, current):
+            valid_transitions = self.VALID_TRANSITIONS.get(current, [])
             return False, (
-                f"Cannot transition from '{self.status}' to '{new_status}'. "
+                f"Cannot transition from '{current}' to '{new_status}'. "
                 f"Valid transitions: {', '.join(valid_transitions) if valid_transitions else 'none'}"
             )
         
         return True, ""
-    
+
+    def transition(self, new_status: str) -> bool:
+        """
+        Move to new_status with a single conditional UPDATE
+        (WHERE id = pk AND status IN predecessors). Returns True if this call
+        won; False if the row was not in an allowed predecessor state, e.g.
+        because a concurrent request already moved it.
+        """
+        predecessors = self.predecessors(new_status)
+        now = timezone.now()
+        won = type(self).objects.filter(pk=self.pk, status__in=predecessors).update(
+            status=new_status, updated_at=now
+        )
+        if not won:
+            return False
+
+        # With a linear workflow the predecessor is known without reading the row
+        previous = predecessors[0] if len(predecessors) == 1 else self.status
+        self.status = self._loaded_status = new_status
+        self.updated_at = now
+        status_changed.send(
+            sender=type(self), org_id=self.org_id, previous=previous, status=new_status,
+            count=1, instance=self,
+        )
+        return True
+
+    @classmethod
+    def transition_many(cls, ids, new_status: str, **filters) -> dict:
+        """
+        Bulk form of transition(): moves every assessment in ids (optionally
+        narrowed by extra filters, e.g. org_id) that is in an allowed
+        predecessor state. Returns {id: previous status} for the rows moved.
+        """
+        predecessors = cls.predecessors(new_status)
+        with transaction.atomic():
+            candidates = list(
+                cls.objects.select_for_update()
+                .filter(pk__in=ids, status__in=predecessors, **filters)
+                .values_list("pk", "org_id", "status")
+                .order_by("pk")
+            )
+            if not candidates:
+                return {}
+            cls.objects.filter(pk__in=[pk for pk, _, _ in candidates], status__in=predecessors).update(
+                status=new_status, updated_at=timezone.now()
+            )
+
+            moved = {}
+            for _, org_id, previous in candidates:
+                moved[(org_id, previous)] = moved.get((org_id, previous), 0) + 1
+            for (org_id, previous), count in moved.items():
+                status_changed.send(
+                    sender=cls, org_id=org_id, previous=previous, status=new_status,
+                    count=count, instance=None,
+                )
+        return {pk: previous for pk, _, previous in candidates}
+
+    @property
+    def progress(self) -> int:
+        """Percent of template questions answered"""
+        if not self.question_count:
+            return 0
+        return min(100, round(100 * self.answered_count / self.question_count))
+
+    @classmethod
+    def add_answered(cls, assessment_id, delta: int):
+        """Adjust answered_count in place without reading the row"""
+        if delta:
+            cls.objects.filter(pk=assessment_id).update(answered_count=models.F("answered_count") + delta)
+
     def save(self, *args, **kwargs):
         """Validate state transitions before saving"""
-        if self.pk:  # If updating (not creating)
-            original = Assessment.objects.get(pk=self.pk)
-            if original.status != self.status:
-                is_valid, error_msg = self.can_transition_to(self.status)
-                if not is_valid:
-                    raise ValidationError(error_msg)
+        if self._state.adding and not self.question_count and self.template_id:
+            self.question_count = self.template.question_count()
+        loaded = getattr(self, "_loaded_status", None)
+        if self.pk and loaded is not None and loaded != self.status:
+            is_valid, error_msg = self.can_transition_to(self.status, current=loaded)
+            if not is_valid:
+                raise ValidationError(error_msg)
         super().save(*args, **kwargs)
+        self._loaded_status = self.status
+
+
+
 
+class AssessmentCampaign(models.Model):
+    """One template assigned to every vendor matching a filter, in bulk"""
 
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+
+    STATUS = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    org = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="assessment_campaigns")
+    template = models.ForeignKey(Template, on_delete=models.PROTECT)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    # Client-supplied key; re-posting the same key returns the existing campaign
+    key = models.CharField(max_length=64)
+    vendor_filter = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS, default=STATUS_PENDING)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=["org", "key"], name="assessment_campaign_org_key_uniq"),
+        ]
+
+    def __str__(self):
+        return f"Campaign {self.id} - {self.template_id} ({self.status})"
+
+
+class ScoringJob(models.Model):
+    """
+    Outbox row asking for an assessment to be (re)scored. Written in the same
+    transaction as the change that needs the score; assessments.scoring
+    delivers it to the scoring service.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    org = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name="scoring_jobs")
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name="scoring_jobs")
+    reason = models.CharField(max_length=50)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Lease of the dispatcher running the job; expired leases are picked up again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # The dispatcher only ever scans unfinished jobs, oldest due first
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                name="scoring_job_due_idx",
+                condition=models.Q(status__in=["pending", "running"]),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Scoring job {self.id} - assessment {self.assessment_id} ({self.status})"
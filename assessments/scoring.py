@@ -0,0 +1,357 @@
+"""
+Scoring outbox.
+
+Anything that needs an assessment (re)scored, such as closing a
+remediation, calls enqueue() inside its own transaction: the ScoringJob row
+commits or rolls back together with the change, so a trigger is never lost
+and the request never waits on the scoring service.
+
+dispatch() drains due jobs in batches of BATCH_SIZE. A batch is claimed
+with SELECT ... FOR UPDATE SKIP LOCKED (where the database supports it) and
+a LEASE, so several dispatchers can share the outbox and jobs held by a
+crashed one are picked up again. Jobs for the same assessment are coalesced
+into one call, up to CONCURRENCY calls run at a time through
+services.scoring, and the results are written with one bulk_update, audit
+events per org and the assessment_scored signal. A failed call is retried
+after an exponential, jittered delay; after MAX_ATTEMPTS its jobs are marked
+failed, with a scoring_failed audit event and signal.
+
+With AUTOSTART every web process runs a dispatcher thread, started by the
+WSGI / ASGI entrypoint (so jobs queued before a restart are delivered),
+woken when new jobs commit and every POLL_INTERVAL seconds. Management
+commands, tests and worker processes never start one. Without AUTOSTART
+(and for a dedicated worker) run ``manage.py dispatch_scoring_jobs --loop``.
+
+rescore() rescores many assessments at once (e.g. after a methodology
+change) through the service's batch endpoint; see
+``manage.py rescore_assessments``.
+"""
+import atexit
+import logging
+import os
+import multiprocessing
+import random
+import threading
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from audit.services import log_events
+from services import scoring as scoring_service
+from .models import Assessment, ScoringJob
+from .signals import assessment_scored, scoring_failed
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "AUTOSTART": True,  # dispatcher thread in every web process
+    "BATCH_SIZE": 100,
+    "CONCURRENCY": 4,  # scoring calls in flight per dispatcher
+    "MAX_ATTEMPTS": 10,
+    "BACKOFF": 5,  # seconds, doubled per attempt
+    "BACKOFF_MAX": 3600,
+    "LEASE": 300,  # seconds a claimed batch stays reserved
+    "POLL_INTERVAL": 5,
+}
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "SCORING_OUTBOX", {}))
+    return config
+
+
+def enqueue(assessment_id, org_id, reason, user=None):
+    """Record that an assessment needs scoring; call inside the transaction making the change"""
+    job = ScoringJob.objects.create(
+        assessment_id=assessment_id,
+        org_id=org_id,
+        reason=reason,
+        requested_by=user if getattr(user, "is_authenticated", False) else None,
+    )
+    if get_config()["AUTOSTART"]:
+        transaction.on_commit(lambda: get_dispatcher().wake())
+    return job
+
+
+def retry_delay(attempts, config=None):
+    config = config or get_config()
+    delay = min(config["BACKOFF_MAX"], config["BACKOFF"] * 2 ** max(attempts - 1, 0))
+    # +-25% so jobs that failed together do not retry together
+    return timedelta(seconds=delay * random.uniform(0.75, 1.25))
+
+
+def claim(batch_size, now=None, lease=None):
+    """Reserve up to batch_size due jobs for this dispatcher"""
+    now = now or timezone.now()
+    lease = lease or get_config()["LEASE"]
+    due = (
+        Q(status=ScoringJob.STATUS_PENDING, next_attempt_at__lte=now)
+        | Q(status=ScoringJob.STATUS_RUNNING, locked_until__lt=now)
+    )
+    with transaction.atomic():
+        jobs = list(
+            ScoringJob.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if jobs:
+            ScoringJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=ScoringJob.STATUS_RUNNING, locked_until=now + timedelta(seconds=lease)
+            )
+    return jobs
+
+
+def score_many(assessment_ids, concurrency=None):
+    """{assessment_id: result dict or ScoringError}, calling the service concurrently"""
+    concurrency = concurrency or get_config()["CONCURRENCY"]
+
+    def call(assessment_id):
+        try:
+            return scoring_service.call_scoring_service(assessment_id)
+        except scoring_service.ScoringError as exc:
+            return exc
+
+    assessment_ids = list(assessment_ids)
+    if len(assessment_ids) <= 1 or concurrency <= 1:
+        return {assessment_id: call(assessment_id) for assessment_id in assessment_ids}
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(assessment_ids))) as pool:
+        return dict(zip(assessment_ids, pool.map(call, assessment_ids)))
+
+
+def _record(jobs, outcomes, started, config):
+    """Write one batch's results and reschedule or fail the rest; returns stats"""
+    now = timezone.now()
+    stats = Counter()
+    results = {aid: outcome for aid, outcome in outcomes.items() if not isinstance(outcome, Exception)}
+    events = {}
+
+    with transaction.atomic():
+        if results:
+            Assessment.objects.bulk_update(
+                [Assessment(pk=aid, score=result["score"], risk_level=result["risk_level"])
+                 for aid, result in results.items()],
+                ["score", "risk_level"],
+            )
+            # Pending duplicates queued before the call started are answered by it too
+            absorbed = list(ScoringJob.objects.filter(
+                assessment_id__in=list(results), status=ScoringJob.STATUS_PENDING, created_at__lte=started,
+            ))
+            jobs = jobs + absorbed
+            stats["absorbed"] = len(absorbed)
+
+        done, retried, failed = [], [], []
+        for job in jobs:
+            job.locked_until = None
+            outcome = outcomes.get(job.assessment_id)
+            if job.assessment_id in results:
+                job.status = ScoringJob.STATUS_DONE
+                job.finished_at = now
+                job.last_error = ""
+                done.append(job)
+                continue
+            job.attempts += 1
+            job.last_error = str(outcome)[:1000]
+            if job.attempts >= config["MAX_ATTEMPTS"]:
+                job.status = ScoringJob.STATUS_FAILED
+                job.finished_at = now
+                failed.append(job)
+                events.setdefault(job.org_id, {})[job.assessment_id] = ("scoring_failed", job.assessment_id, {
+                    "reason": getattr(outcome, "kind", "error"),
+                    "detail": job.last_error,
+                    "attempts": job.attempts,
+                })
+            else:
+                job.status = ScoringJob.STATUS_PENDING
+                job.next_attempt_at = now + retry_delay(job.attempts, config)
+                stats["retried"] += 1
+            retried.append(job)
+        ScoringJob.objects.bulk_update(
+            done + retried, ["status", "attempts", "next_attempt_at", "locked_until", "last_error", "finished_at"]
+        )
+
+        reasons = {}
+        for job in done:
+            reasons.setdefault((job.org_id, job.assessment_id), []).append(job.reason)
+        for (org_id, aid), job_reasons in reasons.items():
+            events.setdefault(org_id, {})[aid] = ("scoring_completed", aid, {
+                **results[aid], "jobs": len(job_reasons), "reasons": sorted(set(job_reasons)),
+            })
+        for org_id, by_assessment in events.items():
+            log_events(None, list(by_assessment.values()), org_id=org_id)
+
+        if results:
+            assessment_scored.send(sender=Assessment, results=results, jobs=done)
+        if failed:
+            scoring_failed.send(sender=Assessment, jobs=failed)
+
+    stats["failed"] = len(failed)
+    stats["scored"] = len(results)
+    stats["jobs"] = len(done)
+    return stats
+
+
+def dispatch(batch_size=None, max_batches=None):
+    """Deliver due jobs until none are left (or max_batches ran); returns totals"""
+    config = get_config()
+    batch_size = batch_size or config["BATCH_SIZE"]
+    totals = Counter()
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        started = timezone.now()
+        jobs = claim(batch_size, now=started, lease=config["LEASE"])
+        if not jobs:
+            break
+        batches += 1
+        outcomes = score_many({job.assessment_id for job in jobs}, config["CONCURRENCY"])
+        totals.update(_record(jobs, outcomes, started, config))
+    totals["batches"] = batches
+    return totals
+
+
+def retry_failed(**filters):
+    """Queue failed jobs again from scratch; returns how many"""
+    return ScoringJob.objects.filter(status=ScoringJob.STATUS_FAILED, **filters).update(
+        status=ScoringJob.STATUS_PENDING, attempts=0, next_attempt_at=timezone.now(), finished_at=None
+    )
+
+
+def _store_rescored(rows, outcome):
+    """Write one rescoring batch; rows are (assessment_id, org_id)"""
+    if isinstance(outcome, Exception):
+        logger.warning("Batch of %s assessments could not be scored: %s", len(rows), outcome)
+        return Counter(batches=1, failed=len(rows))
+
+    org_of = dict(rows)
+    results = {aid: result for aid, result in outcome.items() if aid in org_of}
+    with transaction.atomic():
+        Assessment.objects.bulk_update(
+            [Assessment(pk=aid, score=result["score"], risk_level=result["risk_level"])
+             for aid, result in results.items()],
+            ["score", "risk_level"],
+        )
+        by_org = {}
+        for aid, result in results.items():
+            by_org.setdefault(org_of[aid], []).append(("scoring_completed", aid, {**result, "reasons": ["rescore"]}))
+        for org_id, events in by_org.items():
+            log_events(None, events, org_id=org_id)
+        if results:
+            assessment_scored.send(sender=Assessment, results=results, jobs=[])
+    return Counter(batches=1, scored=len(results), failed=len(rows) - len(results))
+
+
+def rescore(queryset, batch_size=None, concurrency=None, on_batch=None):
+    """
+    Score every assessment in queryset through the scoring service's batch
+    endpoint, bypassing the outbox. Ids are read in primary-key batches of
+    batch_size; up to concurrency batches are in flight at once, and each
+    answered batch is stored with one bulk_update. Returns totals (scored,
+    failed, batches); on_batch(totals) is called after every batch.
+    """
+    service = scoring_service.get_config()
+    batch_size = batch_size or service["BATCH_SIZE"]
+    concurrency = concurrency or service["BATCH_CONCURRENCY"]
+    totals = Counter(scored=0, failed=0, batches=0)
+
+    def batches():
+        last_id = 0
+        while True:
+            rows = list(queryset.filter(pk__gt=last_id).order_by("pk").values_list("pk", "org_id")[:batch_size])
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def call(rows):
+        # Worker threads only talk HTTP; reads and writes stay on this thread
+        try:
+            return rows, scoring_service.score_batch([pk for pk, _ in rows])
+        except scoring_service.ScoringError as exc:
+            return rows, exc
+
+    def store(finished):
+        for future in finished:
+            totals.update(_store_rescored(*future.result()))
+            if on_batch:
+                on_batch(totals)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        in_flight = set()
+        for rows in batches():
+            in_flight.add(pool.submit(call, rows))
+            if len(in_flight) >= concurrency:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                store(finished)
+        store(in_flight)
+    return totals
+
+
+class Dispatcher:
+    """Background thread draining the outbox for this process"""
+
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.thread = None
+
+    def wake(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                # Forked: start our own thread
+                self.pid, self.thread = os.getpid(), None
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="scoring-dispatcher", daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def _run(self):
+        while not self.stopping:
+            try:
+                dispatch()
+            except Exception:
+                # Claimed jobs keep their lease and are retried once it expires
+                logger.exception("Scoring dispatch failed")
+            finally:
+                close_old_connections()
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+
+    def stop(self):
+        self.stopping = True
+        self.wakeup.set()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = Dispatcher(get_config()["POLL_INTERVAL"])
+                atexit.register(_dispatcher.stop)
+    return _dispatcher
+
+
+def autostart():
+    """
+    Start this process's dispatcher if AUTOSTART is on; called by the WSGI
+    and ASGI entrypoints only. True if started.
+    """
+    if not get_config()["AUTOSTART"]:
+        return False
+    if multiprocessing.parent_process() is not None:
+        # A pool worker that loaded the web app; workers stay off the database
+        return False
+    get_dispatcher().wake()
+    return True
@@ -1,14 +1,60 @@
 from rest_framework import serializers
-from .models import Assessment
+from .models import Assessment, AssessmentCampaign
+from templates.models import Template
 
 class AssessmentSerializer(serializers.ModelSerializer):
+    progress = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Assessment
         fields = "__all__"
-        read_only_fields = ("org", "status")
+        read_only_fields = ("org", "status", "answered_count", "question_count", "evidence_expiry")
 
     def create(self, validated_data):
         request = self.context.get("request")
         if request and hasattr(request, "user"):
             validated_data["org"] = request.user.org
         return super().create(validated_data)
+
+
+class BulkTransitionSerializer(serializers.Serializer):
+    MAX_IDS = 1000
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_IDS
+    )
+    status = serializers.ChoiceField(choices=[
+        Assessment.STATUS_SUBMITTED,
+        Assessment.STATUS_REVIEWED,
+        Assessment.STATUS_APPROVED,
+    ])
+
+
+class VendorFilterSerializer(serializers.Serializer):
+    tier = serializers.ListField(child=serializers.CharField(), required=False)
+    status = serializers.ListField(child=serializers.CharField(), required=False)
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+
+class AssessmentCampaignSerializer(serializers.ModelSerializer):
+    template = serializers.PrimaryKeyRelatedField(queryset=Template.objects.all())
+    vendor_filter = VendorFilterSerializer(required=False)
+
+    class Meta:
+        model = AssessmentCampaign
+        fields = (
+            "id", "key", "template", "vendor_filter", "status", "total", "processed", "created",
+            "error", "created_at", "started_at", "finished_at",
+        )
+        read_only_fields = (
+            "status", "total", "processed", "created", "error", "created_at", "started_at", "finished_at",
+        )
+        # Uniqueness of (org, key) is handled by the view, which returns the existing campaign
+        validators = []
+
+    def validate_template(self, template):
+        request = self.context.get("request")
+        org_id = getattr(getattr(request, "user", None), "org_id", None)
+        if template.org_id not in (None, org_id):
+            raise serializers.ValidationError("Template does not belong to your organization.")
+        return template
@@ -0,0 +1,15 @@
+from django.dispatch import Signal
+
+# Sent after Assessment.transition() / transition_many() moved rows with a
+# conditional UPDATE (post_save does not fire). Arguments: org_id, previous,
+# status, count, instance (None for bulk moves).
+status_changed = Signal()
+
+# Sent by assessments.scoring after score / risk_level were written for a
+# batch. Arguments: results ({assessment_id: {"score", "risk_level"}}),
+# jobs (the ScoringJob rows completed, duplicates included).
+assessment_scored = Signal()
+
+# Sent by assessments.scoring for jobs that ran out of attempts.
+# Arguments: jobs.
+scoring_failed = Signal()
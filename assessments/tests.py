@@ -1,3 +1,349 @@
-from django.test import TestCase
+import uuid
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from audit.models import AuditLog
+from dashboard import counters
+from orgs.models import Organization
+from responses.models import Response as QuestionResponse
+from responses.progress import recompute
+from services.scoring_stub import StubScoringMixin, stub_score
+from templates.models import Template, TemplateQuestion, TemplateSection, TemplateVersion
+from vendors.models import Vendor
+from .models import Assessment, AssessmentCampaign
+
+User = get_user_model()
+
+
+class AssessmentTransitionTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name='Org')
+        self.user = User.objects.create_user(username='admin', password='pass', org=self.org)
+        self.vendor = Vendor.objects.create(org=self.org, name='V')
+        self.template = Template.objects.create(org=self.org, name='T')
+        self.assessment = Assessment.objects.create(org=self.org, vendor=self.vendor, template=self.template)
+        self.client.force_authenticate(user=self.user)
+
+    def test_transition_is_one_conditional_update(self):
+        assessment = Assessment.objects.get(pk=self.assessment.pk)
+        stale = Assessment.objects.get(pk=self.assessment.pk)
+
+        self.assertTrue(assessment.transition(Assessment.STATUS_SUBMITTED))
+        # The second writer loses instead of overwriting
+        self.assertFalse(stale.transition(Assessment.STATUS_SUBMITTED))
+        self.assertEqual(Assessment.objects.get(pk=self.assessment.pk).status, Assessment.STATUS_SUBMITTED)
+        self.assertEqual(counters.get_counts(self.org.id)['assessments.status.submitted'], 1)
+        self.assertEqual(counters.check([self.org.id]), {})
+
+    def test_save_does_not_reread_row(self):
+        assessment = Assessment.objects.get(pk=self.assessment.pk)
+        assessment.score = 42
+        with self.assertNumQueries(1):
+            assessment.save(update_fields=['score'])
+
+    def test_save_still_rejects_invalid_transition(self):
+        assessment = Assessment.objects.get(pk=self.assessment.pk)
+        assessment.status = Assessment.STATUS_APPROVED
+        with self.assertRaises(ValidationError):
+            assessment.save()
+
+    def test_transition_many(self):
+        second = Assessment.objects.create(org=self.org, vendor=self.vendor, template=self.template)
+        self.assessment.transition(Assessment.STATUS_SUBMITTED)
+
+        moved = Assessment.transition_many(
+            [self.assessment.pk, second.pk], Assessment.STATUS_SUBMITTED, org_id=self.org.id
+        )
+        self.assertEqual(moved, {second.pk: Assessment.STATUS_ASSIGNED})
+        self.assertEqual(counters.check([self.org.id]), {})
+
+    def test_actions(self):
+        url = f'/api/assessments/{self.assessment.pk}/'
+        self.assertEqual(self.client.post(url + 'review/').status_code, 409)
+        for step, expected in (('submit', 'submitted'), ('review', 'reviewed'), ('approve', 'approved')):
+            response = self.client.post(url + f'{step}/')
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data['status'], expected)
+        # Repeating the step the assessment already took changes nothing
+        response = self.client.post(url + 'approve/')
+        self.assertEqual((response.status_code, response.data['status']), (200, 'approved'))
+        self.assertEqual(AuditLog.objects.filter(action='approve_assessment').count(), 1)
+        response = self.client.post(url + 'submit/')
+        self.assertEqual(response.status_code, 409)
+        self.assertIn("Cannot transition from 'approved'", response.data['detail'])
+
+
+class BulkTransitionTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name='Org')
+        self.admin = User.objects.create_user(username='admin', password='pass', org=self.org, role='admin')
+        self.reviewer = User.objects.create_user(username='rev', password='pass', org=self.org, role='reviewer')
+        vendor = Vendor.objects.create(org=self.org, name='V')
+        template = Template.objects.create(org=self.org, name='T')
+        self.assessments = [
+            Assessment.objects.create(org=self.org, vendor=vendor, template=template) for _ in range(5)
+        ]
+        other_org = Organization.objects.create(name='Other')
+        self.foreign = Assessment.objects.create(
+            org=other_org,
+            vendor=Vendor.objects.create(org=other_org, name='W'),
+            template=Template.objects.create(org=other_org, name='U'),
+        )
+
+    def post(self, user, ids, target):
+        self.client.force_authenticate(user=user)
+        return self.client.post(
+            '/api/assessments/bulk-transition/', {'ids': ids, 'status': target}, format='json'
+        )
+
+    def test_reports_per_id_results(self):
+        ids = [a.pk for a in self.assessments]
+        self.assessments[0].transition(Assessment.STATUS_SUBMITTED)
+
+        response = self.post(self.reviewer, ids + [self.foreign.pk], Assessment.STATUS_SUBMITTED)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 4)
+        results = {row['id']: row['result'] for row in response.data['results']}
+        self.assertEqual(results[ids[0]], 'conflict')
+        self.assertEqual(results[self.foreign.pk], 'not_found')
+        self.assertEqual(Assessment.objects.get(pk=self.foreign.pk).status, Assessment.STATUS_ASSIGNED)
+        self.assertEqual(
+            AuditLog.objects.filter(action='submit_assessment', object_id__in=ids).count(), 4
+        )
+        self.assertEqual(counters.check([self.org.id]), {})
+
+    def test_query_count_does_not_grow_with_ids(self):
+        ids = [a.pk for a in self.assessments]
+        # First call creates the org's audit chain head
+        self.post(self.reviewer, ids[:1], Assessment.STATUS_SUBMITTED)
+        with CaptureQueriesContext(connection) as small:
+            self.post(self.reviewer, ids[1:2], Assessment.STATUS_SUBMITTED)
+        with CaptureQueriesContext(connection) as large:
+            self.post(self.reviewer, ids[2:], Assessment.STATUS_SUBMITTED)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_role_rules(self):
+        ids = [a.pk for a in self.assessments]
+        Assessment.transition_many(ids, Assessment.STATUS_SUBMITTED)
+        Assessment.transition_many(ids, Assessment.STATUS_REVIEWED)
+        self.assertEqual(self.post(self.reviewer, ids, Assessment.STATUS_APPROVED).status_code, 403)
+        self.assertEqual(self.post(self.admin, ids, Assessment.STATUS_APPROVED).data['updated'], 5)
+
+
+@override_settings(ASSESSMENT_CAMPAIGNS={'CHUNK_SIZE': 2, 'INLINE_LIMIT': 100})
+class AssessmentCampaignTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name='Org')
+        self.admin = User.objects.create_user(username='admin', password='pass', org=self.org, role='admin')
+        self.template = Template.objects.create(org=self.org, name='T')
+        self.high = [Vendor.objects.create(org=self.org, name=f'H{i}', tier='HIGH') for i in range(5)]
+        Vendor.objects.create(org=self.org, name='L', tier='LOW')
+        self.client.force_authenticate(user=self.admin)
+
+    def post(self, key='q1'):
+        return self.client.post('/api/assessment-campaigns/', {
+            'key': key, 'template': self.template.pk, 'vendor_filter': {'tier': ['HIGH']},
+        }, format='json')
+
+    def test_assigns_template_to_filtered_vendors(self):
+        response = self.post()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual((response.data['total'], response.data['processed'], response.data['created']), (5, 5, 5))
+        self.assertEqual(
+            set(Assessment.objects.values_list('vendor_id', flat=True)), {v.pk for v in self.high}
+        )
+        self.assertEqual(AuditLog.objects.filter(action='create_assessment').count(), 5)
+        self.assertEqual(counters.check([self.org.id]), {})
+
+    def test_retry_with_same_key_does_not_duplicate(self):
+        first = self.post()
+        again = self.post()
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.data['id'], first.data['id'])
+        self.assertEqual(Assessment.objects.count(), 5)
+
+    def test_resume_creates_only_missing_assignments(self):
+        campaign = AssessmentCampaign.objects.create(
+            org=self.org, template=self.template, key='q2', vendor_filter={'tier': ['HIGH']},
+            status=AssessmentCampaign.STATUS_RUNNING, created_by=self.admin,
+        )
+        Assessment.objects.create(org=self.org, vendor=self.high[0], template=self.template, campaign=campaign)
+
+        call_command('resume_assessment_campaigns', stdout=StringIO())
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, AssessmentCampaign.STATUS_RUNNING)
+
+        call_command('resume_assessment_campaigns', '--include-running', stdout=StringIO())
+        campaign.refresh_from_db()
+        self.assertEqual(campaign.status, AssessmentCampaign.STATUS_COMPLETED)
+        self.assertEqual(campaign.assessments.count(), 5)
+        self.assertEqual(AuditLog.objects.filter(action='create_assessment').count(), 4)
+        self.assertEqual(counters.check([self.org.id]), {})
+
+    def test_large_campaign_runs_in_background(self):
+        with override_settings(ASSESSMENT_CAMPAIGNS={'CHUNK_SIZE': 2, 'INLINE_LIMIT': 1}):
+            with patch('assessments.campaigns.threading.Thread') as thread, \
+                    self.captureOnCommitCallbacks(execute=True):
+                response = self.post()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+        thread.return_value.start.assert_called_once()
+
+
+class SubmitAllTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name='Org')
+        self.user = User.objects.create_user(username='vendor', password='pass', org=self.org, role='vendor')
+        template = Template.objects.create(org=self.org, name='T')
+        version = TemplateVersion.objects.create(template=template)
+        section = TemplateSection.objects.create(template_version=version, title='S')
+        for i in range(3):
+            TemplateQuestion.objects.create(section=section, text=f'Q{i}')
+        self.assessment = Assessment.objects.create(
+            org=self.org, vendor=Vendor.objects.create(org=self.org, name='V'), template=template
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = f'/api/assessments/{self.assessment.pk}/submit-all/'
+
+    def answer(self, count):
+        for _ in range(count):
+            QuestionResponse.objects.create(assessment=self.assessment, question_id=uuid.uuid4(), answer_text='yes')
+
+    def test_incomplete_assessment_is_rejected(self):
+        self.answer(2)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.data['answered'], response.data['total']), (2, 3))
+        self.assertEqual(Assessment.objects.get(pk=self.assessment.pk).status, Assessment.STATUS_ASSIGNED)
+
+    def test_submits_assessment_and_all_responses(self):
+        self.answer(3)
+        response = self.client.post(self.url)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['status'], Assessment.STATUS_SUBMITTED)
+        self.assertEqual(response.data['responses_submitted'], 3)
+        self.assertFalse(QuestionResponse.objects.filter(submitted=False).exists())
+
+        self.assertEqual(self.client.post(self.url).status_code, 409)
+
+
+class AssessmentProgressTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name='Org')
+        self.user = User.objects.create_user(username='vendor', password='pass', org=self.org, role='vendor')
+        self.template = Template.objects.create(org=self.org, name='T')
+        section = TemplateSection.objects.create(
+            template_version=TemplateVersion.objects.create(template=self.template), title='S'
+        )
+        for i in range(4):
+            TemplateQuestion.objects.create(section=section, text=f'Q{i}')
+        self.vendor = Vendor.objects.create(org=self.org, name='V')
+        self.assessment = Assessment.objects.create(org=self.org, vendor=self.vendor, template=self.template)
+        self.client.force_authenticate(user=self.user)
+
+    def counts(self):
+        assessment = Assessment.objects.get(pk=self.assessment.pk)
+        return assessment.answered_count, assessment.question_count
+
+    def test_counters_follow_response_writes(self):
+        self.assertEqual(self.counts(), (0, 4))
+        first = QuestionResponse.objects.create(assessment=self.assessment, question_id=uuid.uuid4(), answer_text='a')
+        QuestionResponse.objects.create(assessment=self.assessment, question_id=uuid.uuid4(), answer_text='')
+        self.assertEqual(self.counts(), (1, 4))
+
+        questions = [uuid.uuid4(), uuid.uuid4()]
+        self.client.post('/api/responses/responses/autosave/', {
+            'assessment': self.assessment.pk,
+            'answers': [{'question_id': str(q), 'answer_text': 'x'} for q in questions]
+                       + [{'question_id': str(first.question_id), 'answer_text': ''}],
+        }, format='json')
+        self.assertEqual(self.counts(), (2, 4))
+
+        QuestionResponse.objects.get(question_id=questions[0]).delete()
+        self.assertEqual(self.counts(), (1, 4))
+        self.assertEqual(recompute(), (1, 0))
+
+    def test_list_returns_progress_without_extra_queries(self):
+        for _ in range(3):
+            Assessment.objects.create(org=self.org, vendor=self.vendor, template=self.template)
+        QuestionResponse.objects.create(assessment=self.assessment, question_id=uuid.uuid4(), answer_text='a')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/assessments/')
+        self.assertEqual(len(queries.captured_queries), 1)
+        progress = {row['id']: row['progress'] for row in response.data}
+        self.assertEqual(progress[self.assessment.pk], 25)
+
+    def test_recompute_repairs_drift(self):
+        Assessment.objects.filter(pk=self.assessment.pk).update(answered_count=3, question_count=0)
+        call_command('recompute_assessment_progress', stdout=StringIO())
+        self.assertEqual(self.counts(), (0, 4))
+
+
+class BatchRescoringTests(StubScoringMixin, APITestCase):
+    scoring_overrides = {'RETRIES': 0, 'BREAKER_THRESHOLD': 100}
+
+    def setUp(self):
+        super().setUp()
+        self.org = Organization.objects.create(name='Org')
+        self.other_org = Organization.objects.create(name='Other')
+        vendor = Vendor.objects.create(org=self.org, name='V')
+        self.template = Template.objects.create(org=self.org, name='T')
+        self.other_template = Template.objects.create(org=self.org, name='T2')
+        self.assessments = [
+            Assessment.objects.create(org=self.org, vendor=vendor, template=self.template) for _ in range(4)
+        ] + [Assessment.objects.create(org=self.org, vendor=vendor, template=self.other_template)]
+        self.foreign = Assessment.objects.create(
+            org=self.other_org,
+            vendor=Vendor.objects.create(org=self.other_org, name='W'),
+            template=Template.objects.create(org=self.other_org, name='T3'),
+        )
+
+    def rescore(self, *args):
+        out = StringIO()
+        call_command('rescore_assessments', *args, stdout=out)
+        return out.getvalue()
+
+    def test_rescores_an_org_in_concurrent_batches(self):
+        output = self.rescore('--org', str(self.org.pk), '--batch-size', '2', '--concurrency', '2')
+        self.assertIn('Rescored 5 assessments in 3 batches', output)
+
+        self.assertEqual({path for path, _ in self.stub.requests}, {'/score/batch'})
+        sent = sorted(aid for _, payload in self.stub.requests for aid in payload['assessment_ids'])
+        self.assertEqual(sent, sorted(a.pk for a in self.assessments))
+        self.assertTrue(all(len(payload['assessment_ids']) <= 2 for _, payload in self.stub.requests))
+
+        for assessment in self.assessments:
+            assessment.refresh_from_db()
+            expected = stub_score(assessment.pk)
+            self.assertEqual((assessment.score, assessment.risk_level), (expected['score'], expected['risk_level']))
+        self.assertIsNone(Assessment.objects.get(pk=self.foreign.pk).score)
+        self.assertEqual(AuditLog.objects.filter(action='scoring_completed', org_id=self.org.pk).count(), 5)
+
+    def test_template_filter_and_failures_are_reported(self):
+        unknown = self.assessments[0].pk
+        self.stub.unknown = {unknown}
+        output = self.rescore('--template', str(self.template.pk), '--batch-size', '2', '--concurrency', '1')
+        self.assertIn('Rescored 3 assessments', output)
+        self.assertIn('1 could not be scored', output)
+        self.assertIsNone(Assessment.objects.get(pk=unknown).score)
+        self.assertIsNone(Assessment.objects.get(pk=self.assessments[4].pk).score)
+
+    def test_a_failed_batch_does_not_stop_the_rest(self):
+        self.stub.fail_next = [503]
+        output = self.rescore('--all', '--batch-size', '3', '--concurrency', '1')
+        self.assertIn('Rescored 3 assessments in 2 batches', output)
+        self.assertIn('3 could not be scored', output)
+
+    def test_requires_a_scope(self):
+        with self.assertRaises(CommandError):
+            self.rescore()
@@ -1,7 +1,8 @@
 from rest_framework.routers import DefaultRouter
-from .views import AssessmentViewSet
+from .views import AssessmentCampaignViewSet, AssessmentViewSet
 
 router = DefaultRouter()
 router.register(r"assessments", AssessmentViewSet, basename="assessments")
+router.register(r"assessment-campaigns", AssessmentCampaignViewSet, basename="assessment-campaigns")
 
 urlpatterns = router.urls
@@ -1,15 +1,17 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError, PermissionDenied
-from django.core.exceptions import ValidationError as DjangoValidationError
-from django.shortcuts import get_object_or_404
+from django.db import transaction
 
-from .models import Assessment
-from .serializers import AssessmentSerializer
-from permissions.rbac import CanSubmitAssessment, CanReviewAssessment, CanApproveAssessment
-from audit.services import log_event
+from . import campaigns
+from .models import Assessment, AssessmentCampaign
+from .serializers import AssessmentCampaignSerializer, AssessmentSerializer, BulkTransitionSerializer
+from permissions.rbac import CanSubmitAssessment, CanReviewAssessment, CanApproveAssessment, IsAdmin
+from audit.services import log_event, log_events
+from responses.models import Response as QuestionResponse
+from responses.progress import progress
 
 
 class AssessmentViewSet(viewsets.ModelViewSet):
@@ -50,113 +52,212 @@ class AssessmentViewSet(viewsets.ModelViewSet):
             "org_id": org.id
         })
 
-    @action(detail=True, methods=['post'])
-    def submit(self, request, pk=None):
+    def _transition(self, request, new_status, audit_action):
         """
-        Vendor submits assessment (ASSIGNED -> SUBMITTED)
+        Apply one workflow step as a single conditional UPDATE and log it.
+        Repeating a step the assessment already took (e.g. a retried
+        request) answers 200 without a change. Returns 409 if the
+        assessment is not (or no longer) in a state that may move to
+        new_status.
         """
         assessment = self.get_object()
-        user = request.user
-        
-        # Validate status transition
-        is_valid, error_msg = assessment.can_transition_to(Assessment.STATUS_SUBMITTED)
-        if not is_valid:
+        previous = assessment.status
+
+        if not assessment.transition(new_status):
+            # Read the status the UPDATE saw, not the one we loaded
+            assessment.refresh_from_db(fields=["status"])
+            if assessment.status == new_status:
+                return Response(AssessmentSerializer(assessment).data, status=status.HTTP_200_OK)
+            is_valid, error_msg = assessment.can_transition_to(new_status)
+            if is_valid:
+                error_msg = "Assessment status was changed by another request. Reload and try again."
             return Response(
                 {"detail": error_msg},
                 status=status.HTTP_409_CONFLICT
             )
-        
-        assessment.status = Assessment.STATUS_SUBMITTED
-        try:
-            assessment.save()
-        except DjangoValidationError as e:
-            return Response(
-                {"detail": str(e)},
-                status=status.HTTP_409_CONFLICT
-            )
-        
-        # Log the submission
-        log_event(user, "submit_assessment", assessment.id, {
-            "previous_status": Assessment.STATUS_ASSIGNED,
-            "new_status": Assessment.STATUS_SUBMITTED,
-            "org_id": assessment.org.id
+
+        log_event(request.user, audit_action, assessment.id, {
+            "previous_status": previous,
+            "new_status": new_status,
+            "org_id": assessment.org_id
         })
-        
+
         return Response(
             AssessmentSerializer(assessment).data,
             status=status.HTTP_201_CREATED
         )
 
-    @action(detail=True, methods=['post'])
-    def review(self, request, pk=None):
+    @action(detail=True, methods=['post'], url_path='submit-all')
+    def submit_all(self, request, pk=None):
         """
-        Reviewer reviews assessment (SUBMITTED -> REVIEWED)
+        Vendor submits the assessment together with all of its answers
+        (ASSIGNED -> SUBMITTED). Completeness is checked with one aggregate
+        query, then the transition and a single UPDATE of every draft
+        Response commit together. 409 if answers are missing or the
+        assessment is not in ASSIGNED.
         """
         assessment = self.get_object()
-        user = request.user
-        
-        # Validate status transition
-        is_valid, error_msg = assessment.can_transition_to(Assessment.STATUS_REVIEWED)
-        if not is_valid:
-            return Response(
-                {"detail": error_msg},
-                status=status.HTTP_409_CONFLICT
-            )
-        
-        assessment.status = Assessment.STATUS_REVIEWED
-        try:
-            assessment.save()
-        except DjangoValidationError as e:
-            return Response(
-                {"detail": str(e)},
-                status=status.HTTP_409_CONFLICT
+        previous = assessment.status
+
+        with transaction.atomic():
+            answered, total = progress([assessment.pk])[assessment.pk]
+            if answered < total:
+                return Response(
+                    {"detail": f"{total - answered} of {total} questions are unanswered.",
+                     "answered": answered, "total": total},
+                    status=status.HTTP_409_CONFLICT
+                )
+            if not assessment.transition(Assessment.STATUS_SUBMITTED):
+                is_valid, error_msg = assessment.can_transition_to(Assessment.STATUS_SUBMITTED)
+                if is_valid:
+                    error_msg = "Assessment status was changed by another request. Reload and try again."
+                return Response(
+                    {"detail": error_msg},
+                    status=status.HTTP_409_CONFLICT
+                )
+            finalized = QuestionResponse.objects.filter(assessment_id=assessment.pk, submitted=False).update(
+                submitted=True
             )
-        
-        # Log the review
-        log_event(user, "review_assessment", assessment.id, {
-            "previous_status": Assessment.STATUS_SUBMITTED,
-            "new_status": Assessment.STATUS_REVIEWED,
-            "org_id": assessment.org.id
-        })
-        
-        return Response(
-            AssessmentSerializer(assessment).data,
-            status=status.HTTP_201_CREATED
+            log_event(request.user, "submit_assessment", assessment.id, {
+                "previous_status": previous,
+                "new_status": Assessment.STATUS_SUBMITTED,
+                "org_id": assessment.org_id,
+                "responses_submitted": finalized,
+            })
+
+        data = AssessmentSerializer(assessment).data
+        data["responses_submitted"] = finalized
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    TRANSITION_ACTIONS = {
+        Assessment.STATUS_SUBMITTED: "submit_assessment",
+        Assessment.STATUS_REVIEWED: "review_assessment",
+        Assessment.STATUS_APPROVED: "approve_assessment",
+    }
+
+    @action(detail=False, methods=['post'], url_path='bulk-transition')
+    def bulk_transition(self, request):
+        """
+        Move many assessments to one status in a single set-based UPDATE.
+        Body: {"ids": [...], "status": "submitted" | "reviewed" | "approved"}.
+        Role rules match the single-assessment submit/review/approve actions.
+        Returns a per-id result: "updated", "conflict" or "not_found".
+        """
+        serializer = BulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data["ids"]))
+        new_status = serializer.validated_data["status"]
+
+        moved = Assessment.transition_many(ids, new_status, org_id=request.user.org_id)
+        remaining = dict(
+            self.get_queryset().filter(pk__in=[pk for pk in ids if pk not in moved]).values_list("pk", "status")
         )
 
+        audit_action = self.TRANSITION_ACTIONS[new_status]
+        log_events(request.user, [
+            (audit_action, pk, {
+                "previous_status": previous,
+                "new_status": new_status,
+                "org_id": request.user.org_id,
+                "bulk": True,
+            })
+            for pk, previous in moved.items()
+        ])
+
+        results = []
+        for pk in ids:
+            if pk in moved:
+                results.append({"id": pk, "result": "updated", "status": new_status})
+            elif pk in remaining:
+                _, error_msg = Assessment(status=remaining[pk]).can_transition_to(new_status)
+                results.append({
+                    "id": pk, "result": "conflict", "status": remaining[pk],
+                    "detail": error_msg or "Assessment is already in this status",
+                })
+            else:
+                results.append({"id": pk, "result": "not_found"})
+
+        return Response({
+            "status": new_status,
+            "updated": len(moved),
+            "conflicts": len(remaining),
+            "results": results,
+        })
+
+    @action(detail=True, methods=['post'])
+    def submit(self, request, pk=None):
+        """
+        Vendor submits assessment (ASSIGNED -> SUBMITTED)
+        """
+        return self._transition(request, Assessment.STATUS_SUBMITTED, "submit_assessment")
+
+    @action(detail=True, methods=['post'])
+    def review(self, request, pk=None):
+        """
+        Reviewer reviews assessment (SUBMITTED -> REVIEWED)
+        """
+        return self._transition(request, Assessment.STATUS_REVIEWED, "review_assessment")
+
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
         """
         Admin approves assessment (REVIEWED -> APPROVED)
         """
-        assessment = self.get_object()
+        return self._transition(request, Assessment.STATUS_APPROVED, "approve_assessment")
+
+
+class AssessmentCampaignViewSet(mixins.CreateModelMixin,
+                                mixins.ListModelMixin,
+                                mixins.RetrieveModelMixin,
+                                viewsets.GenericViewSet):
+    """
+    Assign one template to every vendor matching a filter.
+
+    POST {"key": "...", "template": id, "vendor_filter": {"tier": [...], "status": [...], "ids": [...]}}
+    Small campaigns complete before the response (201); large ones run in
+    the background (202) and report progress via GET .../{id}/. Re-posting a
+    key returns the existing campaign and resumes it if it had failed.
+    """
+    serializer_class = AssessmentCampaignSerializer
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get_queryset(self):
+        user = getattr(self.request, "user", None)
+        if user and getattr(user, "org_id", None):
+            return AssessmentCampaign.objects.filter(org_id=user.org_id)
+        return AssessmentCampaign.objects.none()
+
+    def create(self, request, *args, **kwargs):
         user = request.user
-        
-        # Validate status transition
-        is_valid, error_msg = assessment.can_transition_to(Assessment.STATUS_APPROVED)
-        if not is_valid:
-            return Response(
-                {"detail": error_msg},
-                status=status.HTTP_409_CONFLICT
-            )
-        
-        assessment.status = Assessment.STATUS_APPROVED
-        try:
-            assessment.save()
-        except DjangoValidationError as e:
-            return Response(
-                {"detail": str(e)},
-                status=status.HTTP_409_CONFLICT
-            )
-        
-        # Log the approval
-        log_event(user, "approve_assessment", assessment.id, {
-            "previous_status": Assessment.STATUS_REVIEWED,
-            "new_status": Assessment.STATUS_APPROVED,
-            "org_id": assessment.org.id
-        })
-        
-        return Response(
-            AssessmentSerializer(assessment).data,
-            status=status.HTTP_201_CREATED
+        if not user.org_id:
+            raise ValidationError("User organization is required to create assessments")
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        campaign, created = AssessmentCampaign.objects.get_or_create(
+            org_id=user.org_id,
+            key=data["key"],
+            defaults={
+                "template": data["template"],
+                "vendor_filter": data.get("vendor_filter") or {},
+                "created_by": user,
+            },
         )
+        if created:
+            log_event(user, "create_campaign", campaign.id, {
+                "template_id": campaign.template_id,
+                "vendor_filter": campaign.vendor_filter,
+                "org_id": user.org_id,
+            })
+        if campaign.status in (AssessmentCampaign.STATUS_PENDING, AssessmentCampaign.STATUS_FAILED):
+            campaigns.start(campaign)
+        else:
+            campaign.refresh_from_db()
+
+        if campaign.status == AssessmentCampaign.STATUS_COMPLETED:
+            code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        else:
+            code = status.HTTP_202_ACCEPTED
+        return Response(self.get_serializer(campaign).data, status=code)
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 class AuditConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'audit'
+
+    def ready(self):
+        from . import pubsub
+        from .signals import events_written
+        events_written.connect(pubsub.on_events_written, dispatch_uid="audit-stream-publish")
@@ -0,0 +1,314 @@
+"""
+Cold storage for old audit rows.
+
+Rows older than the retention window are copied into append-only monthly
+segments (``<DIR>/<YYYY-MM>/part-<first id>-<last id>.jsonl.gz``) and then
+deleted from AuditLog one chunk per transaction, so the hot table stays
+small without ever holding the write lock for long. Every part has a small
+``.idx.json`` sidecar listing the orgs and object ids it contains and their
+time range, which lets reads skip parts without decompressing them.
+
+Run it from cron (``manage.py archive_audit_logs``) or call run() from a
+scheduler.
+"""
+import gzip
+import io
+import json
+import logging
+import os
+import time
+from datetime import timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditChainCheckpoint, AuditLog
+from .signals import events_purged
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULTS = {
+    "DIR": None,
+    "RETENTION_DAYS": 180,
+    "CHUNK_SIZE": 5000,
+    "PAUSE": 0.0,  # seconds between chunks, lets request writers in
+    "CODEC": "gzip",  # or "zstd" when the zstandard package is installed
+}
+
+CODEC_SUFFIXES = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+INDEX_SUFFIX = ".idx.json"
+
+ARCHIVE_FIELDS = (
+    "id", "org_id", "user_id", "user__username", "action", "object_id", "timestamp", "metadata",
+    "prev_hash", "row_hash",
+)
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "AUDIT_ARCHIVE", {}))
+    if not config["DIR"]:
+        config["DIR"] = Path(settings.BASE_DIR) / "var" / "audit_archive"
+    config["DIR"] = Path(config["DIR"])
+    if config["CODEC"] == "zstd" and zstandard is None:
+        config["CODEC"] = "gzip"
+    return config
+
+
+def is_enabled():
+    return get_config()["DIR"].is_dir()
+
+
+# -------------------------
+# Segment files
+# -------------------------
+def _open_write(path, codec):
+    if codec == "zstd":
+        raw = open(path, "wb")
+        return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding="utf-8")
+    return gzip.open(path, "wt", encoding="utf-8")
+
+
+def _open_read(path):
+    if path.name.endswith(CODEC_SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        raw = open(path, "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw), encoding="utf-8")
+    return gzip.open(path, "rt", encoding="utf-8")
+
+
+def _to_record(row):
+    return {
+        "id": row["id"],
+        "org": row["org_id"],
+        "user": row["user_id"],
+        "actor": row["user__username"],
+        "action": row["action"],
+        "object_id": row["object_id"],
+        "timestamp": row["timestamp"].isoformat(),
+        "metadata": row["metadata"],
+        "prev_hash": row["prev_hash"],
+        "row_hash": row["row_hash"],
+    }
+
+
+def _build_index(records):
+    orgs = {}
+    for record in records:
+        entry = orgs.setdefault(str(record["org"]), {
+            "count": 0,
+            "min_ts": record["timestamp"],
+            "max_ts": record["timestamp"],
+            "object_ids": set(),
+        })
+        entry["count"] += 1
+        entry["min_ts"] = min(entry["min_ts"], record["timestamp"])
+        entry["max_ts"] = max(entry["max_ts"], record["timestamp"])
+        if record["object_id"] is not None:
+            entry["object_ids"].add(record["object_id"])
+    for entry in orgs.values():
+        entry["object_ids"] = sorted(entry["object_ids"])
+    return {
+        "count": len(records),
+        "min_id": records[0]["id"],
+        "max_id": records[-1]["id"],
+        "orgs": orgs,
+    }
+
+
+def write_segment(directory, records, codec="gzip"):
+    """Write one immutable part file plus its index; returns the part path"""
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"part-{records[0]['id']:012d}-{records[-1]['id']:012d}"
+    path = directory / f"{stem}{CODEC_SUFFIXES[codec]}"
+    tmp = path.with_name(path.name + ".tmp")
+
+    with _open_write(tmp, codec) as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+    # The index is what makes the part visible to reads, so it goes in last and atomically
+    index_path = directory / f"{stem}{INDEX_SUFFIX}"
+    index_tmp = index_path.with_name(index_path.name + ".tmp")
+    with open(index_tmp, "w", encoding="utf-8") as f:
+        json.dump(_build_index(records), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(index_tmp, index_path)
+    return path
+
+
+# -------------------------
+# Archival
+# -------------------------
+def archive_before(cutoff, chunk_size=None, pause=None, dry_run=False):
+    """
+    Move every AuditLog row older than cutoff into monthly segments.
+
+    Each chunk is written and fsynced before its rows are deleted, so a crash
+    can at worst leave one chunk both archived and hot; reads dedupe by id.
+    Chained rows are only moved once verify_audit_chain has checked them, so
+    the hot chain always continues from a verified checkpoint.
+    Returns (rows archived, segments written).
+    """
+    config = get_config()
+    chunk_size = chunk_size or config["CHUNK_SIZE"]
+    pause = config["PAUSE"] if pause is None else pause
+
+    archivable = (
+        Q(org__isnull=True)
+        | Q(row_hash="")
+        | Exists(AuditChainCheckpoint.objects.filter(org_id=OuterRef("org_id"), last_id__gte=OuterRef("id")))
+    )
+
+    archived = 0
+    segments = 0
+    last_id = 0
+    purged_orgs = set()
+    while True:
+        rows = list(
+            AuditLog.objects.filter(timestamp__lt=cutoff, id__gt=last_id)
+            .filter(archivable)
+            .order_by("id")
+            .values(*ARCHIVE_FIELDS)[:chunk_size]
+        )
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+
+        if dry_run:
+            archived += len(rows)
+            continue
+
+        months = {}
+        for row in rows:
+            month = row["timestamp"].astimezone(dt_timezone.utc).strftime("%Y-%m")
+            months.setdefault(month, []).append(_to_record(row))
+        for month, records in months.items():
+            write_segment(config["DIR"] / month, records, config["CODEC"])
+            segments += 1
+
+        with transaction.atomic():
+            AuditLog.objects.filter(id__in=[row["id"] for row in rows]).delete()
+        archived += len(rows)
+        purged_orgs.update(row["org_id"] for row in rows if row["org_id"])
+
+        if pause:
+            time.sleep(pause)
+
+    if purged_orgs:
+        events_purged.send(sender=AuditLog, org_ids=sorted(purged_orgs))
+    return archived, segments
+
+
+def run(retention_days=None, **kwargs):
+    """Scheduler hook: archive everything older than the retention window"""
+    days = get_config()["RETENTION_DAYS"] if retention_days is None else retention_days
+    return archive_before(timezone.now() - timedelta(days=days), **kwargs)
+
+
+# -------------------------
+# Reads
+# -------------------------
+def _month_range(since, until):
+    first = since.astimezone(dt_timezone.utc).strftime("%Y-%m") if since else None
+    last = until.astimezone(dt_timezone.utc).strftime("%Y-%m") if until else None
+    return first, last
+
+
+def _part_matches(index, org_id, object_id, since, before_ts):
+    entry = index["orgs"].get(str(org_id))
+    if entry is None:
+        return False
+    if object_id is not None and object_id not in entry["object_ids"]:
+        return False
+    if since and parse_datetime(entry["max_ts"]) < since:
+        return False
+    if before_ts and parse_datetime(entry["min_ts"]) > before_ts:
+        return False
+    return True
+
+
+def search(org_id, action=None, actor=None, object_id=None, since=None, until=None, before=None, limit=50):
+    """
+    Archived rows for one org, newest first, strictly older than ``before``
+    (a (timestamp, id) keyset position). Returns serialized dicts shaped like
+    AuditLogSerializer output.
+    """
+    root = get_config()["DIR"]
+    if not root.is_dir():
+        return []
+
+    first, last = _month_range(since, until)
+    before_ts, before_id = before if before else (None, None)
+    if before_ts:
+        cap = before_ts.astimezone(dt_timezone.utc).strftime("%Y-%m")
+        last = min(last, cap) if last else cap
+
+    results = {}
+    months = sorted((p for p in root.iterdir() if p.is_dir()), reverse=True)
+    for month_dir in months:
+        month = month_dir.name
+        if last and month > last:
+            continue
+        if first and month < first:
+            break
+
+        for index_path in month_dir.glob(f"*{INDEX_SUFFIX}"):
+            try:
+                with open(index_path, encoding="utf-8") as f:
+                    index = json.load(f)
+            except ValueError:
+                logger.error("Skipping unreadable audit archive index %s", index_path)
+                continue
+            if not _part_matches(index, org_id, object_id, since, before_ts):
+                continue
+
+            stem = index_path.name[: -len(INDEX_SUFFIX)]
+            part = next(
+                (path for path in (month_dir / f"{stem}{suffix}" for suffix in CODEC_SUFFIXES.values())
+                 if path.exists()),
+                None,
+            )
+            if part is None:
+                logger.error("Skipping audit archive index %s: its part file is missing", index_path)
+                continue
+            with _open_read(part) as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record["org"] != org_id:
+                        continue
+                    if action and record["action"] != action:
+                        continue
+                    if actor is not None and record["user"] != actor:
+                        continue
+                    if object_id is not None and record["object_id"] != object_id:
+                        continue
+                    ts = parse_datetime(record["timestamp"])
+                    if since and ts < since:
+                        continue
+                    if until and ts >= until:
+                        continue
+                    if before_ts and (ts, record["id"]) >= (before_ts, before_id):
+                        continue
+                    results[record["id"]] = record
+
+        # Months are disjoint, so once a month fills the page older ones can't win
+        if len(results) >= limit:
+            break
+
+    ordered = sorted(results.values(), key=lambda r: (parse_datetime(r["timestamp"]), r["id"]), reverse=True)
+    return ordered[:limit]
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from audit import archive
+
+
+class Command(BaseCommand):
+    help = "Move audit rows older than the retention window into compressed monthly segments"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Retention window (default AUDIT_ARCHIVE['RETENTION_DAYS'])")
+        parser.add_argument("--chunk-size", type=int, help="Rows per segment / delete transaction")
+        parser.add_argument("--pause", type=float, help="Seconds to sleep between chunks")
+        parser.add_argument("--dry-run", action="store_true", help="Count rows without moving them")
+
+    def handle(self, *args, **options):
+        config = archive.get_config()
+        days = options["days"] if options["days"] is not None else config["RETENTION_DAYS"]
+        cutoff = timezone.now() - timedelta(days=days)
+
+        archived, segments = archive.archive_before(
+            cutoff,
+            chunk_size=options["chunk_size"],
+            pause=options["pause"],
+            dry_run=options["dry_run"],
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(f"ℹ️ {archived} audit rows older than {cutoff:%Y-%m-%d} would be archived")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Archived {archived} audit rows older than {cutoff:%Y-%m-%d} into {segments} segments under {config['DIR']}"
+            ))
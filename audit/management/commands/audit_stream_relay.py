@@ -0,0 +1,37 @@
+import asyncio
+import os
+
+from django.core.management.base import BaseCommand
+
+from audit.pubsub import get_config
+from audit.relay import Relay
+
+
+class Command(BaseCommand):
+    help = "Run the local pub/sub relay that fans audit events out to every web worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bind",
+            help="unix:///path.sock or host:port (default: AUDIT_STREAM['URL'])",
+        )
+
+    def handle(self, *args, **options):
+        address = options["bind"] or get_config()["URL"]
+        if not address:
+            self.stderr.write("No --bind given and AUDIT_STREAM['URL'] is not set")
+            raise SystemExit(1)
+        for prefix in ("redis://", "tcp://"):
+            if address.startswith(prefix):
+                address = address[len(prefix):]
+        if address.startswith("unix://"):
+            path = address[len("unix://"):]
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                os.remove(path)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Audit stream relay listening on {address}"))
+        try:
+            asyncio.run(Relay().serve(address))
+        except KeyboardInterrupt:
+            pass
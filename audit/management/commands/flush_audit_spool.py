@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from audit.writer import get_writer
+
+
+class Command(BaseCommand):
+    help = "Write audit events left in the local spool (e.g. after a crash) to the database"
+
+    def handle(self, *args, **options):
+        writer = get_writer()
+        writer.autostart = False
+        replayed = writer.replay_orphans()
+        self.stdout.write(self.style.SUCCESS(f"✅ Replayed {replayed} spooled audit events"))
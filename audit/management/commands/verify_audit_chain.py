@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from audit import chain
+from audit.models import AuditChainHead
+
+
+class Command(BaseCommand):
+    help = "Verify audit hash chains from the last checkpoint, in parallel across orgs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", type=int, action="append", help="Only verify this org (repeatable)")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows fetched per query")
+
+    def handle(self, *args, **options):
+        org_ids = options["org"] or list(AuditChainHead.objects.values_list("org_id", flat=True))
+
+        started = time.perf_counter()
+        results = chain.verify(org_ids, workers=options["workers"], batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+
+        total = 0
+        broken = 0
+        for result in results:
+            total += result["rows"]
+            if result["ok"]:
+                self.stdout.write(f"✓ org {result['org_id']}: {result['rows']} new rows, checkpoint at id {result['last_id']}")
+            else:
+                broken += 1
+                self.stdout.write(self.style.ERROR(
+                    f"✗ org {result['org_id']}: chain broken at audit row {result['broken_id']} "
+                    f"(checkpoint at id {result['last_id']})"
+                ))
+
+        rate = total / elapsed if elapsed else 0
+        summary = f"{total} rows across {len(results)} orgs in {elapsed:.2f}s ({rate:,.0f} rows/sec)"
+        if broken:
+            self.stdout.write(self.style.ERROR(f"⚠️ {broken} broken chains; {summary}"))
+            raise SystemExit(1)
+        self.stdout.write(self.style.SUCCESS(f"✅ {summary}"))
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_timestamp_default_now'),
+        ('orgs', '0003_remove_organization_is_active_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['org', 'timestamp'], name='audit_org_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['org', 'action', 'timestamp'], name='audit_org_action_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['org', 'object_id'], name='audit_org_object_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0003_auditlog_org_indexes'),
+        ('orgs', '0003_remove_organization_is_active_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditChainCheckpoint',
+            fields=[
+                ('org', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='orgs.organization')),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('last_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('rows_verified', models.BigIntegerField(default=0)),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AuditChainHead',
+            fields=[
+                ('org', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='orgs.organization')),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('last_hash', models.CharField(blank=True, default='', max_length=64)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='prev_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='row_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
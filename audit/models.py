@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from orgs.models import Organization
 
 
@@ -30,13 +31,38 @@ class AuditLog(models.Model):
         blank=True
     )
 
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens, not when the buffered writer flushes it
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
 
     metadata = models.JSONField(default=dict, blank=True)
 
+    # Per-org hash chain, see audit/chain.py
+    prev_hash = models.CharField(max_length=64, blank=True, default="")
+    row_hash = models.CharField(max_length=64, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            # Feed and keyset pagination: WHERE org = ? ORDER BY timestamp DESC, id DESC
+            models.Index(fields=["org", "timestamp"], name="audit_org_ts_idx"),
+            models.Index(fields=["org", "action", "timestamp"], name="audit_org_action_ts_idx"),
+            models.Index(fields=["org", "object_id"], name="audit_org_object_idx"),
+        ]
+
     def __str__(self):
         return f"{self.action} by {self.user} @ {self.timestamp}"
 
 
+class AuditChainHead(models.Model):
+    """Latest link of an org's audit hash chain; locked while appending"""
+    org = models.OneToOneField(Organization, on_delete=models.CASCADE, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    last_hash = models.CharField(max_length=64, blank=True, default="")
+
 
-    
\ No newline at end of file
+class AuditChainCheckpoint(models.Model):
+    """Last row of an org's chain that verify_audit_chain has checked"""
+    org = models.OneToOneField(Organization, on_delete=models.CASCADE, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    last_hash = models.CharField(max_length=64, blank=True, default="")
+    rows_verified = models.BigIntegerField(default=0)
+    verified_at = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,115 @@
+import base64
+from datetime import timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on (ordering_field, id) descending.
+
+    The cursor is the position of the last row served, so every page is an
+    index range scan (ordering_field <= ? ... LIMIT n) no matter how deep the
+    client has paged. There is no OFFSET and no total count.
+    """
+    ordering_field = "timestamp"
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, value, pk):
+        if timezone.is_aware(value):
+            value = value.astimezone(dt_timezone.utc)
+        raw = f"{value.isoformat()}|{pk}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk = base64.urlsafe_b64decode(encoded.encode()).decode().rsplit("|", 1)
+            value = parse_datetime(value)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def after_cursor(self, queryset, cursor):
+        value, pk = cursor
+        field = self.ordering_field
+        # The plain range bound lets the database seek the index; the OR only
+        # breaks ties between rows sharing the same value.
+        return queryset.filter(**{f"{field}__lte": value}).filter(
+            Q(**{f"{field}__lt": value}) | Q(pk__lt=pk)
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.size = size = self.get_page_size(request)
+        self.cursor = cursor = self.decode_cursor(request)
+        if cursor:
+            queryset = self.after_cursor(queryset, cursor)
+
+        rows = list(queryset.order_by(f"-{self.ordering_field}", "-pk")[: size + 1])
+        self.has_next = len(rows) > size
+        rows = rows[:size]
+        # Position of the last row served, or where the client already was
+        self.position = cursor
+        if rows:
+            self.position = (getattr(rows[-1], self.ordering_field), rows[-1].pk)
+        self.next_cursor = self.encode_cursor(*self.position) if self.has_next else None
+        return rows
+
+    def extend(self, results, rows, position):
+        """
+        Top up a short page with rows from another source (already serialized
+        and ordered after the current position). ``position`` maps a row to
+        its (value, pk) keyset position.
+        """
+        room = self.size - len(results)
+        results.extend(rows[:room])
+        self.has_next = len(rows) > room
+        self.next_cursor = self.encode_cursor(*position(results[-1])) if self.has_next else None
+        return results
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.next_cursor
+        return self.request.build_absolute_uri(f"{self.request.path}?{params.urlencode()}")
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "cursor": self.next_cursor,
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "cursor": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
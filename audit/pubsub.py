@@ -0,0 +1,307 @@
+"""
+Pub/sub fan-out of committed audit events, one channel per org.
+
+Every batch the audit writer commits is published here (see AuditConfig
+.ready), and the dashboard's Server-Sent Events endpoint subscribes to the
+caller's org. Two backends:
+
+* ``local``: in-process queues. Fine for a single worker process.
+* ``resp``: speaks the Redis PUBLISH/SUBSCRIBE wire protocol over TCP
+  (``redis://host:port``) or a unix socket (``unix:///path.sock``), so every
+  worker shares one fan-out. Point it at Redis or at the bundled
+  ``manage.py audit_stream_relay`` process.
+
+Delivery is best-effort; clients that miss events catch up from AuditLog
+using Last-Event-ID.
+"""
+import json
+import logging
+import queue
+import select
+import socket
+import threading
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "BACKEND": "local",
+    "URL": None,
+    "HEARTBEAT": 15,
+    "MAX_DURATION": 300,
+    "BACKLOG": 500,
+    "QUEUE_SIZE": 1000,
+}
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "AUDIT_STREAM", {}))
+    return config
+
+
+def channel_for(org_id):
+    return f"audit:{org_id}"
+
+
+def event_payload(log, actor=None):
+    return {
+        "id": log.pk,
+        "actor": actor,
+        "action": log.action,
+        "object_id": log.object_id,
+        "timestamp": log.timestamp,
+    }
+
+
+# -------------------------
+# In-process backend
+# -------------------------
+class LocalSubscription:
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def deliver(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # A stalled client must not block publishers; it resyncs on reconnect
+            logger.warning("Dropping audit stream event for slow subscriber on %s", self.channel)
+
+    def get(self, timeout=None):
+        """Next event dict, or None if nothing arrived within timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    def __init__(self, queue_size=1000):
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.channels = {}
+
+    def publish(self, org_id, event):
+        message = json.loads(json.dumps(event, cls=DjangoJSONEncoder))
+        with self.lock:
+            subscribers = list(self.channels.get(channel_for(org_id), ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+        return len(subscribers)
+
+    def subscribe(self, org_id):
+        subscription = LocalSubscription(self, channel_for(org_id), self.queue_size)
+        with self.lock:
+            self.channels.setdefault(subscription.channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.channels.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.channels[subscription.channel]
+
+
+# -------------------------
+# Redis wire protocol (RESP) backend
+# -------------------------
+def encode_command(*args):
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b"".join(parts)
+
+
+class RespParser:
+    """Incremental RESP reply parser; feed() bytes, then next_reply()"""
+
+    INCOMPLETE = object()
+
+    def __init__(self):
+        self.buffer = b""
+
+    def feed(self, data):
+        self.buffer += data
+
+    def next_reply(self):
+        reply, pos = self._parse(0)
+        if reply is self.INCOMPLETE:
+            return self.INCOMPLETE
+        self.buffer = self.buffer[pos:]
+        return reply
+
+    def _parse(self, pos):
+        end = self.buffer.find(b"\r\n", pos)
+        if end == -1:
+            return self.INCOMPLETE, pos
+        kind, line = self.buffer[pos:pos + 1], self.buffer[pos + 1:end]
+        pos = end + 2
+        if kind == b"+":
+            return line.decode(), pos
+        if kind == b"-":
+            return ConnectionError(line.decode()), pos
+        if kind == b":":
+            return int(line), pos
+        if kind == b"$":
+            length = int(line)
+            if length == -1:
+                return None, pos
+            if len(self.buffer) < pos + length + 2:
+                return self.INCOMPLETE, pos
+            return self.buffer[pos:pos + length], pos + length + 2
+        if kind == b"*":
+            items = []
+            for _ in range(int(line)):
+                item, pos = self._parse(pos)
+                if item is self.INCOMPLETE:
+                    return self.INCOMPLETE, pos
+                items.append(item)
+            return items, pos
+        raise ConnectionError(f"Unexpected RESP reply type {kind!r}")
+
+
+def connect(url, timeout=5):
+    parts = urlsplit(url)
+    if parts.scheme == "unix":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = parts.path
+    elif parts.scheme in ("redis", "tcp"):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = (parts.hostname or "localhost", parts.port or 6379)
+    else:
+        raise ValueError(f"Unsupported audit stream URL: {url}")
+    sock.settimeout(timeout)
+    sock.connect(address)
+    return sock
+
+
+class RespSubscription:
+    def __init__(self, url, channel):
+        self.channel = channel
+        self.sock = connect(url)
+        self.parser = RespParser()
+        self.sock.sendall(encode_command("SUBSCRIBE", channel))
+        # Swallow the subscribe confirmation
+        self._read(timeout=5)
+
+    def _read(self, timeout):
+        reply = self.parser.next_reply()
+        while reply is RespParser.INCOMPLETE:
+            ready, _, _ = select.select([self.sock], [], [], timeout)
+            if not ready:
+                return None
+            data = self.sock.recv(65536)
+            if not data:
+                raise ConnectionError("Audit stream connection closed")
+            self.parser.feed(data)
+            reply = self.parser.next_reply()
+        return reply
+
+    def get(self, timeout=None):
+        reply = self._read(timeout)
+        if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+            return json.loads(reply[2])
+        return None
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RespBroker:
+    def __init__(self, url):
+        self.url = url
+        self.lock = threading.Lock()
+        self.sock = None
+        self.parser = RespParser()
+
+    def _send(self, command):
+        if self.sock is None:
+            self.sock = connect(self.url)
+            self.parser = RespParser()
+        self.sock.sendall(command)
+        reply = RespParser.INCOMPLETE
+        while reply is RespParser.INCOMPLETE:
+            data = self.sock.recv(4096)
+            if not data:
+                raise ConnectionError("Audit stream connection closed")
+            self.parser.feed(data)
+            reply = self.parser.next_reply()
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def publish(self, org_id, event):
+        command = encode_command("PUBLISH", channel_for(org_id), json.dumps(event, cls=DjangoJSONEncoder))
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    return self._send(command)
+                except OSError:
+                    if self.sock is not None:
+                        self.sock.close()
+                    self.sock = None
+                    if attempt:
+                        raise
+
+    def subscribe(self, org_id):
+        return RespSubscription(self.url, channel_for(org_id))
+
+    def close(self):
+        with self.lock:
+            if self.sock is not None:
+                self.sock.close()
+            self.sock = None
+
+
+# -------------------------
+# Wiring
+# -------------------------
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = get_config()
+                if config["BACKEND"] == "resp":
+                    _broker = RespBroker(config["URL"])
+                else:
+                    _broker = LocalBroker(config["QUEUE_SIZE"])
+    return _broker
+
+
+def on_events_written(sender, logs, **kwargs):
+    """Publish committed audit rows to their org channels"""
+    logs = [log for log in logs if log.org_id]
+    if not logs:
+        return
+    user_ids = {log.user_id for log in logs if log.user_id}
+    User = get_user_model()
+    usernames = dict(User.objects.filter(pk__in=user_ids).values_list("pk", "username")) if user_ids else {}
+
+    broker = get_broker()
+    for log in logs:
+        try:
+            broker.publish(log.org_id, event_payload(log, usernames.get(log.user_id)))
+        except OSError:
+            logger.exception("Publishing audit event %s failed", log.pk)
+            return
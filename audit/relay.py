@@ -0,0 +1,108 @@
+"""
+Minimal pub/sub relay speaking the Redis wire protocol.
+
+Implements just PUBLISH, SUBSCRIBE, UNSUBSCRIBE and PING, which is all the
+``resp`` audit stream backend uses. Run it with ``manage.py
+audit_stream_relay`` as a local stand-in for Redis when several web
+workers need to share one event fan-out.
+"""
+import asyncio
+import logging
+
+from .pubsub import encode_command
+
+logger = logging.getLogger(__name__)
+
+# Disconnect subscribers that let this much unsent data pile up
+MAX_BUFFERED = 4 * 1024 * 1024
+
+
+def confirmation(kind, channel, count):
+    return (
+        b"*3\r\n"
+        + b"$%d\r\n%s\r\n" % (len(kind), kind)
+        + b"$%d\r\n%s\r\n" % (len(channel), channel)
+        + b":%d\r\n" % count
+    )
+
+
+class Relay:
+    def __init__(self):
+        self.channels = {}
+
+    async def read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # Inline command, e.g. "PING" typed into a terminal
+            return line.strip().split()
+        args = []
+        for _ in range(int(line[1:])):
+            header = await reader.readline()
+            length = int(header[1:])
+            data = await reader.readexactly(length + 2)
+            args.append(data[:-2])
+        return args
+
+    def publish(self, channel, message):
+        frame = encode_command(b"message", channel, message)
+        receivers = 0
+        for writer in list(self.channels.get(channel, ())):
+            if writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+                logger.warning("Dropping slow subscriber on %s", channel.decode())
+                self.drop(writer)
+                writer.close()
+                continue
+            writer.write(frame)
+            receivers += 1
+        return receivers
+
+    def drop(self, writer):
+        for channel in list(self.channels):
+            subscribers = self.channels[channel]
+            subscribers.discard(writer)
+            if not subscribers:
+                del self.channels[channel]
+
+    async def handle(self, reader, writer):
+        subscribed = set()
+        try:
+            while True:
+                command = await self.read_command(reader)
+                if command is None:
+                    break
+                if not command:
+                    continue
+                name = command[0].upper()
+                if name == b"PUBLISH" and len(command) == 3:
+                    writer.write(f":{self.publish(command[1], command[2])}\r\n".encode())
+                elif name == b"SUBSCRIBE":
+                    for channel in command[1:]:
+                        self.channels.setdefault(channel, set()).add(writer)
+                        subscribed.add(channel)
+                        writer.write(confirmation(b"subscribe", channel, len(subscribed)))
+                elif name == b"UNSUBSCRIBE":
+                    for channel in command[1:] or list(subscribed):
+                        self.channels.get(channel, set()).discard(writer)
+                        subscribed.discard(channel)
+                        writer.write(confirmation(b"unsubscribe", channel, len(subscribed)))
+                elif name == b"PING":
+                    writer.write(b"+PONG\r\n")
+                else:
+                    writer.write(f"-ERR unsupported command '{name.decode(errors='replace')}'\r\n".encode())
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.drop(writer)
+            writer.close()
+
+    async def serve(self, address):
+        if address.startswith("unix://"):
+            server = await asyncio.start_unix_server(self.handle, path=address[len("unix://"):])
+        else:
+            host, _, port = address.rpartition(":")
+            server = await asyncio.start_server(self.handle, host or "127.0.0.1", int(port))
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,11 @@
+from rest_framework import serializers
+from .models import AuditLog
+
+
+class AuditLogSerializer(serializers.ModelSerializer):
+    actor = serializers.CharField(source="user.username", default=None, read_only=True)
+
+    class Meta:
+        model = AuditLog
+        fields = ["id", "org", "user", "actor", "action", "object_id", "timestamp", "metadata"]
+        read_only_fields = fields
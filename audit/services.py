@@ -1,31 +1,83 @@
+from django.db import transaction
+from django.utils import timezone
+
 from .models import AuditLog
+from .writer import get_config, get_writer, normalize, write_batch
+
+
+def _build_entry(user, action, object_id, metadata, org_id=None):
+    if org_id is None:
+        org_id = getattr(getattr(user, "org", None), "pk", None)
+
+    if not org_id:
+        # Don't fail if org is missing, but log it
+        print(f"Warning: Audit log for action '{action}' has no org")
+
+    return {
+        "user_id": getattr(user, "pk", None),
+        "org_id": org_id,
+        "action": action,
+        "object_id": object_id,
+        "metadata": metadata or {},
+        "timestamp": timezone.now(),
+    }
 
 
 def log_event(user, action, object_id=None, metadata=None):
     """
     Log an audit event
-    
+
     Args:
         user: The user performing the action
         action: The action being logged (e.g., 'create_assessment', 'submit_assessment')
         object_id: The ID of the object being acted upon
         metadata: Additional metadata about the action
-    
+
     Returns:
-        AuditLog: The created audit log entry
+        AuditLog: The audit log entry. With AUDIT_LOG["ASYNC"] enabled the
+        entry is queued for the background writer once the surrounding
+        transaction commits (dropped if it rolls back) and returned unsaved.
     """
-    org = getattr(user, "org", None)
-    
-    if not org:
-        # Don't fail if org is missing, but log it
-        print(f"Warning: Audit log for action '{action}' has no org")
-    
-    return AuditLog.objects.create(
-        user=user,
+    entry = _build_entry(user, action, object_id, metadata)
+    if not get_config()["ASYNC"]:
+        return write_batch([normalize(entry)[1]])[0]
+
+    transaction.on_commit(lambda: get_writer().enqueue(entry))
+    return AuditLog(
+        user_id=entry["user_id"],
+        org_id=entry["org_id"],
         action=action,
         object_id=object_id,
-        org=org,
-        metadata=metadata or {}
+        metadata=entry["metadata"],
+        timestamp=entry["timestamp"],
     )
 
 
+def log_events(user, events, org_id=None):
+    """
+    Log several audit events for one user in a single batch
+
+    Args:
+        user: The user performing the actions (None for scheduled jobs)
+        events: Iterable of (action, object_id, metadata) tuples
+        org_id: Org to file the events under; defaults to the user's org
+
+    Returns:
+        list[AuditLog]: The saved entries, or [] when AUDIT_LOG["ASYNC"]
+        queues them for the background writer (after commit).
+    """
+    entries = [
+        _build_entry(user, action, object_id, metadata, org_id) for action, object_id, metadata in events
+    ]
+    if not entries:
+        return []
+    if not get_config()["ASYNC"]:
+        return write_batch([normalize(entry)[1] for entry in entries])
+
+    def enqueue():
+        writer = get_writer()
+        for entry in entries:
+            writer.enqueue(entry)
+
+    transaction.on_commit(enqueue)
+    return []
@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# Sent after a batch of AuditLog rows has been committed. Arguments: logs
+# (saved AuditLog instances with ids, in id order).
+events_written = Signal()
+
+# Sent after archival removed rows from the hot table. Arguments: org_ids.
+events_purged = Signal()
@@ -1,3 +1,104 @@
-from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
 
-# Create your views here.
+from permissions.rbac import IsAdminOrReviewer
+from . import archive
+from .models import AuditLog
+from .pagination import KeysetPagination
+from .serializers import AuditLogSerializer
+
+
+class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Org-scoped audit search.
+
+    Filters: action, actor (user id), object_id, since / until (ISO 8601).
+    Results are newest first and paginated with an opaque ``cursor``; once
+    the hot table is exhausted, pages continue into archived segments.
+    """
+    serializer_class = AuditLogSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrReviewer]
+    pagination_class = KeysetPagination
+    timestamp_field = serializers.DateTimeField()
+
+    def get_queryset(self):
+        user = self.request.user
+        qs = AuditLog.objects.filter(org=user.org).select_related("user")
+
+        if self.action != "list":
+            return qs
+
+        filters = self.get_filters()
+        if filters["action"]:
+            qs = qs.filter(action=filters["action"])
+        if filters["actor"] is not None:
+            qs = qs.filter(user_id=filters["actor"])
+        if filters["object_id"] is not None:
+            qs = qs.filter(object_id=filters["object_id"])
+        if filters["since"]:
+            qs = qs.filter(timestamp__gte=filters["since"])
+        if filters["until"]:
+            qs = qs.filter(timestamp__lt=filters["until"])
+
+        return qs
+
+    def list(self, request, *args, **kwargs):
+        paginator = self.paginator
+        page = paginator.paginate_queryset(self.get_queryset(), request, view=self)
+        results = list(self.get_serializer(page, many=True).data)
+
+        # Past the end of the hot table: continue into archived segments
+        if not paginator.has_next and archive.is_enabled():
+            seen = {row["id"] for row in results}
+            archived = [
+                row for row in archive.search(
+                    request.user.org_id,
+                    before=paginator.position,
+                    limit=paginator.size - len(results) + 1,
+                    **self.get_filters(),
+                )
+                if row["id"] not in seen
+            ]
+            for row in archived:
+                row["timestamp"] = self.timestamp_field.to_representation(parse_datetime(row["timestamp"]))
+            if archived:
+                paginator.extend(results, archived, lambda row: (parse_datetime(row["timestamp"]), row["id"]))
+
+        return paginator.get_paginated_response(results)
+
+    def get_filters(self):
+        if not hasattr(self, "_filters"):
+            params = self.request.query_params
+            actor = params.get("actor")
+            object_id = params.get("object_id")
+            self._filters = {
+                "action": params.get("action") or None,
+                "actor": self._parse_int("actor", actor) if actor else None,
+                "object_id": self._parse_int("object_id", object_id) if object_id else None,
+                "since": self._parse_time("since"),
+                "until": self._parse_time("until"),
+            }
+        return self._filters
+
+    def _parse_time(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({name: "Expected an ISO 8601 datetime."})
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def _parse_int(self, name, value):
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({name: "Expected an integer."})
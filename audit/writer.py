@@ -0,0 +1,337 @@
+"""
+Buffered audit writer.
+
+log_event() hands entries to the process-wide AuditWriter, which appends each
+entry to a local spool segment and queues it in memory. A background thread
+flushes the queue with bulk_create once BATCH_SIZE entries are waiting or
+FLUSH_INTERVAL seconds have passed.
+
+A spool segment is only deleted after its rows are committed, so events
+survive a crash: segments left behind by a dead process are replayed the next
+time a writer starts (or by ``manage.py flush_audit_spool``). Delivery is
+at-least-once; a crash between commit and unlink can replay a batch.
+
+A batch that still fails after MAX_ATTEMPTS flushes is written one row at a
+time so it cannot hold up the events queued behind it. A row whose acting
+user is gone is stored without the user (its id kept in metadata); rows
+that fail anyway are appended to SPOOL_DIR/dead/ for manual repair.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import chain
+from .models import AuditLog
+from .signals import events_written
+
+try:
+    import fcntl
+except ImportError:  # Windows: segments are only replayed by the management command
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ASYNC": True,
+    "BATCH_SIZE": 200,
+    "FLUSH_INTERVAL": 0.5,
+    "SPOOL_DIR": None,
+    "FSYNC": False,
+    "MAX_ATTEMPTS": 5,  # flushes of one batch before it is written row by row
+}
+
+SEGMENT_SUFFIX = ".jsonl"
+DEAD_LETTER_DIR = "dead"
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "AUDIT_LOG", {}))
+    if not config["SPOOL_DIR"]:
+        config["SPOOL_DIR"] = Path(settings.BASE_DIR) / "var" / "audit_spool"
+    return config
+
+
+def build_log(entry):
+    """Turn a spooled entry dict back into an unsaved AuditLog"""
+    return AuditLog(
+        user_id=entry.get("user_id"),
+        org_id=entry.get("org_id"),
+        action=entry["action"],
+        object_id=entry.get("object_id"),
+        metadata=entry.get("metadata") or {},
+        timestamp=parse_datetime(entry["timestamp"]),
+    )
+
+
+def normalize(entry):
+    """
+    Round-trip an entry through JSON; returns (spool line, entry). Rows are
+    always built from the decoded form so live writes, spool replays and
+    hash chain verification all see identical values.
+    """
+    line = json.dumps(entry, cls=DjangoJSONEncoder)
+    return line, json.loads(line)
+
+
+def write_batch(entries, batch_size=None):
+    """Persist a list of normalized entry dicts in one transaction and return the rows"""
+    logs = [build_log(entry) for entry in entries]
+    with transaction.atomic():
+        finish_chain = chain.link(logs)
+        created = AuditLog.objects.bulk_create(logs, batch_size=batch_size)
+        finish_chain()
+        transaction.on_commit(lambda: _announce(created))
+    return created
+
+
+def salvage(entries, spool_dir):
+    """
+    Write entries one at a time after their batch kept failing; returns the
+    number written. Rows that cannot be written go to the dead-letter file.
+    """
+    written, dead = 0, []
+    for entry in entries:
+        attempts = [entry]
+        if entry.get("user_id") is not None:
+            # Most often the acting user was deleted before the flush
+            attempts.append({
+                **entry,
+                "user_id": None,
+                "metadata": {**(entry.get("metadata") or {}), "deleted_user_id": entry["user_id"]},
+            })
+        for attempt in attempts:
+            try:
+                write_batch([attempt])
+            except Exception:
+                continue
+            written += 1
+            break
+        else:
+            dead.append(entry)
+
+    if dead:
+        dead_dir = Path(spool_dir) / DEAD_LETTER_DIR
+        dead_dir.mkdir(parents=True, exist_ok=True)
+        path = dead_dir / f"{os.getpid()}-{time.time_ns()}{SEGMENT_SUFFIX}"
+        with open(path, "w", encoding="utf-8") as f:
+            for entry in dead:
+                f.write(json.dumps(entry, cls=DjangoJSONEncoder) + "\n")
+        logger.error("Moved %s undeliverable audit events to %s", len(dead), path)
+    return written
+
+
+def _announce(logs):
+    # Feed caches and live streams must never make an audit write fail
+    for receiver, result in events_written.send_robust(sender=AuditLog, logs=logs):
+        if isinstance(result, Exception):
+            logger.error("events_written receiver %r failed: %r", receiver, result)
+
+
+class Segment:
+    """An open, locked spool file holding entries not yet committed"""
+
+    def __init__(self, path, handle):
+        self.path = path
+        self.handle = handle
+
+    @classmethod
+    def create(cls, spool_dir):
+        name = f"{os.getpid()}-{time.time_ns()}{SEGMENT_SUFFIX}"
+        path = Path(spool_dir) / name
+        handle = open(path, "a", encoding="utf-8")
+        if fcntl:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return cls(path, handle)
+
+    @classmethod
+    def claim(cls, path):
+        """Open an orphaned segment, or return None if its owner is alive"""
+        handle = open(path, "a+", encoding="utf-8")
+        if fcntl:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return None
+        return cls(Path(path), handle)
+
+    def read(self):
+        self.handle.flush()
+        with open(self.path, encoding="utf-8") as f:
+            # A torn final line means the process died mid-write; skip it
+            entries = []
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logger.warning("Skipping corrupt audit spool line in %s", self.path)
+            return entries
+
+    def close(self):
+        self.handle.close()
+
+    def discard(self):
+        self.handle.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class AuditWriter:
+    """In-process audit queue backed by an append-only spool"""
+
+    def __init__(self, spool_dir, batch_size=200, flush_interval=0.5, fsync=False, max_attempts=5, autostart=True):
+        self.spool_dir = Path(spool_dir)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_attempts = max_attempts
+        self.autostart = autostart
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pending = []
+        self.segment = None
+        # Segments whose flush failed; retried before newer batches
+        self.undelivered = []
+        self.head_failures = 0
+        self.thread = None
+
+    def _ensure_ready(self):
+        if self.pid != os.getpid():
+            # Forked: the parent still owns (and will flush) what it queued
+            self._reset()
+        if self.segment is None:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            self.segment = Segment.create(self.spool_dir)
+        if self.autostart and self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self.thread.start()
+
+    def enqueue(self, entry):
+        line, entry = normalize(entry)
+        with self.lock:
+            self._ensure_ready()
+            self.segment.handle.write(line + "\n")
+            self.segment.handle.flush()
+            if self.fsync:
+                os.fsync(self.segment.handle.fileno())
+            self.pending.append(entry)
+            if len(self.pending) >= self.batch_size:
+                self.wakeup.set()
+
+    def flush(self):
+        """Write everything queued so far; returns the number of rows written"""
+        with self.flush_lock:
+            with self.lock:
+                if self.pending:
+                    batch, self.pending = self.pending, []
+                    # Rotate so the closed segment holds exactly this batch
+                    self.undelivered.append((self.segment, batch))
+                    self.segment = Segment.create(self.spool_dir)
+
+            written = 0
+            while self.undelivered:
+                segment, batch = self.undelivered[0]
+                try:
+                    write_batch(batch, batch_size=self.batch_size)
+                    written += len(batch)
+                except Exception:
+                    self.head_failures += 1
+                    if self.head_failures < self.max_attempts:
+                        raise
+                    logger.exception(
+                        "Audit batch failed %s times; writing its %s rows one by one", self.head_failures, len(batch)
+                    )
+                    written += salvage(batch, self.spool_dir)
+                self.head_failures = 0
+                self.undelivered.pop(0)
+                segment.discard()
+            return written
+
+    def replay_orphans(self):
+        """Deliver segments left behind by processes that are gone"""
+        if not self.spool_dir.exists():
+            return 0
+        own = {self.segment.path} if self.segment else set()
+        own.update(segment.path for segment, _ in self.undelivered)
+        replayed = 0
+        for path in sorted(self.spool_dir.glob(f"*{SEGMENT_SUFFIX}")):
+            if path in own:
+                continue
+            segment = Segment.claim(path)
+            if segment is None:
+                continue
+            entries = segment.read()
+            if entries:
+                try:
+                    write_batch(entries, batch_size=self.batch_size)
+                    replayed += len(entries)
+                except Exception:
+                    logger.exception("Replaying audit spool %s failed; writing its rows one by one", path)
+                    replayed += salvage(entries, self.spool_dir)
+            segment.discard()
+        if replayed:
+            logger.info("Replayed %s audit events from spool", replayed)
+        return replayed
+
+    def _run(self):
+        if fcntl:
+            try:
+                self.replay_orphans()
+            except Exception:
+                logger.exception("Audit spool replay failed")
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # Rows stay in their spool segment and are retried next tick
+                logger.exception("Audit flush failed")
+            finally:
+                close_old_connections()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = get_config()
+                _writer = AuditWriter(
+                    spool_dir=config["SPOOL_DIR"],
+                    batch_size=config["BATCH_SIZE"],
+                    flush_interval=config["FLUSH_INTERVAL"],
+                    fsync=config["FSYNC"],
+                    max_attempts=config["MAX_ATTEMPTS"],
+                )
+                atexit.register(_flush_at_exit)
+    return _writer
+
+
+def _flush_at_exit():
+    if _writer is not None and _writer.pid == os.getpid():
+        try:
+            _writer.flush()
+        except Exception:
+            logger.exception("Audit flush at exit failed; events remain in spool")
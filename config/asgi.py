@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Deliver queued scoring jobs from this web process (SCORING_OUTBOX["AUTOSTART"])
+from assessments import scoring  # noqa: E402
+
+scoring.autostart()
@@ -1,8 +1,11 @@
+import sys
 from pathlib import Path
 
 # BASE DIR
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+TESTING = len(sys.argv) > 1 and sys.argv[1] == "test"
+
 
 # SECURITY
 SECRET_KEY = 'django-insecure-change-this-key'
@@ -39,6 +42,8 @@ INSTALLED_APPS = [
 
     # Cross-cutting
     'audit',
+    'dashboard',
+    'search',
 ]
 
 
@@ -86,6 +91,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts so concurrent
+            # writers (e.g. the audit writer thread) wait instead of failing
+            # with "database is locked" on lock upgrade.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -138,3 +150,140 @@ SPECTACULAR_SETTINGS = {
     'VERSION': '1.0.0',
     'SERVE_INCLUDE_SCHEMA': False,
 }
+
+# AUDIT LOG WRITER
+# log_event() queues events and a background thread bulk-inserts them.
+# Tests write synchronously so rows are visible inside the test transaction.
+AUDIT_LOG = {
+    'ASYNC': not TESTING,
+    'BATCH_SIZE': 200,
+    'FLUSH_INTERVAL': 0.5,  # seconds
+    'SPOOL_DIR': BASE_DIR / 'var' / 'audit_spool',
+    'FSYNC': False,
+    'MAX_ATTEMPTS': 5,  # flushes of one batch before it is written row by row
+}
+
+# AUDIT ARCHIVE
+# manage.py archive_audit_logs (run daily from cron) moves rows older than
+# RETENTION_DAYS into compressed monthly segments under DIR.
+AUDIT_ARCHIVE = {
+    'DIR': BASE_DIR / 'var' / 'audit_archive',
+    'RETENTION_DAYS': 180,
+    'CHUNK_SIZE': 5000,
+    'PAUSE': 0.0,
+    'CODEC': 'gzip',  # 'zstd' needs the zstandard package
+}
+
+# DASHBOARD
+# Seconds a cached activity-feed head page may live. Writes patch it in
+# place; with a per-process cache (the default LocMemCache) other workers
+# only see new events after this expires, so prefer a shared cache backend.
+FEED_CACHE_TIMEOUT = 300
+
+# AUDIT LIVE STREAM (GET /api/activity/stream/)
+# 'local' fans out inside one process. With several workers use 'resp' and
+# point URL at Redis or at `manage.py audit_stream_relay`.
+AUDIT_STREAM = {
+    'BACKEND': 'local',
+    'URL': 'unix://' + str(BASE_DIR / 'var' / 'audit_stream.sock'),
+    'HEARTBEAT': 15,  # seconds between keep-alive comments
+    'MAX_DURATION': 300,  # seconds before the server ends a stream; clients resume via Last-Event-ID
+    'BACKLOG': 500,  # max missed events replayed on reconnect
+}
+
+# ASSESSMENT CAMPAIGNS (POST /api/assessment-campaigns/)
+# Campaigns over INLINE_LIMIT vendors run on a background thread; after a
+# restart finish them with `manage.py resume_assessment_campaigns`.
+ASSESSMENT_CAMPAIGNS = {
+    'CHUNK_SIZE': 500,  # vendors per bulk_create / audit batch / transaction
+    'INLINE_LIMIT': 200,  # larger campaigns run on a background thread
+}
+
+# EVIDENCE UPLOADS (POST /api/evidence/uploads/)
+# Chunks stream into TEMP_DIR until the upload completes; schedule
+# `manage.py purge_evidence_uploads` to drop uploads idle > STALE_HOURS.
+EVIDENCE_UPLOADS = {
+    'TEMP_DIR': BASE_DIR / 'var' / 'evidence_uploads',
+    'MAX_FILE_SIZE': 2 * 1024 ** 3,  # bytes
+    'MAX_CHUNK_SIZE': 16 * 1024 ** 2,  # bytes per PUT
+    'STALE_HOURS': 24,
+}
+
+# EVIDENCE DOWNLOADS (GET /api/evidence/{id}/download/)
+# Behind nginx set ACCEL_REDIRECT to an internal location aliasing
+# MEDIA_ROOT; behind Apache/lighttpd set SENDFILE = True.
+EVIDENCE_DOWNLOADS = {
+    'ACCEL_REDIRECT': None,  # e.g. '/protected-media/'
+    'SENDFILE': False,
+}
+
+# EVIDENCE EXPIRY
+# Run `manage.py sweep_evidence_expiry` daily; GET /api/evidence/expiring/
+# lists what expires within WARNING_DAYS.
+EVIDENCE_EXPIRY = {
+    'WARNING_DAYS': 30,
+    'CHUNK_SIZE': 1000,  # evidence rows per transaction / audit batch
+}
+
+# EVIDENCE PROCESSING
+# Uploaded files are sniffed, checksummed, text-extracted and (with
+# SCAN_COMMAND) virus-scanned on a process pool; see evidence/processors.py.
+# Tests run the processors inline. Backfill with `manage.py process_evidence`.
+EVIDENCE_PROCESSING = {
+    'INLINE': TESTING,
+    'WORKERS': None,  # None: one per CPU core
+    'PROCESSORS': [
+        'evidence.processors.sniff_mime',
+        'evidence.processors.checksum',
+        'evidence.processors.extract_text',
+        'evidence.processors.command_scan',
+    ],
+    'MAX_TEXT_CHARS': 200_000,
+    'SCAN_COMMAND': None,  # e.g. ['clamdscan', '--no-summary', '-']
+}
+
+# SCORING SERVICE (services/scoring.py)
+# One pooled keep-alive session per process, retries with jittered backoff
+# and a circuit breaker that fails fast for BREAKER_RESET seconds after
+# BREAKER_THRESHOLD consecutive failures. Local stub: python -m services.scoring_stub
+SCORING_SERVICE = {
+    'URL': 'http://scoring-service:8001',
+    'CONNECT_TIMEOUT': 1.0,  # seconds
+    'TIMEOUT': 5.0,  # seconds to wait for a response
+    'RETRIES': 2,
+    'BACKOFF': 0.2,  # seconds, doubled per retry (full jitter)
+    'BACKOFF_MAX': 2.0,
+    'POOL_SIZE': 10,  # keep-alive connections
+    'BREAKER_THRESHOLD': 5,
+    'BREAKER_RESET': 30,  # seconds
+    'BATCH_SIZE': 200,  # assessments per POST /score/batch (manage.py rescore_assessments)
+    'BATCH_CONCURRENCY': 4,  # batches in flight
+    'BATCH_TIMEOUT': 30.0,  # seconds
+}
+
+# SCORING OUTBOX (assessments/scoring.py)
+# Remediation close and other triggers write a ScoringJob row in their own
+# transaction; a dispatcher thread per web process (AUTOSTART) or
+# `manage.py dispatch_scoring_jobs --loop` delivers them. Tests dispatch explicitly.
+SCORING_OUTBOX = {
+    'AUTOSTART': not TESTING,
+    'BATCH_SIZE': 100,
+    'CONCURRENCY': 4,  # scoring calls in flight per dispatcher
+    'MAX_ATTEMPTS': 10,
+    'BACKOFF': 5,  # seconds, doubled per attempt
+    'BACKOFF_MAX': 3600,
+    'LEASE': 300,  # seconds before a stuck batch is picked up again
+    'POLL_INTERVAL': 5,
+}
+
+# REVIEW SCORING (POST /api/reviews/{id}/decision/)
+# 'async': approvals are recorded at once with scoring_status "scoring_pending"
+# and scored through the outbox; poll GET /api/reviews/{id}/score/?wait=10.
+# Orgs in SYNC_ORGS (or everyone with MODE 'sync') block on the service and
+# get 502 if it fails.
+REVIEW_SCORING = {
+    'MODE': 'async',
+    'SYNC_ORGS': [],  # org ids
+    'MAX_WAIT': 30,  # seconds a score request may wait
+    'POLL_INTERVAL': 0.5,
+}
@@ -27,6 +27,8 @@ urlpatterns = [
     path('api/', include('reviews.urls')),
     path('api/', include('remediations.urls')),
     path('api/', include('dashboard.urls')),
+    path('api/', include('audit.urls')),
+    path('api/', include('search.urls')),
 
 
     # SWAGGER
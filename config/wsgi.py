@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Deliver queued scoring jobs from this web process (SCORING_OUTBOX["AUTOSTART"])
+from assessments import scoring  # noqa: E402
+
+scoring.autostart()
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class DashboardConfig(AppConfig):
     name = 'dashboard'
+
+    def ready(self):
+        from audit.signals import events_purged, events_written
+        from . import feed, signals
+        signals.connect()
+        events_written.connect(feed.on_events_written, dispatch_uid="dashboard-feed-append")
+        events_purged.connect(feed.on_events_purged, dispatch_uid="dashboard-feed-purge")
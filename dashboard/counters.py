@@ -0,0 +1,123 @@
+"""
+Incrementally maintained per-org dashboard counters.
+
+Saves and deletes of tracked models, and Assessment transitions, adjust
+OrgStats.counts through the signal handlers in dashboard/signals.py. Other
+code that writes with QuerySet.update() or bulk_create() bypasses those
+signals and must call apply() itself. rebuild() recomputes counters from
+live rows and check() reports drift between the two.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from assessments.models import Assessment
+from remediations.models import Remediation
+from reviews.models import Review
+from vendors.models import Vendor
+from .models import OrgStats
+
+# model -> {field: counter key prefix}
+TRACKED = {
+    Assessment: {"status": "assessments.status"},
+    Review: {"decision": "reviews.decision"},
+    Remediation: {"status": "remediations.status"},
+    Vendor: {"tier": "vendors.tier", "status": "vendors.status"},
+}
+
+UNSET = "unset"
+
+
+def counter_key(prefix, value):
+    return f"{prefix}.{value or UNSET}"
+
+
+def keys_for(model, values):
+    """Counter keys a row with the given {field: value} contributes to"""
+    return [counter_key(prefix, values.get(field)) for field, prefix in TRACKED[model].items()]
+
+
+def apply(org_id, deltas):
+    """Add {key: delta} to an org's counters"""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not org_id or not deltas:
+        return
+    with transaction.atomic():
+        stats, _ = OrgStats.objects.select_for_update().get_or_create(org_id=org_id)
+        for key, delta in deltas.items():
+            stats.counts[key] = stats.counts.get(key, 0) + delta
+        stats.save(update_fields=["counts", "updated_at"])
+
+
+def get_counts(org_id):
+    return OrgStats.objects.filter(pk=org_id).values_list("counts", flat=True).first() or {}
+
+
+def summarize(counts):
+    """Shape raw counters for the /stats/ response"""
+    def group(prefix):
+        prefix = f"{prefix}."
+        return {key[len(prefix):]: value for key, value in counts.items() if key.startswith(prefix) and value}
+
+    assessments = group("assessments.status")
+    reviews = group("reviews.decision")
+    remediations = group("remediations.status")
+    return {
+        "total_assessments": sum(assessments.values()),
+        "total_reviews": sum(reviews.values()),
+        "total_remediations": sum(remediations.values()),
+        "assessments_by_status": assessments,
+        "reviews_by_decision": reviews,
+        "remediations_by_status": remediations,
+        "vendors_by_tier": group("vendors.tier"),
+        "vendors_by_status": group("vendors.status"),
+    }
+
+
+# -------------------------
+# Drift correction
+# -------------------------
+def live_counts(org_ids=None):
+    """Recount tracked rows with one GROUP BY per field; returns {org_id: Counter}"""
+    result = defaultdict(Counter)
+    for model, fields in TRACKED.items():
+        for field, prefix in fields.items():
+            qs = model.objects.all()
+            if org_ids is not None:
+                qs = qs.filter(org_id__in=org_ids)
+            for row in qs.values("org_id", field).annotate(n=Count("pk")).order_by():
+                if row["org_id"]:
+                    result[row["org_id"]][counter_key(prefix, row[field])] += row["n"]
+    return result
+
+
+def rebuild(org_ids=None):
+    """Replace stored counters with live counts; returns the orgs rebuilt"""
+    with transaction.atomic():
+        live = live_counts(org_ids)
+        stale = OrgStats.objects.all()
+        if org_ids is not None:
+            stale = stale.filter(org_id__in=org_ids)
+        stale.exclude(org_id__in=list(live)).delete()
+        for org_id, counts in live.items():
+            OrgStats.objects.update_or_create(org_id=org_id, defaults={"counts": dict(counts)})
+    return sorted(live)
+
+
+def check(org_ids):
+    """Compare stored and live counters; returns {org_id: {key: (stored, live)}} for drifted orgs"""
+    live = live_counts(org_ids)
+    stored = dict(OrgStats.objects.filter(org_id__in=org_ids).values_list("org_id", "counts"))
+    drift = {}
+    for org_id in org_ids:
+        expected = live.get(org_id, Counter())
+        actual = stored.get(org_id, {})
+        diff = {
+            key: (actual.get(key, 0), expected.get(key, 0))
+            for key in set(expected) | set(actual)
+            if actual.get(key, 0) != expected.get(key, 0)
+        }
+        if diff:
+            drift[org_id] = diff
+    return drift
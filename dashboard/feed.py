@@ -0,0 +1,135 @@
+"""
+Activity feed backed by AuditLog.
+
+The newest page of each org's feed is kept in the cache and patched in
+place when audit rows are written (audit.signals.events_written), so the
+common "open the dashboard" request needs no query at all. Archival purges
+drop the cached page. FEED_CACHE_TIMEOUT bounds staleness when workers use
+a per-process cache backend; use a shared backend in multi-worker setups.
+
+Every write bumps a per-org generation counter (an atomic cache incr) and a
+cached page is only served while its generation is the current one. A page
+built from a query that raced with a write, or patched from a head another
+writer had already moved past, is therefore never served, only rebuilt.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from audit.models import AuditLog
+from .serializers import ActivityFeedSerializer
+
+HEAD_SIZE = 50
+
+
+def cache_key(org_id):
+    return f"dashboard:feed:{org_id}"
+
+
+def generation_key(org_id):
+    return f"dashboard:feed:{org_id}:generation"
+
+
+def cache_timeout():
+    return getattr(settings, "FEED_CACHE_TIMEOUT", 300)
+
+
+def queryset(org_id):
+    return (
+        AuditLog.objects.filter(org_id=org_id)
+        .select_related("user")
+        .only("action", "object_id", "timestamp", "user__username")
+    )
+
+
+def serialize(logs, usernames=None):
+    """Feed entries for AuditLog rows; ``usernames`` avoids touching log.user"""
+    entries = []
+    for log in logs:
+        if usernames is not None:
+            actor = usernames.get(log.user_id)
+        else:
+            actor = log.user.username if log.user_id else None
+        entries.append({
+            "id": log.pk,
+            "actor": actor,
+            "action": log.action,
+            "object_id": log.object_id,
+            "timestamp": log.timestamp,
+        })
+    return ActivityFeedSerializer(entries, many=True).data
+
+
+def generation(org_id):
+    """Current generation; read it before querying the page you will cache"""
+    cache.add(generation_key(org_id), 0, timeout=None)
+    return cache.get(generation_key(org_id))
+
+
+def bump(org_id):
+    """Start a new generation, so every page cached so far stops being served"""
+    key = generation_key(org_id)
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr: no generation is current until it is back
+        cache.delete(cache_key(org_id))
+        return None
+
+
+def get_head(org_id):
+    values = cache.get_many([cache_key(org_id), generation_key(org_id)])
+    head = values.get(cache_key(org_id))
+    current = values.get(generation_key(org_id))
+    if head is None or current is None or head.get("generation") != current:
+        return None
+    return head
+
+
+def set_head(org_id, results, has_next, generation):
+    cache.set(
+        cache_key(org_id),
+        {"results": list(results), "has_next": has_next, "generation": generation},
+        cache_timeout(),
+    )
+
+
+def invalidate(org_ids):
+    for org_id in org_ids:
+        bump(org_id)
+    cache.delete_many([cache_key(org_id) for org_id in org_ids])
+
+
+# -------------------------
+# Signal receivers
+# -------------------------
+def on_events_written(sender, logs, **kwargs):
+    by_org = {}
+    for log in logs:
+        if log.org_id:
+            by_org.setdefault(log.org_id, []).append(log)
+
+    # Always bump, even with nothing cached: a request may be building the page right now
+    generations = {org_id: bump(org_id) for org_id in by_org}
+    heads = cache.get_many([cache_key(org_id) for org_id in by_org])
+    if not heads:
+        return
+
+    user_ids = {log.user_id for log in logs if log.user_id}
+    User = get_user_model()
+    usernames = dict(User.objects.filter(pk__in=user_ids).values_list("pk", "username")) if user_ids else {}
+
+    for org_id, org_logs in by_org.items():
+        head = heads.get(cache_key(org_id))
+        current = generations[org_id]
+        # Only patch the page this write directly follows; anything else is already stale
+        if head is None or current is None or head.get("generation") != current - 1:
+            continue
+        fresh = serialize(sorted(org_logs, key=lambda log: (log.timestamp, log.pk), reverse=True), usernames)
+        results = list(fresh) + head["results"]
+        set_head(org_id, results[:HEAD_SIZE], head["has_next"] or len(results) > HEAD_SIZE, current)
+
+
+def on_events_purged(sender, org_ids, **kwargs):
+    invalidate(org_ids)
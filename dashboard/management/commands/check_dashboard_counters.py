@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import counters
+from orgs.models import Organization
+
+
+class Command(BaseCommand):
+    help = "Compare dashboard counters with live counts on a random sample of orgs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sample", type=int, default=20, help="Number of orgs to check")
+        parser.add_argument("--org", type=int, action="append", help="Check this org instead of sampling (repeatable)")
+        parser.add_argument("--fix", action="store_true", help="Rebuild counters for orgs that drifted")
+
+    def handle(self, *args, **options):
+        org_ids = options["org"] or list(
+            Organization.objects.order_by("?").values_list("id", flat=True)[: options["sample"]]
+        )
+        drift = counters.check(org_ids)
+
+        for org_id, keys in sorted(drift.items()):
+            details = ", ".join(f"{key}: stored {stored} / live {live}" for key, (stored, live) in sorted(keys.items()))
+            self.stdout.write(self.style.WARNING(f"⚠️ org {org_id}: {details}"))
+
+        if drift and options["fix"]:
+            counters.rebuild(list(drift))
+            self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt counters for {len(drift)} orgs"))
+        elif drift:
+            raise SystemExit(1)
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Counters match live counts for {len(org_ids)} orgs"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import counters
+
+
+class Command(BaseCommand):
+    help = "Recompute dashboard counters from live rows (all orgs, or --org)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", type=int, action="append", help="Only rebuild this org (repeatable)")
+
+    def handle(self, *args, **options):
+        rebuilt = counters.rebuild(options["org"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt dashboard counters for {len(rebuilt)} orgs"))
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('orgs', '0003_remove_organization_is_active_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrgStats',
+            fields=[
+                ('org', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='orgs.organization')),
+                ('counts', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,3 +1,17 @@
 from django.db import models
+from orgs.models import Organization
 
-# Create your models here.
+
+class OrgStats(models.Model):
+    """
+    Denormalized dashboard counters for one org, keyed by org so /stats/ is a
+    single primary-key lookup. ``counts`` maps keys such as
+    "assessments.status.submitted" or "vendors.tier.HIGH" to row counts and is
+    maintained by dashboard.counters.
+    """
+    org = models.OneToOneField(Organization, on_delete=models.CASCADE, primary_key=True)
+    counts = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for org {self.org_id}"
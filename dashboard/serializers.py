@@ -4,9 +4,15 @@ class DashboardStatsSerializer(serializers.Serializer):
     total_assessments = serializers.IntegerField()
     total_reviews = serializers.IntegerField()
     total_remediations = serializers.IntegerField()
+    assessments_by_status = serializers.DictField(child=serializers.IntegerField())
+    reviews_by_decision = serializers.DictField(child=serializers.IntegerField())
+    remediations_by_status = serializers.DictField(child=serializers.IntegerField())
+    vendors_by_tier = serializers.DictField(child=serializers.IntegerField())
+    vendors_by_status = serializers.DictField(child=serializers.IntegerField())
 
 class ActivityFeedSerializer(serializers.Serializer):
-    actor = serializers.CharField()
+    id = serializers.IntegerField()
+    actor = serializers.CharField(allow_null=True)
     action = serializers.CharField()
-    entity = serializers.CharField()
+    object_id = serializers.IntegerField(allow_null=True)
     timestamp = serializers.DateTimeField()
@@ -0,0 +1,57 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_init, post_save
+
+from assessments.models import Assessment
+from assessments.signals import status_changed
+from . import counters
+from .counters import counter_key
+
+
+def _snapshot(instance):
+    # Read __dict__ directly so deferred fields never trigger a query
+    fields = counters.TRACKED[type(instance)]
+    values = {field: instance.__dict__.get(field) for field in fields}
+    return instance.__dict__.get("org_id"), values
+
+
+def remember_state(sender, instance, **kwargs):
+    instance._counter_state = _snapshot(instance)
+
+
+def count_save(sender, instance, created, **kwargs):
+    org_id, values = _snapshot(instance)
+    if created:
+        counters.apply(org_id, Counter(counters.keys_for(sender, values)))
+    else:
+        old_org_id, old_values = getattr(instance, "_counter_state", (org_id, values))
+        if (old_org_id, old_values) != (org_id, values):
+            removed = Counter(counters.keys_for(sender, old_values))
+            added = Counter(counters.keys_for(sender, values))
+            if old_org_id == org_id:
+                added.subtract(removed)
+                counters.apply(org_id, added)
+            else:
+                counters.apply(old_org_id, {key: -n for key, n in removed.items()})
+                counters.apply(org_id, added)
+    instance._counter_state = (org_id, values)
+
+
+def count_delete(sender, instance, **kwargs):
+    org_id, values = getattr(instance, "_counter_state", None) or _snapshot(instance)
+    counters.apply(org_id, {key: -1 for key in counters.keys_for(sender, values)})
+
+
+def count_transition(sender, org_id, previous, status, count, instance=None, **kwargs):
+    prefix = counters.TRACKED[sender]["status"]
+    counters.apply(org_id, {counter_key(prefix, previous): -count, counter_key(prefix, status): count})
+    if instance is not None:
+        instance._counter_state = _snapshot(instance)
+
+
+def connect():
+    for model in counters.TRACKED:
+        post_init.connect(remember_state, sender=model, dispatch_uid=f"dashboard-init-{model.__name__}")
+        post_save.connect(count_save, sender=model, dispatch_uid=f"dashboard-save-{model.__name__}")
+        post_delete.connect(count_delete, sender=model, dispatch_uid=f"dashboard-delete-{model.__name__}")
+    status_changed.connect(count_transition, sender=Assessment, dispatch_uid="dashboard-assessment-transition")
@@ -1,18 +1,213 @@
+from datetime import timedelta
+
 from rest_framework.test import APITestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils import timezone
+
+from assessments.models import Assessment
+from audit.models import AuditLog
+from audit.services import log_event
+from audit.signals import events_purged
+from orgs.models import Organization
+from remediations.models import Remediation
+from templates.models import Template
+from vendors.models import Vendor
+from . import counters, feed
+from .models import OrgStats
 
 User = get_user_model()
 
 class DashboardTests(APITestCase):
     def setUp(self):
-        self.user = User.objects.create_user(username='test', password='pass', tenant_id=1)
+        self.org = Organization.objects.create(name='Org')
+        self.user = User.objects.create_user(username='test', password='pass', org=self.org)
         self.client.force_authenticate(user=self.user)
 
     def test_stats_endpoint(self):
-        response = self.client.get('/dashboard/stats/')
+        response = self.client.get('/api/stats/')
         self.assertEqual(response.status_code, 200)
         self.assertIn('total_assessments', response.data)
 
     def test_activity_endpoint(self):
-        response = self.client.get('/dashboard/activity/')
+        response = self.client.get('/api/activity/')
         self.assertEqual(response.status_code, 200)
+
+
+class DashboardCounterTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name='Org')
+        self.user = User.objects.create_user(username='test', password='pass', org=self.org)
+        self.vendor = Vendor.objects.create(org=self.org, name='V', tier='HIGH')
+        self.template = Template.objects.create(org=self.org, name='T')
+        self.client.force_authenticate(user=self.user)
+
+    def create_assessment(self):
+        return Assessment.objects.create(org=self.org, vendor=self.vendor, template=self.template)
+
+    def test_counters_follow_writes(self):
+        first = self.create_assessment()
+        self.create_assessment()
+        first.status = Assessment.STATUS_SUBMITTED
+        first.save()
+        Remediation.objects.create(org_id=self.org.id, assessment=first, issue='x')
+
+        counts = counters.get_counts(self.org.id)
+        self.assertEqual(counts['assessments.status.assigned'], 1)
+        self.assertEqual(counts['assessments.status.submitted'], 1)
+        self.assertEqual(counts['remediations.status.open'], 1)
+        self.assertEqual(counts['vendors.tier.HIGH'], 1)
+
+        Assessment.objects.get(pk=first.pk).delete()
+        counts = counters.get_counts(self.org.id)
+        self.assertEqual(counts['assessments.status.submitted'], 0)
+        self.assertEqual(counts['remediations.status.open'], 0)
+        self.assertEqual(counters.check([self.org.id]), {})
+
+    def test_stats_is_one_query(self):
+        self.create_assessment()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/stats/')
+        self.assertEqual(response.data['total_assessments'], 1)
+        self.assertEqual(response.data['assessments_by_status'], {'assigned': 1})
+        self.assertEqual(response.data['vendors_by_status'], {'active': 1})
+
+    def test_rebuild_corrects_drift(self):
+        self.create_assessment()
+        # Queryset updates bypass the signal handlers
+        Assessment.objects.update(status=Assessment.STATUS_SUBMITTED)
+        drift = counters.check([self.org.id])
+        self.assertEqual(drift[self.org.id]['assessments.status.submitted'], (0, 1))
+
+        counters.rebuild([self.org.id])
+        self.assertEqual(counters.check([self.org.id]), {})
+        self.assertEqual(OrgStats.objects.get(pk=self.org.id).counts['assessments.status.submitted'], 1)
+
+
+class ActivityFeedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name='Org')
+        self.user = User.objects.create_user(username='feeder', password='pass', org=self.org)
+        AuditLog.objects.bulk_create([
+            AuditLog(org=self.org, user=self.user, action=f'event_{i}', object_id=i,
+                     timestamp=timezone.now() - timedelta(minutes=100 - i))
+            for i in range(60)
+        ])
+        self.client.force_authenticate(user=self.user)
+
+    def test_head_page_is_cached_and_older_pages_use_cursor(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/activity/')
+        self.assertEqual(len(response.data['results']), 50)
+        self.assertEqual(response.data['results'][0]['action'], 'event_59')
+        self.assertEqual(response.data['results'][0]['actor'], 'feeder')
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/activity/')
+        self.assertEqual(cached.data['results'], response.data['results'])
+        self.assertEqual(cached.data['cursor'], response.data['cursor'])
+
+        older = self.client.get('/api/activity/', {'cursor': response.data['cursor']})
+        self.assertEqual([row['action'] for row in older.data['results']], [f'event_{i}' for i in range(9, -1, -1)])
+        self.assertIsNone(older.data['next'])
+
+    def test_new_events_are_prepended_to_cached_head(self):
+        self.client.get('/api/activity/')
+        with self.captureOnCommitCallbacks(execute=True):
+            log_event(self.user, 'fresh_event', 99)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/activity/')
+        self.assertEqual(response.data['results'][0]['action'], 'fresh_event')
+        self.assertEqual(len(response.data['results']), 50)
+
+    def test_page_built_before_a_write_is_not_cached(self):
+        # The request read the generation and queried; a write commits before it caches the page
+        generation = feed.generation(self.org.id)
+        stale = self.client.get('/api/activity/', {'page_size': 50}).data['results']
+        with self.captureOnCommitCallbacks(execute=True):
+            log_event(self.user, 'racing_event', 100)
+        feed.set_head(self.org.id, stale, True, generation)
+
+        response = self.client.get('/api/activity/')
+        self.assertEqual(response.data['results'][0]['action'], 'racing_event')
+
+    def test_concurrent_patches_do_not_drop_events(self):
+        self.client.get('/api/activity/')
+        head = cache.get(feed.cache_key(self.org.id))
+        with self.captureOnCommitCallbacks(execute=True):
+            log_event(self.user, 'first', 101)
+        with self.captureOnCommitCallbacks(execute=True):
+            log_event(self.user, 'second', 102)
+        # A slow writer that read the head before 'second' stores its patch last
+        cache.set(feed.cache_key(self.org.id), {**head, 'generation': head['generation'] + 1})
+
+        actions = [row['action'] for row in self.client.get('/api/activity/').data['results'][:2]]
+        self.assertEqual(actions, ['second', 'first'])
+
+    def test_purge_invalidates_cache(self):
+        self.client.get('/api/activity/')
+        events_purged.send(sender=AuditLog, org_ids=[self.org.id])
+        with self.assertNumQueries(1):
+            self.client.get('/api/activity/')
+
+
+@override_settings(AUDIT_STREAM={'BACKEND': 'local', 'HEARTBEAT': 0.05, 'MAX_DURATION': 2, 'BACKLOG': 100})
+class ActivityStreamTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name='Org')
+        self.user = User.objects.create_user(username='streamer', password='pass', org=self.org)
+        self.client.force_authenticate(user=self.user)
+
+    def events(self, chunks):
+        return [chunk.decode() for chunk in chunks if chunk.startswith(b'id:')]
+
+    def test_resumes_from_last_event_id_then_streams_live(self):
+        first = log_event(self.user, 'one', 1)
+        second = log_event(self.user, 'two', 2)
+
+        response = self.client.get(
+            '/api/activity/stream/', HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=str(first.id)
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        self.assertTrue(next(chunks).startswith(b'retry:'))
+        replayed = next(chunks).decode()
+        self.assertTrue(replayed.startswith(f'id: {second.id}\n'))
+        self.assertIn('"action": "two"', replayed)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            live = log_event(self.user, 'three', 3)
+        chunk = next(chunks)
+        while chunk.startswith(b':'):
+            chunk = next(chunks)
+        self.assertTrue(chunk.decode().startswith(f'id: {live.id}\n'))
+        response.close()
+
+    @override_settings(AUDIT_STREAM={'BACKEND': 'local', 'HEARTBEAT': 0.05, 'MAX_DURATION': 2, 'BACKLOG': 2})
+    def test_replay_pages_past_backlog_size(self):
+        first = log_event(self.user, 'zero', 0)
+        missed = [log_event(self.user, f'missed-{i}', i) for i in range(5)]
+
+        response = self.client.get(
+            '/api/activity/stream/', HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=str(first.id)
+        )
+        chunks = iter(response.streaming_content)
+        next(chunks)
+        replayed = [next(chunks).decode() for _ in missed]
+        self.assertEqual([chunk.split('\n', 1)[0] for chunk in replayed], [f'id: {log.id}' for log in missed])
+        self.assertEqual(next(chunks), b': keep-alive\n\n')
+        response.close()
+
+    def test_other_orgs_events_are_not_streamed(self):
+        other_org = Organization.objects.create(name='Other')
+        other = User.objects.create_user(username='other', password='pass', org=other_org)
+        response = self.client.get('/api/activity/stream/', HTTP_ACCEPT='text/event-stream')
+        chunks = iter(response.streaming_content)
+        next(chunks)
+        with self.captureOnCommitCallbacks(execute=True):
+            log_event(other, 'secret', 1)
+        self.assertEqual(next(chunks), b': keep-alive\n\n')
+        response.close()
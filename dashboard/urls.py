@@ -1,8 +1,9 @@
 
 from django.urls import path
-from .views import DashboardStatsView, DashboardActivityFeedView
+from .views import DashboardStatsView, DashboardActivityFeedView, DashboardActivityStreamView
 
 urlpatterns = [
     path('stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
     path('activity/', DashboardActivityFeedView.as_view(), name='dashboard-activity'),
+    path('activity/stream/', DashboardActivityStreamView.as_view(), name='dashboard-activity-stream'),
 ]
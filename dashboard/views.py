@@ -1,41 +1,88 @@
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from assessments.models import Assessment
-from reviews.models import Review
-from remediations.models import Remediation
-from audit.models import AuditLog
-from .serializers import DashboardStatsSerializer, ActivityFeedSerializer
+from rest_framework.renderers import JSONRenderer
+from django.utils.dateparse import parse_datetime
+from audit.pagination import KeysetPagination
+from . import counters, feed, stream
+from .serializers import DashboardStatsSerializer
 
 # Stats endpoint
 class DashboardStatsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        tenant_id = request.user.tenant_id
-        stats = {
-            "total_assessments": Assessment.objects.filter(tenant_id=tenant_id).count(),
-            "total_reviews": Review.objects.filter(tenant_id=tenant_id).count(),
-            "total_remediations": Remediation.objects.filter(tenant_id=tenant_id).count(),
-        }
+        # One primary-key lookup on the org's precomputed counters
+        stats = counters.summarize(counters.get_counts(request.user.org_id))
         serializer = DashboardStatsSerializer(stats)
         return Response(serializer.data)
 
 # Activity feed endpoint
+class ActivityFeedPagination(KeysetPagination):
+    page_size = feed.HEAD_SIZE
+
+
 class DashboardActivityFeedView(APIView):
+    """
+    Newest audit events for the caller's org. Pass ``cursor`` from the
+    previous response to load older events. The head page is served from
+    the cache; every other page is a single indexed query.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        tenant_id = request.user.tenant_id
-        logs = AuditLog.objects.filter(tenant_id=tenant_id).order_by('-timestamp')[:50]
-        feed = [
-            {
-                "actor": log.user.username,
-                "action": log.action,
-                "entity": log.entity,
-                "timestamp": log.timestamp,
-            }
-            for log in logs
-        ]
-        serializer = ActivityFeedSerializer(feed, many=True)
-        return Response(serializer.data)
+        org_id = request.user.org_id
+        paginator = ActivityFeedPagination()
+        params = request.query_params
+        is_head = not params.get(paginator.cursor_query_param) and not params.get(paginator.page_size_query_param)
+
+        if is_head:
+            head = feed.get_head(org_id)
+            if head is not None:
+                return self.head_response(request, paginator, head)
+            # Taken before the query: a write landing meanwhile makes this page stale
+            generation = feed.generation(org_id)
+
+        logs = paginator.paginate_queryset(feed.queryset(org_id), request, view=self)
+        results = feed.serialize(logs)
+        if is_head:
+            feed.set_head(org_id, results, paginator.has_next, generation)
+        return paginator.get_paginated_response(results)
+
+    def head_response(self, request, paginator, head):
+        results = head["results"]
+        paginator.request = request
+        paginator.next_cursor = None
+        if head["has_next"] and results:
+            last = results[-1]
+            paginator.next_cursor = paginator.encode_cursor(parse_datetime(last["timestamp"]), last["id"])
+        return paginator.get_paginated_response(results)
+
+
+# Live activity endpoint
+class DashboardActivityStreamView(APIView):
+    """
+    Server-Sent Events stream of new audit events for the caller's org.
+    Reconnecting clients send Last-Event-ID (or ?last_event_id=) and get the
+    events they missed before live ones. The server ends each stream after
+    AUDIT_STREAM["MAX_DURATION"] seconds; EventSource reconnects on its own.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [stream.EventStreamRenderer, JSONRenderer]
+
+    def get(self, request):
+        last_event_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_event_id")
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        response = StreamingHttpResponse(
+            stream.event_stream(request.user.org_id, last_event_id),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Stop nginx from buffering the stream
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class EvidenceConfig(AppConfig):
     name = 'evidence'
+
+    def ready(self):
+        from . import signals
+        signals.connect()
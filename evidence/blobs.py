@@ -0,0 +1,187 @@
+"""
+Content-addressed evidence storage.
+
+Every distinct file is stored once, named by its SHA-256
+(evidence/sha256/ab/abcd...), and described by an EvidenceBlob row whose
+ref_count is the number of Evidence rows pointing at it. Evidence.file
+holds the blob's storage name, so reads work exactly as before.
+
+Ordering keeps deletion safe: a writer takes its reference (acquire)
+before it copies bytes in, and release() only drops the count to zero.
+After commit, purge() locks the row and, if it is still unreferenced,
+deletes the file and the row together, so an acquire() racing with it
+either revives the row before the file goes, or waits and then creates a
+fresh row (``created``) whose writer copies the bytes in again.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Evidence, EvidenceBlob
+
+READ_BLOCK = 64 * 1024
+
+
+def storage():
+    return Evidence._meta.get_field("file").storage
+
+
+def blob_name(sha256):
+    return f"evidence/sha256/{sha256[:2]}/{sha256}"
+
+
+def hash_file(content):
+    """(sha256, size) of a file object, read in blocks; UploadedFile chunks are used as-is"""
+    digest = hashlib.sha256()
+    size = 0
+    if hasattr(content, "chunks"):
+        blocks = content.chunks(READ_BLOCK)
+    else:
+        content.seek(0)
+        blocks = iter(lambda: content.read(READ_BLOCK), b"")
+    for block in blocks:
+        digest.update(block)
+        size += len(block)
+    return digest.hexdigest(), size
+
+
+def acquire(sha256, size):
+    """
+    Take one reference on the blob for ``sha256``, creating its row if
+    needed. Returns (blob, created); a created row may have no file yet.
+    """
+    for _ in range(2):
+        with transaction.atomic():
+            if EvidenceBlob.objects.filter(sha256=sha256).update(ref_count=F("ref_count") + 1):
+                return EvidenceBlob.objects.get(sha256=sha256), False
+            try:
+                with transaction.atomic():
+                    return EvidenceBlob.objects.create(
+                        sha256=sha256, size=size, file=blob_name(sha256), ref_count=1
+                    ), True
+            except IntegrityError:
+                # Created concurrently; take a reference on that row instead
+                continue
+    raise IntegrityError(f"Could not reference evidence blob {sha256}")
+
+
+def ensure_file(blob, content):
+    """Copy ``content`` into storage unless the blob's file is already there; True if copied"""
+    store = storage()
+    if store.exists(blob.file.name):
+        return False
+    content.seek(0)
+    saved = store.save(blob.file.name, content if isinstance(content, File) else File(content))
+    if saved != blob.file.name:
+        # Another writer stored the same bytes first; ours got a suffixed name
+        store.delete(saved)
+        return False
+    return True
+
+
+def store(content, sha256=None, size=None):
+    """
+    Reference the blob holding ``content`` (hashing it if sha256 is not
+    given), writing the bytes only when no copy exists yet.
+    """
+    if sha256 is None:
+        sha256, size = hash_file(content)
+    blob, _ = acquire(sha256, size)
+    try:
+        ensure_file(blob, content)
+    except Exception:
+        release(blob.pk)
+        raise
+    return blob
+
+
+def find(sha256, size, org_id):
+    """
+    An already stored blob with these bytes that the org itself has
+    uploaded before, or None. Scoped to the org so a hash alone never
+    grants access to another org's file.
+    """
+    return (
+        EvidenceBlob.objects.filter(
+            sha256=sha256, size=size, ref_count__gt=0, evidence__assessment__org_id=org_id
+        ).first()
+    )
+
+
+def purge(blob_id):
+    """Delete the blob's file and row if it is still unreferenced; True if it was"""
+    with transaction.atomic():
+        # The row lock holds off acquire() until the file and the row are both gone
+        blob = EvidenceBlob.objects.select_for_update().filter(pk=blob_id, ref_count__lte=0).first()
+        if blob is None:
+            return False
+        blob.delete()
+        storage().delete(blob_name(blob.sha256))
+    return True
+
+
+def release(blob_id):
+    """Drop one reference; after the last one commits, purge() removes the file and the row"""
+    with transaction.atomic():
+        EvidenceBlob.objects.filter(pk=blob_id).update(ref_count=F("ref_count") - 1)
+        if EvidenceBlob.objects.filter(pk=blob_id, ref_count__lte=0).exists():
+            transaction.on_commit(lambda: purge(blob_id))
+
+
+def backfill():
+    """
+    Move evidence stored before blobs existed onto content-addressed blobs,
+    deleting each old file once no Evidence row names it any more.
+    Returns counts: evidence, blobs_written, files_removed, bytes_freed, missing.
+    """
+    stats = dict.fromkeys(["evidence", "blobs_written", "files_removed", "bytes_freed", "missing"], 0)
+    store_ = storage()
+    pending = Evidence.objects.filter(blob__isnull=True).exclude(file="").values_list("pk", "file", "file_name")
+    for pk, old_name, file_name in pending.iterator():
+        try:
+            with store_.open(old_name, "rb") as handle:
+                sha256, size = hash_file(handle)
+                blob, _ = acquire(sha256, size)
+                try:
+                    if ensure_file(blob, handle):
+                        stats["blobs_written"] += 1
+                        stats["bytes_freed"] -= size
+                except Exception:
+                    release(blob.pk)
+                    raise
+        except FileNotFoundError:
+            stats["missing"] += 1
+            continue
+
+        updated = Evidence.objects.filter(pk=pk, blob__isnull=True).update(
+            blob=blob, file=blob.file.name, file_name=file_name or os.path.basename(old_name)
+        )
+        if not updated:
+            release(blob.pk)
+            continue
+        stats["evidence"] += 1
+        if old_name != blob.file.name and not Evidence.objects.filter(file=old_name).exists():
+            store_.delete(old_name)
+            stats["files_removed"] += 1
+            stats["bytes_freed"] += size
+    return stats
+
+
+def recount():
+    """Reset every ref_count from the Evidence rows; drop blobs nothing references. Returns rows fixed."""
+    fixed = 0
+    counts = dict(
+        Evidence.objects.filter(blob__isnull=False).values("blob").annotate(n=Count("pk")).values_list("blob", "n")
+    )
+    for blob_id, ref_count in EvidenceBlob.objects.values_list("pk", "ref_count").iterator():
+        actual = counts.get(blob_id, 0)
+        if actual != ref_count:
+            fixed += 1
+            EvidenceBlob.objects.filter(pk=blob_id).update(ref_count=actual)
+        if not actual:
+            # Also finishes purges a crashed process left at zero references
+            purge(blob_id)
+    return fixed
@@ -0,0 +1,163 @@
+"""
+Evidence file downloads with HTTP Range and ETag support.
+
+Full downloads go out as a FileResponse, which the WSGI server can send
+with sendfile(); single byte ranges (``Range: bytes=a-b``, ``a-``, ``-n``)
+stream only the requested slice. The ETag is the file's SHA-256 when it is
+stored content-addressed, so If-None-Match / If-Range work across every
+copy of the same document.
+
+Set EVIDENCE_DOWNLOADS["ACCEL_REDIRECT"] (nginx internal location prefix)
+or ["SENDFILE"] (Apache / lighttpd X-Sendfile) to let the front-end server
+send the bytes; it then handles Range itself.
+"""
+import json
+import mimetypes
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
+from rest_framework.renderers import BaseRenderer
+
+from . import blobs
+
+DEFAULTS = {
+    "ACCEL_REDIRECT": None,  # e.g. "/protected-media/" mapped to MEDIA_ROOT with "internal;"
+    "SENDFILE": False,
+}
+
+READ_BLOCK = blobs.READ_BLOCK
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "EVIDENCE_DOWNLOADS", {}))
+    return config
+
+
+class FileDownloadRenderer(BaseRenderer):
+    """Lets DRF accept any ``Accept`` header for downloads; errors render as JSON"""
+    media_type = "*/*"
+    format = "download"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range header, or None to send the
+    whole file (no header, multiple ranges or a malformed value).
+    Raises RangeNotSatisfiable when the range lies outside the file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def etag_for(evidence, size):
+    if evidence.blob_id:
+        return f'"{evidence.blob.sha256}"'
+    return f'W/"{evidence.pk}-{size}"'
+
+
+def _stream(handle, start, length):
+    try:
+        handle.seek(start)
+        while length > 0:
+            block = handle.read(min(READ_BLOCK, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        handle.close()
+
+
+def _headers(response, etag, content_type, disposition):
+    response["ETag"] = etag
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Type"] = content_type
+    response["Content-Disposition"] = disposition
+    # Clients may keep the bytes but must revalidate (cheap 304 via ETag)
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def serve(request, evidence, as_attachment=True):
+    """Response for GET/HEAD of an evidence file, honouring Range and conditional headers"""
+    storage = blobs.storage()
+    name = evidence.file.name
+    try:
+        size = evidence.blob.size if evidence.blob_id else storage.size(name)
+    except FileNotFoundError:
+        raise Http404("Evidence file is missing")
+
+    filename = evidence.file_name or name.rsplit("/", 1)[-1]
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    disposition = content_disposition_header(as_attachment, filename)
+    etag = etag_for(evidence, size)
+
+    conditional = get_conditional_response(request, etag=etag)
+    if conditional is not None:
+        conditional["ETag"] = etag
+        return conditional
+
+    config = get_config()
+    if config["ACCEL_REDIRECT"] or config["SENDFILE"]:
+        response = HttpResponse()
+        if config["ACCEL_REDIRECT"]:
+            response["X-Accel-Redirect"] = config["ACCEL_REDIRECT"].rstrip("/") + "/" + name
+        else:
+            response["X-Sendfile"] = storage.path(name)
+        return _headers(response, etag, content_type, disposition)
+
+    # If-Range: only honour Range while the client's copy is still current
+    # (strong comparison, so weak ETags always get the full file)
+    if_range = request.headers.get("If-Range")
+    byte_range = None
+    if if_range is None or (if_range == etag and not etag.startswith("W/")):
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return _headers(response, etag, content_type, disposition)
+
+    try:
+        handle = storage.open(name, "rb")
+    except FileNotFoundError:
+        raise Http404("Evidence file is missing")
+
+    if byte_range is None or byte_range == (0, size - 1):
+        response = FileResponse(handle)
+        response["Content-Length"] = str(size)
+        return _headers(response, etag, content_type, disposition)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(_stream(handle, start, end - start + 1), status=206)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = str(end - start + 1)
+    return _headers(response, etag, content_type, disposition)
@@ -0,0 +1,124 @@
+"""
+Evidence expiry sweep.
+
+Evidence.expiry_state records what the sweep last decided for a row's
+expiry_date: current, expiring (within WARNING_DAYS) or expired. A sweep
+only visits rows whose state is out of date, walks them in primary-key
+chunks of CHUNK_SIZE (one transaction each, bounded memory), and per chunk:
+
+  * updates expiry_state with one UPDATE,
+  * recomputes Assessment.evidence_expiry for the touched assessments,
+  * writes evidence_expiring / evidence_expired audit events in bulk,
+    filed under each evidence row's org.
+
+Rows are picked through the partial expiry_date index, so a daily run
+costs in proportion to what changed, not to the size of the table.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from assessments.models import Assessment
+from audit.services import log_events
+from .models import Evidence
+
+DEFAULTS = {
+    "WARNING_DAYS": 30,
+    "CHUNK_SIZE": 1000,
+}
+
+AUDIT_ACTIONS = {
+    Assessment.EVIDENCE_EXPIRING: "evidence_expiring",
+    Assessment.EVIDENCE_EXPIRED: "evidence_expired",
+}
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "EVIDENCE_EXPIRY", {}))
+    return config
+
+
+def horizon(today=None, days=None):
+    today = today or timezone.localdate()
+    days = days if days is not None else get_config()["WARNING_DAYS"]
+    return today, today + timedelta(days=days)
+
+
+def _passes(today, until):
+    """(target state, filter for rows that should move into it)"""
+    return [
+        (Assessment.EVIDENCE_EXPIRED,
+         Q(expiry_date__lt=today) & ~Q(expiry_state=Assessment.EVIDENCE_EXPIRED)),
+        (Assessment.EVIDENCE_EXPIRING,
+         Q(expiry_date__gte=today, expiry_date__lte=until) & ~Q(expiry_state=Assessment.EVIDENCE_EXPIRING)),
+        # Renewed or cleared dates
+        (Assessment.EVIDENCE_CURRENT,
+         ~Q(expiry_state=Assessment.EVIDENCE_CURRENT) & (Q(expiry_date__isnull=True) | Q(expiry_date__gt=until))),
+    ]
+
+
+def flag_assessments(assessment_ids):
+    """Set each assessment's evidence_expiry to the worst state among its evidence"""
+    assessment_ids = set(assessment_ids)
+    if not assessment_ids:
+        return
+    states = Evidence.objects.filter(assessment_id__in=assessment_ids).exclude(
+        expiry_state=Assessment.EVIDENCE_CURRENT
+    )
+    expired = set(
+        states.filter(expiry_state=Assessment.EVIDENCE_EXPIRED).values_list("assessment_id", flat=True).distinct()
+    )
+    expiring = set(
+        states.filter(expiry_state=Assessment.EVIDENCE_EXPIRING).values_list("assessment_id", flat=True).distinct()
+    ) - expired
+    for state, ids in (
+        (Assessment.EVIDENCE_EXPIRED, expired),
+        (Assessment.EVIDENCE_EXPIRING, expiring),
+        (Assessment.EVIDENCE_CURRENT, assessment_ids - expired - expiring),
+    ):
+        if ids:
+            Assessment.objects.filter(pk__in=ids).exclude(evidence_expiry=state).update(evidence_expiry=state)
+
+
+def _apply_chunk(state, rows):
+    with transaction.atomic():
+        Evidence.objects.filter(pk__in=[row[0] for row in rows]).update(expiry_state=state)
+        flag_assessments(row[1] for row in rows)
+
+        action = AUDIT_ACTIONS.get(state)
+        if action:
+            by_org = {}
+            for pk, assessment_id, org_id, expiry_date, file_name in rows:
+                by_org.setdefault(org_id, []).append((action, pk, {
+                    "assessment_id": assessment_id,
+                    "expiry_date": expiry_date.isoformat(),
+                    "file_name": file_name,
+                }))
+            for org_id, events in by_org.items():
+                log_events(None, events, org_id=org_id)
+
+
+def sweep(today=None, days=None, chunk_size=None):
+    """Bring every expiry_state up to date; returns {state: rows moved into it}"""
+    today, until = horizon(today, days)
+    chunk_size = chunk_size or get_config()["CHUNK_SIZE"]
+    moved = {}
+    for state, condition in _passes(today, until):
+        moved[state] = 0
+        last_id = 0
+        while True:
+            rows = list(
+                Evidence.objects.filter(condition, pk__gt=last_id)
+                .order_by("pk")
+                .values_list("pk", "assessment_id", "assessment__org_id", "expiry_date", "file_name")[:chunk_size]
+            )
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            _apply_chunk(state, rows)
+            moved[state] += len(rows)
+    return moved
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from evidence import blobs
+
+
+class Command(BaseCommand):
+    help = "Move existing evidence files into content-addressed storage so identical files are stored once"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recount", action="store_true", help="Also reset blob reference counts from Evidence rows")
+
+    def handle(self, *args, **options):
+        stats = blobs.backfill()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Moved {stats['evidence']} evidence files into {stats['blobs_written']} new blobs; "
+            f"removed {stats['files_removed']} old files ({stats['bytes_freed']} bytes freed)"
+        ))
+        if stats["missing"]:
+            self.stdout.write(self.style.WARNING(f"⚠️ {stats['missing']} evidence rows point at missing files"))
+        if options["recount"]:
+            self.stdout.write(self.style.SUCCESS(f"✅ Fixed {blobs.recount()} blob reference counts"))
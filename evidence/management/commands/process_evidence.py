@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from evidence import pipeline
+from evidence.models import Evidence
+
+
+class Command(BaseCommand):
+    help = "Run the evidence processors over pending evidence (or all of it) on a process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Reprocess every evidence file, not just unfinished ones")
+        parser.add_argument("--workers", type=int, help="Worker processes (default EVIDENCE_PROCESSING['WORKERS'] or one per core)")
+        parser.add_argument("--batch-size", type=int, default=500, help="Evidence rows per result batch")
+
+    def handle(self, *args, **options):
+        evidence = Evidence.objects.order_by("pk")
+        if not options["all"]:
+            # "processing" rows were in flight when a web process stopped
+            evidence = evidence.exclude(processing_status=Evidence.PROCESSING_DONE)
+        ids = list(evidence.values_list("pk", flat=True))
+        workers = pipeline.worker_count(options["workers"])
+
+        processed = pipeline.process_all(
+            ids,
+            workers=workers,
+            batch_size=options["batch_size"],
+            on_batch=lambda done: self.stdout.write(f"ℹ️ {done}/{len(ids)} processed"),
+        )
+        failed = Evidence.objects.filter(pk__in=ids, processing_status__in=[
+            Evidence.PROCESSING_FAILED, Evidence.PROCESSING_INFECTED,
+        ]).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Processed {processed} evidence files on {workers} workers ({failed} failed or infected)"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from evidence import uploads
+
+
+class Command(BaseCommand):
+    help = "Abort chunked evidence uploads that have been idle too long and delete their staging files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, help="Idle time (default EVIDENCE_UPLOADS['STALE_HOURS'])")
+
+    def handle(self, *args, **options):
+        aborted = uploads.purge_stale(options["hours"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Aborted {aborted} stale evidence uploads"))
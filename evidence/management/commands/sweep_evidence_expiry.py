@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from assessments.models import Assessment
+from evidence import expiry
+
+
+class Command(BaseCommand):
+    help = "Mark expiring / expired evidence, flag their assessments and write audit events (run daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Warning window (default EVIDENCE_EXPIRY['WARNING_DAYS'])")
+        parser.add_argument("--chunk-size", type=int, help="Evidence rows per transaction")
+
+    def handle(self, *args, **options):
+        moved = expiry.sweep(days=options["days"], chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {moved[Assessment.EVIDENCE_EXPIRED]} evidence expired, "
+            f"{moved[Assessment.EVIDENCE_EXPIRING]} expiring soon, "
+            f"{moved[Assessment.EVIDENCE_CURRENT]} cleared"
+        ))
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0009_assessment_evidence_expiry'),
+        ('evidence', '0003_evidence_blobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evidence',
+            name='expiry_state',
+            field=models.CharField(blank=True, choices=[('', 'Current'), ('expiring', 'Expiring'), ('expired', 'Expired')], default='', editable=False, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='evidence',
+            index=models.Index(condition=models.Q(('expiry_date__isnull', False)), fields=['expiry_date', 'assessment'], name='evidence_expiry_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evidence',
+            index=models.Index(condition=models.Q(('expiry_state', ''), _negated=True), fields=['expiry_state'], name='evidence_expiry_flagged_idx'),
+        ),
+    ]
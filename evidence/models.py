@@ -1,20 +1,142 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 from assessments.models import Assessment
 
 
+class EvidenceBlob(models.Model):
+    """
+    One stored file, shared by every Evidence row with the same content
+    (see evidence.blobs). ref_count counts those rows.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    file = models.FileField(max_length=255)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Blob {self.sha256[:12]} ({self.ref_count} refs)"
+
+
 class Evidence(models.Model):
+    PROCESSING_PENDING = "pending"
+    PROCESSING_RUNNING = "processing"
+    PROCESSING_DONE = "done"
+    PROCESSING_FAILED = "failed"
+    PROCESSING_INFECTED = "infected"
+
+    PROCESSING_STATUS = [
+        (PROCESSING_PENDING, "Pending"),
+        (PROCESSING_RUNNING, "Processing"),
+        (PROCESSING_DONE, "Done"),
+        (PROCESSING_FAILED, "Failed"),
+        (PROCESSING_INFECTED, "Infected"),
+    ]
+
     assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE)
     question_id = models.IntegerField()
 
     file = models.FileField(upload_to="evidence/")
+    file_name = models.CharField(max_length=255, blank=True)
     file_type = models.CharField(max_length=50)
+    blob = models.ForeignKey(EvidenceBlob, on_delete=models.PROTECT, null=True, blank=True, editable=False)
 
     expiry_date = models.DateField(null=True, blank=True)
+    # Last state the expiry sweep (evidence.expiry) recorded for expiry_date
+    expiry_state = models.CharField(
+        max_length=20, choices=Assessment.EVIDENCE_EXPIRY, default=Assessment.EVIDENCE_CURRENT, blank=True, editable=False
+    )
 
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
 
+    # Filled in by the background pipeline (evidence.pipeline) after upload
+    processing_status = models.CharField(
+        max_length=20, choices=PROCESSING_STATUS, default=PROCESSING_PENDING, editable=False
+    )
+    detected_type = models.CharField(max_length=100, blank=True, editable=False)
+    extracted_text = models.TextField(blank=True, editable=False)
+    processing_results = models.JSONField(default=dict, blank=True, editable=False)
+    processing_error = models.TextField(blank=True, editable=False)
+    processed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Date-range scans for the sweep and "expiring soon"; assessment_id
+            # in the key lets the org join run without reading the evidence rows
+            models.Index(
+                fields=["expiry_date", "assessment"],
+                condition=models.Q(expiry_date__isnull=False),
+                name="evidence_expiry_idx",
+            ),
+            models.Index(
+                fields=["expiry_state"],
+                condition=~models.Q(expiry_state=""),
+                name="evidence_expiry_flagged_idx",
+            ),
+            models.Index(
+                fields=["processing_status"],
+                condition=~models.Q(processing_status="done"),
+                name="evidence_processing_todo_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Evidence {self.id}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_file = values[field_names.index("file")] if "file" in field_names else None
+        return instance
+
+    def save(self, *args, **kwargs):
+        # New content needs (re)processing; post_save queues it after commit
+        self._needs_processing = self._state.adding or self.file.name != getattr(self, "_loaded_file", None)
+        if self._needs_processing:
+            self.processing_status = self.PROCESSING_PENDING
+        super().save(*args, **kwargs)
+        self._loaded_file = self.file.name
+
+
+class EvidenceUpload(models.Model):
+    """
+    A chunked upload in progress. Chunks are appended to a staging file
+    (see evidence.uploads); ``received`` is the committed byte offset the
+    client resumes from. Completing the upload creates the Evidence row.
+    """
+    STATUS_OPEN = "open"
+    STATUS_COMPLETED = "completed"
+    STATUS_ABORTED = "aborted"
+
+    STATUS_CHOICES = [
+        (STATUS_OPEN, "Open"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_ABORTED, "Aborted"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name="evidence_uploads")
+    question_id = models.IntegerField()
+    file_name = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=50)
+    expiry_date = models.DateField(null=True, blank=True)
+
+    size = models.BigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    received = models.BigIntegerField(default=0)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    evidence = models.OneToOneField(Evidence, on_delete=models.SET_NULL, null=True, blank=True, related_name="upload")
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "updated_at"], name="evidence_upload_stale_idx")]
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.received}/{self.size})"
@@ -0,0 +1,253 @@
+"""
+Background processing of uploaded evidence.
+
+New or replaced Evidence files are queued (after commit) to a
+ProcessPoolExecutor. Worker processes (evidence.worker) run the processors listed in
+EVIDENCE_PROCESSING["PROCESSORS"] (see evidence.processors) over the file
+and return plain results; the web process writes them back to the Evidence
+row and announces evidence.signals.evidence_processed, so search picks up
+the extracted text. Workers never touch the database.
+
+Jobs carry the file name they read. Results are only stored on rows that
+still hold that file and are still "processing", so a job that finishes
+after its file was replaced (or reprocessed) cannot overwrite newer results.
+
+Evidence sharing a blob with an already processed row copies its results
+instead of reading the file again. ``manage.py process_evidence`` drains
+anything left pending (e.g. after a restart) and re-runs processors on
+demand with one worker per core.
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import blobs
+from .models import Evidence
+from .signals import evidence_processed
+from .worker import init_worker, run_job
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "INLINE": False,  # run in the request process (tests)
+    "WORKERS": None,  # None: one per CPU core
+    "PROCESSORS": [
+        "evidence.processors.sniff_mime",
+        "evidence.processors.checksum",
+        "evidence.processors.extract_text",
+        "evidence.processors.command_scan",
+    ],
+    "MAX_TEXT_CHARS": 200_000,
+    "SCAN_COMMAND": None,
+}
+
+RESULT_FIELDS = ["processing_status", "detected_type", "extracted_text", "processing_results",
+                 "processing_error", "processed_at"]
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "EVIDENCE_PROCESSING", {}))
+    return config
+
+
+def worker_count(workers=None):
+    return workers or get_config()["WORKERS"] or os.cpu_count() or 1
+
+
+def build_jobs(evidence_ids):
+    """Job dicts for the workers; local files are passed by path so workers skip storage setup"""
+    storage = blobs.storage()
+    processors = get_config()["PROCESSORS"]
+    jobs = []
+    rows = Evidence.objects.filter(pk__in=evidence_ids).select_related("blob").only(
+        "pk", "file", "file_name", "file_type", "blob__sha256", "blob__size"
+    )
+    for evidence in rows:
+        try:
+            path = storage.path(evidence.file.name)
+        except NotImplementedError:
+            path = None
+        jobs.append({
+            "evidence_id": evidence.pk,
+            "path": path,
+            "name": evidence.file.name,
+            "processors": processors,
+            "info": {
+                "file_name": evidence.file_name or os.path.basename(evidence.file.name),
+                "file_type": evidence.file_type,
+                "size": evidence.blob.size if evidence.blob_id else None,
+                "sha256": evidence.blob.sha256 if evidence.blob_id else None,
+            },
+        })
+    return jobs
+
+
+def mark_running(jobs):
+    """Flag the jobs' rows as in flight; only such rows accept results"""
+    Evidence.objects.filter(pk__in=[job["evidence_id"] for job in jobs]).update(
+        processing_status=Evidence.PROCESSING_RUNNING
+    )
+    return jobs
+
+
+def apply_result(evidence, results, errors):
+    """Copy one job's outcome onto an Evidence instance (not saved)"""
+    evidence.detected_type = next((r["mime_type"] for r in results.values() if r.get("mime_type")), "")[:100]
+    evidence.extracted_text = next((r["text"] for r in results.values() if r.get("text")), "")
+    evidence.processing_results = {
+        name: {key: value for key, value in result.items() if key != "text"} for name, result in results.items()
+    }
+    evidence.processing_error = "; ".join(f"{name}: {error}" for name, error in errors.items())
+    if any(result.get("infected") for result in results.values()):
+        evidence.processing_status = Evidence.PROCESSING_INFECTED
+    elif errors:
+        evidence.processing_status = Evidence.PROCESSING_FAILED
+    else:
+        evidence.processing_status = Evidence.PROCESSING_DONE
+    evidence.processed_at = timezone.now()
+    return evidence
+
+
+def save_results(outcomes):
+    """
+    Store [(evidence_id, file name, results, errors)] with one bulk UPDATE
+    and announce them. Outcomes for rows whose file changed or that are no
+    longer processing are stale and dropped.
+    """
+    if not outcomes:
+        return
+    with transaction.atomic():
+        current = dict(
+            Evidence.objects.select_for_update()
+            .filter(pk__in=[outcome[0] for outcome in outcomes], processing_status=Evidence.PROCESSING_RUNNING)
+            .values_list("pk", "file")
+        )
+        rows = [
+            apply_result(Evidence(pk=evidence_id), results, errors)
+            for evidence_id, name, results, errors in outcomes
+            if current.get(evidence_id) == name
+        ]
+        if len(rows) < len(outcomes):
+            logger.info("Dropped %s stale evidence processing results", len(outcomes) - len(rows))
+        if not rows:
+            return
+        Evidence.objects.bulk_update(rows, RESULT_FIELDS, batch_size=200)
+    evidence_processed.send(sender=Evidence, evidence_ids=[row.pk for row in rows])
+
+
+def reuse_results(evidence_ids):
+    """
+    Copy results from processed evidence with the same blob; returns the
+    ids that still need a worker.
+    """
+    with transaction.atomic():
+        # Locked until the copies are written, so a row cannot change blob in between
+        rows = list(Evidence.objects.select_for_update().filter(pk__in=evidence_ids).values_list("pk", "blob_id"))
+        blob_ids = {blob_id for _, blob_id in rows if blob_id}
+        done = {}
+        if blob_ids:
+            for source in (
+                Evidence.objects.filter(blob_id__in=blob_ids, processing_status__in=[
+                    Evidence.PROCESSING_DONE, Evidence.PROCESSING_INFECTED,
+                ]).exclude(pk__in=evidence_ids).only("blob_id", *RESULT_FIELDS)
+            ):
+                done.setdefault(source.blob_id, source)
+
+        copies, remaining = [], []
+        for pk, blob_id in rows:
+            source = done.get(blob_id)
+            if source is None:
+                remaining.append(pk)
+                continue
+            copy = Evidence(pk=pk)
+            for field in RESULT_FIELDS:
+                setattr(copy, field, getattr(source, field))
+            copies.append(copy)
+        if copies:
+            Evidence.objects.bulk_update(copies, RESULT_FIELDS, batch_size=200)
+    if copies:
+        evidence_processed.send(sender=Evidence, evidence_ids=[copy.pk for copy in copies])
+    return remaining
+
+
+class Pipeline:
+    """Process pool shared by every request in this web process"""
+
+    def __init__(self, workers):
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            # Fresh interpreters: forking would copy the audit writer's thread state and DB sockets
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        )
+
+    def submit(self, evidence_ids):
+        jobs = mark_running(build_jobs(evidence_ids))
+        for job in jobs:
+            self.executor.submit(run_job, job).add_done_callback(self._done)
+
+    def _done(self, future):
+        try:
+            save_results([future.result()])
+        except Exception:
+            logger.exception("Storing evidence processing results failed")
+        finally:
+            close_old_connections()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=False)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = Pipeline(worker_count())
+                atexit.register(_pipeline.shutdown)
+    return _pipeline
+
+
+def enqueue(evidence_ids, reuse=True):
+    """Process these evidence rows in the background (inline when configured)"""
+    evidence_ids = reuse_results(list(evidence_ids)) if reuse else list(evidence_ids)
+    if not evidence_ids:
+        return
+    if get_config()["INLINE"]:
+        save_results([run_job(job) for job in mark_running(build_jobs(evidence_ids))])
+    else:
+        get_pipeline().submit(evidence_ids)
+
+
+def process_all(evidence_ids, workers=None, batch_size=500, on_batch=None):
+    """
+    Process many evidence rows on a dedicated pool (one worker per core by
+    default), storing results in batches. Returns the number processed.
+    """
+    workers = worker_count(workers)
+    processed = 0
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=init_worker
+    ) as pool:
+        for start in range(0, len(evidence_ids), batch_size):
+            batch = evidence_ids[start:start + batch_size]
+            jobs = mark_running(build_jobs(reuse_results(batch)))
+            # Several jobs per task keeps every core busy without one straggler batch
+            chunksize = max(1, len(jobs) // (workers * 4))
+            save_results(list(pool.map(run_job, jobs, chunksize=chunksize)))
+            processed += len(batch)
+            if on_batch:
+                on_batch(processed)
+    return processed
@@ -0,0 +1,181 @@
+"""
+Built-in evidence processors.
+
+A processor is a module-level function ``processor(handle, info) -> dict``
+listed by dotted path in EVIDENCE_PROCESSING["PROCESSORS"]. ``handle`` is
+the file opened for binary reading (rewound before each processor);
+``info`` carries file_name, file_type, size, sha256 and whatever earlier
+processors returned under "mime_type". Processors run in worker
+processes, so they must not touch the database.
+
+Keys with a meaning for the pipeline:
+  * mime_type: stored on Evidence.detected_type
+  * text: stored on Evidence.extracted_text (and indexed for search)
+  * infected: True quarantines the evidence (status "infected")
+Everything else is kept verbatim in Evidence.processing_results.
+"""
+import hashlib
+import mimetypes
+import re
+import subprocess
+import zipfile
+
+from django.conf import settings
+
+READ_BLOCK = 64 * 1024
+
+SIGNATURES = [
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (b"Rar!\x1a\x07", "application/vnd.rar"),
+    (b"MZ", "application/x-msdownload"),
+    (b"\x7fELF", "application/x-executable"),
+]
+
+OFFICE_PARTS = [
+    ("word/", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    ("xl/", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    ("ppt/", "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
+]
+
+TEXT_TYPES = {"text/plain", "text/csv", "application/json", "text/markdown", "application/xml", "text/xml"}
+
+XML_TAG_RE = re.compile(rb"<[^>]+>")
+
+
+def _max_text():
+    return getattr(settings, "EVIDENCE_PROCESSING", {}).get("MAX_TEXT_CHARS", 200_000)
+
+
+def _looks_like_text(sample):
+    if b"\x00" in sample:
+        return False
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        # A multi-byte character cut off at the end of the sample is fine
+        return exc.start >= len(sample) - 3
+    return True
+
+
+def sniff_mime(handle, info):
+    """MIME type from the file's leading bytes (libmagic when python-magic is installed)"""
+    sample = handle.read(8192)
+    try:
+        import magic
+    except ImportError:
+        magic = None
+    if magic is not None:
+        return {"mime_type": magic.from_buffer(sample, mime=True), "source": "libmagic"}
+
+    for signature, mime in SIGNATURES:
+        if sample.startswith(signature):
+            break
+    else:
+        mime = None
+
+    if sample.startswith(b"PK\x03\x04"):
+        mime = "application/zip"
+        handle.seek(0)
+        try:
+            names = zipfile.ZipFile(handle).namelist()
+        except zipfile.BadZipFile:
+            names = []
+        for prefix, office_mime in OFFICE_PARTS:
+            if any(name.startswith(prefix) for name in names):
+                mime = office_mime
+                break
+
+    if mime is None and _looks_like_text(sample):
+        guessed = mimetypes.guess_type(info.get("file_name") or "")[0]
+        mime = guessed if guessed in TEXT_TYPES else "text/plain"
+
+    mime = mime or "application/octet-stream"
+    declared = mimetypes.guess_type(info.get("file_name") or "")[0]
+    return {"mime_type": mime, "source": "signature", "matches_name": declared in (None, mime)}
+
+
+def _pdf_text(handle):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+    reader = PdfReader(handle)
+    parts, length = [], 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        parts.append(text)
+        length += len(text)
+        if length >= _max_text():
+            break
+    return "\n".join(parts)
+
+
+def _office_text(handle, mime):
+    parts = {
+        OFFICE_PARTS[0][1]: lambda name: name == "word/document.xml",
+        OFFICE_PARTS[1][1]: lambda name: name == "xl/sharedStrings.xml",
+        OFFICE_PARTS[2][1]: lambda name: name.startswith("ppt/slides/slide") and name.endswith(".xml"),
+    }[mime]
+    chunks = []
+    with zipfile.ZipFile(handle) as archive:
+        for name in sorted(filter(parts, archive.namelist())):
+            with archive.open(name) as part:
+                chunks.append(XML_TAG_RE.sub(b" ", part.read(_max_text() * 4)).decode("utf-8", "replace"))
+    return " ".join(" ".join(chunks).split())
+
+
+def extract_text(handle, info):
+    """Plain text of text, PDF (needs pypdf) and Office Open XML files"""
+    mime = info.get("mime_type") or ""
+    if mime in TEXT_TYPES or mime.startswith("text/"):
+        text = handle.read(_max_text() * 4).decode("utf-8", "replace")
+    elif mime == "application/pdf":
+        text = _pdf_text(handle)
+        if text is None:
+            return {"skipped": "pypdf is not installed"}
+    elif mime in {office_mime for _, office_mime in OFFICE_PARTS}:
+        text = _office_text(handle, mime)
+    else:
+        return {"skipped": f"no text extractor for {mime or 'unknown type'}"}
+    text = text[:_max_text()]
+    return {"text": text, "chars": len(text)}
+
+
+def checksum(handle, info):
+    """SHA-256 and size of the stored bytes; flags a mismatch with the content-addressed name"""
+    digest = hashlib.sha256()
+    size = 0
+    for block in iter(lambda: handle.read(READ_BLOCK), b""):
+        digest.update(block)
+        size += len(block)
+    result = {"sha256": digest.hexdigest(), "size": size}
+    if info.get("sha256"):
+        result["intact"] = info["sha256"] == result["sha256"]
+    return result
+
+
+def command_scan(handle, info):
+    """
+    Virus-scan hook: runs EVIDENCE_PROCESSING["SCAN_COMMAND"] (e.g.
+    ["clamdscan", "--no-summary", "-"]) with the file on stdin.
+    Exit status 0 is clean, 1 infected, anything else an error.
+    """
+    command = getattr(settings, "EVIDENCE_PROCESSING", {}).get("SCAN_COMMAND")
+    if not command:
+        return {"skipped": "no SCAN_COMMAND configured"}
+    result = subprocess.run(command, stdin=handle, capture_output=True, timeout=600)
+    output = result.stdout.decode("utf-8", "replace").strip()[-500:]
+    if result.returncode == 0:
+        return {"infected": False}
+    if result.returncode == 1:
+        return {"infected": True, "report": output}
+    raise RuntimeError(f"Scanner exited with {result.returncode}: {result.stderr.decode('utf-8', 'replace')[-500:]}")
@@ -1,9 +1,37 @@
 from rest_framework import serializers
-from .models import Evidence
+from . import uploads
+from .models import Evidence, EvidenceUpload
 
 
 class EvidenceSerializer(serializers.ModelSerializer):
     class Meta:
         model = Evidence
-        fields = "__all__"
+        # extracted_text can be large; it is searchable through /api/search/
+        exclude = ["extracted_text"]
         read_only_fields = ["uploaded_by"]
+
+
+class EvidenceUploadSerializer(serializers.ModelSerializer):
+    sha256 = serializers.RegexField(r"^[0-9a-fA-F]{64}$")
+
+    class Meta:
+        model = EvidenceUpload
+        fields = [
+            "id", "assessment", "question_id", "file_name", "file_type", "expiry_date",
+            "size", "sha256", "received", "status", "evidence", "created_at", "updated_at",
+        ]
+        read_only_fields = ["received", "status", "evidence", "created_at", "updated_at"]
+
+    def validate_assessment(self, value):
+        if value.org_id != self.context["request"].user.org_id:
+            raise serializers.ValidationError("Assessment not found.")
+        return value
+
+    def validate_size(self, value):
+        limit = uploads.get_config()["MAX_FILE_SIZE"]
+        if not 0 < value <= limit:
+            raise serializers.ValidationError(f"Size must be between 1 and {limit} bytes.")
+        return value
+
+    def validate_sha256(self, value):
+        return value.lower()
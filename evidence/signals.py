@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+
+from assessments.models import Assessment
+from . import blobs, expiry
+from .models import Evidence
+
+# Sent after the processing pipeline stored results with bulk_update
+# (post_save does not fire). Arguments: evidence_ids.
+evidence_processed = Signal()
+
+
+def release_blob(sender, instance, **kwargs):
+    """Every way an Evidence row disappears (incl. cascades) drops its blob reference"""
+    if instance.blob_id:
+        blobs.release(instance.blob_id)
+
+
+def reflag_assessment(sender, instance, **kwargs):
+    """Deleting expiring / expired evidence may clear its assessment's flag"""
+    flagged = Assessment.objects.filter(pk=instance.assessment_id).exclude(
+        evidence_expiry=Assessment.EVIDENCE_CURRENT
+    )
+    if flagged.exists():
+        expiry.flag_assessments([instance.assessment_id])
+
+
+def queue_processing(sender, instance, **kwargs):
+    """New or replaced files go to the processing pipeline once committed"""
+    if getattr(instance, "_needs_processing", False):
+        from . import pipeline
+        evidence_id = instance.pk
+        transaction.on_commit(lambda: pipeline.enqueue([evidence_id]))
+
+
+def connect():
+    post_delete.connect(release_blob, sender=Evidence, dispatch_uid="evidence_release_blob")
+    post_delete.connect(reflag_assessment, sender=Evidence, dispatch_uid="evidence_reflag_assessment")
+    post_save.connect(queue_processing, sender=Evidence, dispatch_uid="evidence_queue_processing")
@@ -1,3 +1,545 @@
-from django.test import TestCase
+import csv
+import hashlib
+import io
+import shutil
+import sys
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from assessments.models import Assessment
+from audit.models import AuditLog
+from orgs.models import Organization
+from templates.models import Template
+from vendors.models import Vendor
+from . import blobs, uploads
+from .models import Evidence, EvidenceBlob, EvidenceUpload
+from . import expiry, pipeline
+
+User = get_user_model()
+
+PAYLOAD = b"SOC2 report " * 1000
+OFFICE_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class EvidenceTestCase(APITestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        overrides = override_settings(
+            MEDIA_ROOT=f"{self.tmp}/media",
+            EVIDENCE_UPLOADS={"TEMP_DIR": f"{self.tmp}/staging", "MAX_CHUNK_SIZE": 5000},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+        self.org = Organization.objects.create(name="Org")
+        self.user = User.objects.create_user(username="vendor", password="pass", org=self.org, role="vendor")
+        self.assessment = Assessment.objects.create(
+            org=self.org,
+            vendor=Vendor.objects.create(org=self.org, name="Acme"),
+            template=Template.objects.create(org=self.org, name="T"),
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def make_assessment(self):
+        return Assessment.objects.create(
+            org=self.org, vendor=self.assessment.vendor, template=self.assessment.template
+        )
+
+    def post_file(self, assessment, data=PAYLOAD, name="iso27001.pdf"):
+        response = self.client.post("/api/evidence/", {
+            "assessment": assessment.pk,
+            "question_id": 1,
+            "file_type": "pdf",
+            "file": SimpleUploadedFile(name, data),
+        }, format="multipart")
+        self.assertEqual(response.status_code, 201, response.data)
+        return Evidence.objects.get(pk=response.data["id"])
+
+
+class EvidenceUploadTests(EvidenceTestCase):
+    def start(self, data=PAYLOAD, **extra):
+        response = self.client.post("/api/evidence/uploads/", {
+            "assessment": self.assessment.pk,
+            "question_id": 1,
+            "file_name": "soc2.pdf",
+            "file_type": "pdf",
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            **extra,
+        }, format="json")
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data["id"]
+
+    def put(self, upload_id, offset, chunk, checksum=None):
+        headers = {"HTTP_X_CHUNK_SHA256": checksum or hashlib.sha256(chunk).hexdigest()}
+        return self.client.put(
+            f"/api/evidence/uploads/{upload_id}/chunk/?offset={offset}",
+            chunk, content_type="application/octet-stream", **headers,
+        )
+
+    def complete(self, upload_id):
+        return self.client.post(f"/api/evidence/uploads/{upload_id}/complete/")
+
+    def test_chunked_upload_creates_evidence(self):
+        upload_id = self.start()
+        for offset in range(0, len(PAYLOAD), 4000):
+            response = self.put(upload_id, offset, PAYLOAD[offset:offset + 4000])
+            self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["received"], len(PAYLOAD))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 201, response.data)
+        evidence = Evidence.objects.get(pk=response.data["id"])
+        with evidence.file.open("rb") as handle:
+            self.assertEqual(handle.read(), PAYLOAD)
+        self.assertEqual(evidence.uploaded_by, self.user)
+        self.assertTrue(AuditLog.objects.filter(action="evidence_created", object_id=evidence.pk).exists())
+        self.assertFalse(uploads.staging_path(EvidenceUpload.objects.get(pk=upload_id)).exists())
+
+        # Retried completion returns the same evidence
+        self.assertEqual(self.complete(upload_id).data["id"], evidence.pk)
+        self.assertEqual(Evidence.objects.count(), 1)
+
+    def test_one_writer_per_upload_with_or_without_fcntl(self):
+        upload = EvidenceUpload.objects.get(pk=self.start())
+        for lock_module in (uploads.fcntl, None):
+            with self.subTest(fcntl=lock_module), mock.patch.object(uploads, "fcntl", lock_module):
+                with uploads._open_locked(upload):
+                    self.assertEqual(self.put(upload.pk, 0, PAYLOAD[:4000]).status_code, 409)
+        self.assertEqual(self.put(upload.pk, 0, PAYLOAD[:4000]).status_code, 200)
+
+    def test_resume_after_interrupted_chunk(self):
+        upload_id = self.start()
+        self.put(upload_id, 0, PAYLOAD[:4000])
+
+        # Corrupted chunk is rolled back
+        response = self.put(upload_id, 4000, PAYLOAD[4000:8000], checksum="0" * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["received"], 4000)
+
+        # Client asks where to resume; a chunk at the wrong offset is refused
+        self.assertEqual(self.client.get(f"/api/evidence/uploads/{upload_id}/").data["received"], 4000)
+        response = self.put(upload_id, 8000, PAYLOAD[8000:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["received"], 4000)
+
+        self.put(upload_id, 4000, PAYLOAD[4000:8000])
+        self.put(upload_id, 8000, PAYLOAD[8000:])
+        self.assertEqual(self.complete(upload_id).status_code, 201)
+
+    def test_rejects_incomplete_oversized_and_mismatched_files(self):
+        upload_id = self.start()
+        self.assertEqual(self.put(upload_id, 0, PAYLOAD[:6000]).status_code, 413)
+        self.put(upload_id, 0, PAYLOAD[:4000])
+        self.assertEqual(self.complete(upload_id).status_code, 409)
+
+        bad = self.start(sha256="a" * 64)
+        for offset in range(0, len(PAYLOAD), 4000):
+            self.put(bad, offset, PAYLOAD[offset:offset + 4000])
+        self.assertEqual(self.complete(bad).status_code, 400)
+        self.assertFalse(Evidence.objects.exists())
+
+    def test_abort_and_purge(self):
+        upload_id = self.start()
+        upload = EvidenceUpload.objects.get(pk=upload_id)
+        self.assertEqual(self.client.delete(f"/api/evidence/uploads/{upload_id}/").status_code, 204)
+        self.assertFalse(uploads.staging_path(upload).exists())
+        self.assertEqual(self.put(upload_id, 0, PAYLOAD[:10]).status_code, 409)
+
+        stale = EvidenceUpload.objects.get(pk=self.start())
+        EvidenceUpload.objects.filter(pk=stale.pk).update(updated_at=timezone.now() - timedelta(days=2))
+        call_command("purge_evidence_uploads", stdout=open("/dev/null", "w"))
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, EvidenceUpload.STATUS_ABORTED)
+
+    def test_other_orgs_cannot_upload_or_see_uploads(self):
+        upload_id = self.start()
+        other = Organization.objects.create(name="Other")
+        self.client.force_authenticate(User.objects.create_user(username="x", password="pass", org=other, role="vendor"))
+        self.assertEqual(self.client.get(f"/api/evidence/uploads/{upload_id}/").status_code, 404)
+        self.assertEqual(self.put(upload_id, 0, PAYLOAD[:10]).status_code, 404)
+        response = self.client.post("/api/evidence/uploads/", {
+            "assessment": self.assessment.pk, "question_id": 1, "file_name": "a.pdf",
+            "file_type": "pdf", "size": 1, "sha256": "a" * 64,
+        }, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class EvidenceBlobTests(EvidenceTestCase):
+    def test_identical_files_are_stored_once(self):
+        first = self.post_file(self.assessment)
+        second = self.post_file(self.make_assessment(), name="copy.pdf")
+
+        blob = EvidenceBlob.objects.get()
+        self.assertEqual((blob.sha256, blob.size, blob.ref_count), (hashlib.sha256(PAYLOAD).hexdigest(), len(PAYLOAD), 2))
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertEqual(second.file_name, "copy.pdf")
+        self.assertEqual(blobs.storage().listdir(f"evidence/sha256/{blob.sha256[:2]}")[1], [blob.sha256])
+
+        # The file survives until its last reference is deleted, including cascades
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.delete(f"/api/evidence/{first.pk}/").status_code, 204)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 1)
+        self.assertTrue(blobs.storage().exists(blob.file.name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.assessment.delete()
+        self.assertFalse(EvidenceBlob.objects.exists())
+        self.assertFalse(blobs.storage().exists(blob.file.name))
+
+    def test_replacing_a_file_moves_the_reference(self):
+        evidence = self.post_file(self.assessment)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f"/api/evidence/{evidence.pk}/", {
+                "file": SimpleUploadedFile("v2.pdf", b"new version"),
+            }, format="multipart")
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(EvidenceBlob.objects.get().size, len(b"new version"))
+
+    def test_reference_taken_before_purge_keeps_the_file(self):
+        blob = blobs.store(ContentFile(PAYLOAD))
+        with self.captureOnCommitCallbacks() as callbacks:
+            blobs.release(blob.pk)
+        # A new upload of the same bytes lands before the purge runs
+        again, created = blobs.acquire(blob.sha256, blob.size)
+        self.assertEqual((again.pk, created), (blob.pk, False))
+        for callback in callbacks:
+            callback()
+        self.assertTrue(blobs.storage().exists(blob.file.name))
+        self.assertEqual(EvidenceBlob.objects.get().ref_count, 1)
+
+    def test_reference_taken_after_purge_writes_the_file_again(self):
+        blob = blobs.store(ContentFile(PAYLOAD))
+        with self.captureOnCommitCallbacks(execute=True):
+            blobs.release(blob.pk)
+        self.assertFalse(blobs.storage().exists(blob.file.name))
+        again, created = blobs.acquire(blob.sha256, blob.size)
+        self.assertTrue(created)
+        blobs.release(again.pk)
+
+        stored = blobs.store(ContentFile(PAYLOAD))
+        self.assertTrue(blobs.storage().exists(stored.file.name))
+
+    def test_known_file_released_during_upload_start_needs_the_bytes(self):
+        evidence = self.post_file(self.assessment)
+        known = EvidenceBlob.objects.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            evidence.delete()
+        with mock.patch("evidence.blobs.find", return_value=known):
+            response = self.client.post("/api/evidence/uploads/", {
+                "assessment": self.make_assessment().pk, "question_id": 2, "file_name": "again.pdf",
+                "file_type": "pdf", "size": len(PAYLOAD), "sha256": known.sha256,
+            }, format="json")
+        self.assertEqual(response.data["status"], EvidenceUpload.STATUS_OPEN)
+        self.assertEqual(EvidenceBlob.objects.get().ref_count, 0)
+
+    def test_known_file_uploads_instantly_within_the_org(self):
+        self.post_file(self.assessment)
+        response = self.client.post("/api/evidence/uploads/", {
+            "assessment": self.make_assessment().pk, "question_id": 2, "file_name": "again.pdf",
+            "file_type": "pdf", "size": len(PAYLOAD), "sha256": hashlib.sha256(PAYLOAD).hexdigest(),
+        }, format="json")
+        self.assertEqual(response.data["status"], EvidenceUpload.STATUS_COMPLETED)
+        self.assertEqual(response.data["received"], len(PAYLOAD))
+        self.assertEqual(Evidence.objects.get(pk=response.data["evidence"]).file_name, "again.pdf")
+        self.assertEqual(EvidenceBlob.objects.get().ref_count, 2)
+
+        # Another org has to send the bytes even though they are stored already
+        other = Organization.objects.create(name="Other")
+        self.client.force_authenticate(User.objects.create_user(username="o", password="pass", org=other, role="vendor"))
+        response = self.client.post("/api/evidence/uploads/", {
+            "assessment": Assessment.objects.create(
+                org=other, vendor=self.assessment.vendor, template=self.assessment.template
+            ).pk,
+            "question_id": 1, "file_name": "x.pdf", "file_type": "pdf",
+            "size": len(PAYLOAD), "sha256": hashlib.sha256(PAYLOAD).hexdigest(),
+        }, format="json")
+        self.assertEqual(response.data["status"], EvidenceUpload.STATUS_OPEN)
+
+    def test_backfill_deduplicates_existing_files(self):
+        names = [blobs.storage().save(f"evidence/report{i}.pdf", ContentFile(PAYLOAD)) for i in range(3)]
+        for name in names:
+            Evidence.objects.create(assessment=self.assessment, question_id=1, file=name, file_type="pdf")
+        Evidence.objects.create(assessment=self.assessment, question_id=1, file="evidence/gone.pdf", file_type="pdf")
+
+        call_command("dedupe_evidence_files", "--recount", stdout=open("/dev/null", "w"))
+
+        blob = EvidenceBlob.objects.get()
+        self.assertEqual(blob.ref_count, 3)
+        self.assertEqual(
+            sorted(Evidence.objects.filter(blob=blob).values_list("file_name", flat=True)),
+            ["report0.pdf", "report1.pdf", "report2.pdf"],
+        )
+        self.assertFalse(any(blobs.storage().exists(name) for name in names))
+        with Evidence.objects.filter(blob=blob).first().file.open("rb") as handle:
+            self.assertEqual(handle.read(), PAYLOAD)
+
+
+class EvidenceDownloadTests(EvidenceTestCase):
+    def setUp(self):
+        super().setUp()
+        blob = blobs.store(ContentFile(PAYLOAD))
+        self.evidence = Evidence.objects.create(
+            assessment=self.assessment, question_id=1, file=blob.file.name,
+            file_name="soc2.pdf", file_type="pdf", blob=blob,
+        )
+        self.url = f"/api/evidence/{self.evidence.pk}/download/"
+        self.etag = f'"{blob.sha256}"'
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_full_download(self):
+        response, body = self.get(HTTP_ACCEPT="application/pdf")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, PAYLOAD)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Content-Length"], str(len(PAYLOAD)))
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn('attachment; filename="soc2.pdf"', response["Content-Disposition"])
+
+    def test_ranges(self):
+        response, body = self.get(HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, PAYLOAD[100:200])
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(PAYLOAD)}")
+
+        response, body = self.get(HTTP_RANGE="bytes=-10")
+        self.assertEqual(body, PAYLOAD[-10:])
+        response, body = self.get(HTTP_RANGE="bytes=11990-")
+        self.assertEqual(body, PAYLOAD[11990:])
+
+        response, _ = self.get(HTTP_RANGE=f"bytes={len(PAYLOAD)}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{len(PAYLOAD)}")
+
+        # Multiple ranges or a stale If-Range fall back to the whole file
+        self.assertEqual(self.get(HTTP_RANGE="bytes=0-1,5-6")[0].status_code, 200)
+        self.assertEqual(self.get(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')[0].status_code, 200)
+        self.assertEqual(self.get(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=self.etag)[0].status_code, 206)
+
+    def test_conditional_request(self):
+        response, body = self.get(HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b"")
+
+    def test_front_end_handoff(self):
+        with self.settings(EVIDENCE_DOWNLOADS={"ACCEL_REDIRECT": "/protected/"}):
+            response, body = self.get()
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected/{self.evidence.file.name}")
+        self.assertEqual(body, b"")
+
+    def test_other_orgs_cannot_download(self):
+        other = Organization.objects.create(name="Other")
+        self.client.force_authenticate(User.objects.create_user(username="o", password="pass", org=other, role="vendor"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class EvidenceBundleTests(EvidenceTestCase):
+    def add(self, assessment, data, name, question_id=1):
+        blob = blobs.store(ContentFile(data))
+        return Evidence.objects.create(
+            assessment=assessment, question_id=question_id, file=blob.file.name,
+            file_name=name, file_type="pdf", blob=blob,
+        )
+
+    def bundle(self, **params):
+        response = self.client.get("/api/evidence/bundle/", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        chunks = list(response.streaming_content)
+        return chunks, zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+
+    def test_assessment_bundle_streams_files_and_manifest(self):
+        large = bytes(range(256)) * 2000
+        first = self.add(self.assessment, large, "big report.pdf")
+        second = self.add(self.assessment, PAYLOAD, "soc2.pdf", question_id=2)
+        Evidence.objects.create(assessment=self.assessment, question_id=3, file="evidence/gone.pdf", file_type="pdf")
+        self.add(self.make_assessment(), b"elsewhere", "other.pdf")
+
+        chunks, archive = self.bundle(assessment=self.assessment.pk)
+
+        # Sent in pieces no larger than a read block plus zip headers
+        self.assertGreater(len(chunks), 3)
+        self.assertLess(max(len(chunk) for chunk in chunks), 2 * blobs.READ_BLOCK)
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.read(f"assessment-{self.assessment.pk}/q1-{first.pk}-big_report.pdf"), large)
+        self.assertEqual(archive.read(f"assessment-{self.assessment.pk}/q2-{second.pk}-soc2.pdf"), PAYLOAD)
+
+        manifest = list(csv.DictReader(io.StringIO(archive.read("manifest.csv").decode())))
+        self.assertEqual([row["status"] for row in manifest], ["included", "included", "missing"])
+        self.assertEqual(manifest[1]["sha256"], hashlib.sha256(PAYLOAD).hexdigest())
+        self.assertEqual(manifest[0]["vendor"], "Acme")
+        self.assertTrue(AuditLog.objects.filter(action="evidence_bundle_downloaded").exists())
+
+    def test_vendor_bundle_spans_assessments(self):
+        self.add(self.assessment, PAYLOAD, "a.pdf")
+        self.add(self.make_assessment(), PAYLOAD, "b.pdf")
+        _, archive = self.bundle(vendor=self.assessment.vendor_id)
+        self.assertEqual(len([name for name in archive.namelist() if name != "manifest.csv"]), 2)
+
+    def test_bundle_requires_one_scope_in_own_org(self):
+        self.assertEqual(self.client.get("/api/evidence/bundle/").status_code, 400)
+        other = Organization.objects.create(name="Other")
+        self.client.force_authenticate(User.objects.create_user(username="o", password="pass", org=other, role="vendor"))
+        self.assertEqual(self.client.get("/api/evidence/bundle/", {"assessment": self.assessment.pk}).status_code, 404)
+
+
+class EvidenceExpiryTests(EvidenceTestCase):
+    def add(self, assessment, days, name="cert.pdf"):
+        return Evidence.objects.create(
+            assessment=assessment, question_id=1, file=f"evidence/{name}", file_name=name, file_type="pdf",
+            expiry_date=timezone.localdate() + timedelta(days=days),
+        )
+
+    def test_sweep_marks_evidence_flags_assessments_and_audits_once(self):
+        other = self.make_assessment()
+        expired = self.add(self.assessment, -1)
+        expiring = self.add(other, 10)
+        self.add(other, 100)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("sweep_evidence_expiry", "--chunk-size", "1", stdout=open("/dev/null", "w"))
+
+        self.assertEqual(
+            dict(Evidence.objects.values_list("pk", "expiry_state").filter(pk__in=[expired.pk, expiring.pk])),
+            {expired.pk: "expired", expiring.pk: "expiring"},
+        )
+        self.assessment.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.assessment.evidence_expiry, other.evidence_expiry), ("expired", "expiring"))
+        events = AuditLog.objects.filter(action__in=["evidence_expired", "evidence_expiring"])
+        self.assertEqual(sorted(events.values_list("object_id", "org_id")), [(expired.pk, self.org.pk), (expiring.pk, self.org.pk)])
+
+        # Nothing changed, nothing to do
+        self.assertEqual(expiry.sweep(), {"expired": 0, "expiring": 0, "": 0})
+        self.assertEqual(events.count(), 2)
+
+        # Renewal clears the flag on the next run; deletion clears it immediately
+        Evidence.objects.filter(pk=expiring.pk).update(expiry_date=timezone.localdate() + timedelta(days=365))
+        expiry.sweep()
+        other.refresh_from_db()
+        self.assertEqual(other.evidence_expiry, "")
+        expired.delete()
+        self.assessment.refresh_from_db()
+        self.assertEqual(self.assessment.evidence_expiry, "")
+
+    def test_expiring_endpoint(self):
+        later = self.add(self.assessment, 20)
+        sooner = self.add(self.assessment, 5)
+        gone = self.add(self.assessment, -3)
+        self.add(self.assessment, 60)
+        other = Organization.objects.create(name="Other")
+        Evidence.objects.create(
+            assessment=Assessment.objects.create(org=other, vendor=self.assessment.vendor, template=self.assessment.template),
+            question_id=1, file="evidence/x.pdf", file_type="pdf", expiry_date=timezone.localdate(),
+        )
+
+        response = self.client.get("/api/evidence/expiring/")
+        self.assertEqual([row["id"] for row in response.data["results"]], [sooner.pk, later.pk])
+        response = self.client.get("/api/evidence/expiring/", {"days": 10, "include_expired": 1})
+        self.assertEqual([row["id"] for row in response.data["results"]], [gone.pk, sooner.pk])
+
+
+def docx_bytes(text):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("[Content_Types].xml", "<Types/>")
+        archive.writestr("word/document.xml", f"<w:document><w:body><w:p><w:t>{text}</w:t></w:p></w:body></w:document>")
+    return buffer.getvalue()
+
+
+class EvidenceProcessingTests(EvidenceTestCase):
+    def upload(self, data, name, file_type="pdf", assessment=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            evidence = self.post_file(assessment or self.assessment, data=data, name=name)
+        evidence.refresh_from_db()
+        return evidence
+
+    def test_upload_is_sniffed_checksummed_and_text_indexed(self):
+        evidence = self.upload(b"Penetration test by Contoso, no critical findings.", "summary.txt")
+        self.assertEqual(evidence.processing_status, Evidence.PROCESSING_DONE)
+        self.assertEqual(evidence.detected_type, "text/plain")
+        self.assertIn("Contoso", evidence.extracted_text)
+        self.assertTrue(evidence.processing_results["checksum"]["intact"])
+
+        reviewer = User.objects.create_user(username="rev", password="pass", org=self.org, role="reviewer")
+        self.client.force_authenticate(reviewer)
+        [hit] = self.client.get("/api/search/", {"q": "contoso"}).data["results"]
+        self.assertEqual(hit["object_id"], evidence.pk)
+
+    def test_detected_type_ignores_client_label(self):
+        evidence = self.upload(b"%PDF-1.7 fake", "report.docx")
+        self.assertEqual((evidence.file_type, evidence.detected_type), ("pdf", "application/pdf"))
+        self.assertFalse(evidence.processing_results["sniff_mime"]["matches_name"])
+
+        evidence = self.upload(docx_bytes("Access control policy"), "policy.docx")
+        self.assertEqual(evidence.detected_type, OFFICE_DOCX)
+        self.assertEqual(evidence.extracted_text, "Access control policy")
+
+    def test_same_content_reuses_results(self):
+        first = self.upload(b"ISO 27001 certificate", "iso.txt")
+        with mock.patch.object(pipeline, "run_job", side_effect=AssertionError("file re-read")):
+            second = self.upload(b"ISO 27001 certificate", "iso-copy.txt", assessment=self.make_assessment())
+        self.assertEqual(second.processing_status, Evidence.PROCESSING_DONE)
+        self.assertEqual(second.extracted_text, first.extracted_text)
+
+    def test_scan_hook_quarantines_infected_files(self):
+        scanner = [sys.executable, "-c", "import sys; sys.exit(1 if b'EICAR' in sys.stdin.buffer.read() else 0)"]
+        with self.settings(EVIDENCE_PROCESSING={"INLINE": True, "SCAN_COMMAND": scanner}):
+            clean = self.upload(b"clean file", "clean.txt")
+            infected = self.upload(b"X5O!P%@AP EICAR test", "bad.txt")
+        self.assertEqual(clean.processing_status, Evidence.PROCESSING_DONE)
+        self.assertEqual(infected.processing_status, Evidence.PROCESSING_INFECTED)
+        self.assertEqual(self.client.get(f"/api/evidence/{infected.pk}/download/").status_code, 409)
+
+    def test_result_of_a_replaced_file_is_dropped(self):
+        scanner = [sys.executable, "-c", "import sys; sys.exit(1 if b'EICAR' in sys.stdin.buffer.read() else 0)"]
+        with self.settings(EVIDENCE_PROCESSING={"INLINE": True, "SCAN_COMMAND": scanner}):
+            with self.captureOnCommitCallbacks():
+                evidence = self.post_file(self.assessment, data=b"clean first version", name="v1.txt")
+            # What Pipeline.submit does; the job is still running in a worker below
+            [job] = pipeline.mark_running(pipeline.build_jobs([evidence.pk]))
+            stale = pipeline.run_job(job)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.patch(f"/api/evidence/{evidence.pk}/", {
+                    "file": SimpleUploadedFile("v2.txt", b"X5O!P%@AP EICAR test"),
+                }, format="multipart")
+            self.assertEqual(response.status_code, 200, response.data)
+            pipeline.save_results([stale])
+
+        evidence.refresh_from_db()
+        self.assertEqual(evidence.processing_status, Evidence.PROCESSING_INFECTED)
+        self.assertIn("EICAR", evidence.extracted_text)
+
+    def test_backfill_command_uses_a_process_pool(self):
+        names = [blobs.storage().save(f"evidence/legacy{i}.txt", ContentFile(f"legacy file {i}".encode())) for i in range(3)]
+        rows = [
+            Evidence.objects.create(assessment=self.assessment, question_id=1, file=name, file_type="txt")
+            for name in names
+        ]
+        self.assertEqual(Evidence.objects.filter(processing_status=Evidence.PROCESSING_PENDING).count(), 3)
+
+        # Worker processes load the real settings, so hand them absolute paths
+        call_command("process_evidence", "--workers", "2", stdout=open("/dev/null", "w"))
+        for row in rows:
+            row.refresh_from_db()
+            self.assertEqual(row.processing_status, Evidence.PROCESSING_DONE, row.processing_error)
+            self.assertTrue(row.extracted_text.startswith("legacy file"))
@@ -0,0 +1,263 @@
+"""
+Chunked, resumable evidence uploads.
+
+Protocol (see EvidenceUploadViewSet):
+  1. POST   /api/evidence/uploads/                 file name/type, size, sha256
+  2. PUT    /api/evidence/uploads/{id}/chunk/?offset=N   raw bytes, X-Chunk-SHA256
+  3. POST   /api/evidence/uploads/{id}/complete/   verifies sha256, creates Evidence
+
+Chunks are streamed from the request body to a staging file under
+EVIDENCE_UPLOADS["TEMP_DIR"] in small blocks, so a worker never holds more
+than READ_BLOCK bytes of a file in memory. A chunk only counts once it was
+fully received and its checksum matched; ``EvidenceUpload.received`` is the
+offset a client resumes from after an interruption (GET the upload).
+Completing stores the file content-addressed (see evidence.blobs); a file
+the org already stored completes at init without sending any bytes.
+"""
+import hashlib
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from audit.services import log_event
+from . import blobs
+from .models import Evidence, EvidenceUpload
+
+try:
+    import fcntl
+except ImportError:  # Windows: chunk writers are only serialized within this process
+    fcntl = None
+
+DEFAULTS = {
+    "TEMP_DIR": Path(settings.BASE_DIR) / "var" / "evidence_uploads",
+    "MAX_FILE_SIZE": 2 * 1024 ** 3,
+    "MAX_CHUNK_SIZE": 16 * 1024 ** 2,
+    "STALE_HOURS": 24,
+}
+
+READ_BLOCK = blobs.READ_BLOCK
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "EVIDENCE_UPLOADS", {}))
+    return config
+
+
+class UploadError(Exception):
+    """A rejected upload step; ``status_code`` is the HTTP status to answer with"""
+
+    def __init__(self, message, status_code=400, upload=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.upload = upload
+
+
+def staging_path(upload):
+    return Path(get_config()["TEMP_DIR"]) / f"{upload.pk}.part"
+
+
+_process_locks = weakref.WeakValueDictionary()
+_process_locks_guard = threading.Lock()
+
+
+def _process_lock(upload):
+    with _process_locks_guard:
+        lock = _process_locks.get(upload.pk)
+        if lock is None:
+            lock = _process_locks[upload.pk] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def _open_locked(upload):
+    """Open the staging file with an exclusive lock; one writer per upload at a time"""
+    try:
+        handle = open(staging_path(upload), "r+b")
+    except FileNotFoundError:
+        raise UploadError("Upload staging file is missing; start a new upload", 410, upload)
+    with handle:
+        if fcntl:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadError("Another request is writing to this upload", 409, upload)
+            yield handle
+            return
+        lock = _process_lock(upload)
+        if not lock.acquire(blocking=False):
+            raise UploadError("Another request is writing to this upload", 409, upload)
+        try:
+            yield handle
+        finally:
+            lock.release()
+
+
+def _require_open(upload):
+    if upload.status != EvidenceUpload.STATUS_OPEN:
+        raise UploadError(f"Upload is {upload.status}", 409, upload)
+
+
+def start(user, **fields):
+    """
+    Create an upload and its empty staging file. If the org already stored
+    a file with the same sha256 and size, the upload completes at once
+    without any bytes being sent (status "completed").
+    """
+    upload = EvidenceUpload.objects.create(created_by=user, **fields)
+    existing = blobs.find(upload.sha256, upload.size, upload.assessment.org_id)
+    if existing is not None:
+        blob, created = blobs.acquire(existing.sha256, existing.size)
+        if not created:
+            upload.received = upload.size
+            _finish(upload, user, blob, received=upload.size)
+            return upload
+        # The last reference went away since find(); there are no bytes behind this row
+        blobs.release(blob.pk)
+    path = staging_path(upload)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+    return upload
+
+
+def write_chunk(upload, offset, stream, length, chunk_sha256=None):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset``, which must
+    equal upload.received. On a short read or checksum mismatch the staging
+    file is cut back to ``offset`` and the chunk can simply be re-sent.
+    """
+    _require_open(upload)
+    config = get_config()
+    if length <= 0:
+        raise UploadError("Empty chunk", 400, upload)
+    if length > config["MAX_CHUNK_SIZE"]:
+        raise UploadError(f"Chunks may be at most {config['MAX_CHUNK_SIZE']} bytes", 413, upload)
+    if offset + length > upload.size:
+        raise UploadError("Chunk extends past the declared file size", 400, upload)
+
+    with _open_locked(upload) as handle:
+        # Another request may have committed a chunk while we waited on the network
+        upload.refresh_from_db(fields=["received", "status"])
+        _require_open(upload)
+        if offset != upload.received:
+            raise UploadError(f"Expected offset {upload.received}", 409, upload)
+
+        digest = hashlib.sha256()
+        handle.seek(offset)
+        handle.truncate()
+        remaining = length
+        while remaining:
+            block = stream.read(min(READ_BLOCK, remaining))
+            if not block:
+                break
+            digest.update(block)
+            handle.write(block)
+            remaining -= len(block)
+
+        if remaining:
+            handle.truncate(offset)
+            raise UploadError(f"Chunk ended after {length - remaining} of {length} bytes", 400, upload)
+        if chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+            handle.truncate(offset)
+            raise UploadError("Chunk checksum mismatch", 400, upload)
+
+        handle.flush()
+        os.fsync(handle.fileno())
+        EvidenceUpload.objects.filter(pk=upload.pk, received=offset).update(
+            received=offset + length, updated_at=timezone.now()
+        )
+    upload.received = offset + length
+    return upload
+
+
+def _finish(upload, user, blob, **updates):
+    """Create the Evidence for ``upload`` on ``blob``, whose reference it takes over"""
+    try:
+        with transaction.atomic():
+            claimed = EvidenceUpload.objects.filter(pk=upload.pk, status=EvidenceUpload.STATUS_OPEN).update(
+                status=EvidenceUpload.STATUS_COMPLETED, updated_at=timezone.now(), **updates
+            )
+            if claimed:
+                evidence = Evidence.objects.create(
+                    assessment_id=upload.assessment_id,
+                    question_id=upload.question_id,
+                    file=blob.file.name,
+                    file_name=upload.file_name,
+                    file_type=upload.file_type,
+                    expiry_date=upload.expiry_date,
+                    uploaded_by=user,
+                    blob=blob,
+                )
+                EvidenceUpload.objects.filter(pk=upload.pk).update(evidence=evidence)
+                log_event(
+                    user=user,
+                    action="evidence_created",
+                    object_id=evidence.id,
+                    metadata={
+                        "assessment_id": evidence.assessment_id,
+                        "file_name": upload.file_name,
+                        "size": upload.size,
+                        "sha256": upload.sha256,
+                        "upload_id": str(upload.pk),
+                    },
+                )
+                transaction.on_commit(lambda: staging_path(upload).unlink(missing_ok=True))
+    except Exception:
+        blobs.release(blob.pk)
+        raise
+
+    if not claimed:
+        blobs.release(blob.pk)
+        upload.refresh_from_db()
+        if upload.evidence_id:
+            return upload.evidence
+        raise UploadError(f"Upload is {upload.status}", 409, upload)
+
+    upload.status = EvidenceUpload.STATUS_COMPLETED
+    upload.evidence = evidence
+    return evidence
+
+
+def complete(upload, user):
+    """
+    Verify the whole file and turn the upload into an Evidence row.
+    Completing an already completed upload returns its Evidence again.
+    """
+    if upload.status == EvidenceUpload.STATUS_COMPLETED and upload.evidence_id:
+        return upload.evidence
+    _require_open(upload)
+    if upload.received != upload.size:
+        raise UploadError(f"Received {upload.received} of {upload.size} bytes", 409, upload)
+
+    with _open_locked(upload) as handle:
+        if blobs.hash_file(handle) != (upload.sha256, upload.size):
+            raise UploadError("File checksum mismatch; abort and upload again", 400, upload)
+        # Copy into storage (if these bytes are new) before taking the database write lock
+        blob = blobs.store(handle, upload.sha256, upload.size)
+    return _finish(upload, user, blob)
+
+
+def abort(upload):
+    """Cancel an open upload and delete its staging file"""
+    if EvidenceUpload.objects.filter(pk=upload.pk, status=EvidenceUpload.STATUS_OPEN).update(
+        status=EvidenceUpload.STATUS_ABORTED, updated_at=timezone.now()
+    ):
+        staging_path(upload).unlink(missing_ok=True)
+        upload.status = EvidenceUpload.STATUS_ABORTED
+        return True
+    return False
+
+
+def purge_stale(hours=None):
+    """Abort open uploads untouched for ``hours``; returns how many were aborted"""
+    hours = hours if hours is not None else get_config()["STALE_HOURS"]
+    cutoff = timezone.now() - timedelta(hours=hours)
+    stale = EvidenceUpload.objects.filter(status=EvidenceUpload.STATUS_OPEN, updated_at__lt=cutoff)
+    return sum(abort(upload) for upload in stale.iterator())
@@ -1,7 +1,9 @@
 from rest_framework.routers import DefaultRouter
-from .views import EvidenceViewSet
+from .views import EvidenceUploadViewSet, EvidenceViewSet
 
 router = DefaultRouter()
+# Registered first so "uploads/" is not taken for an evidence pk
+router.register("uploads", EvidenceUploadViewSet, basename="evidence-upload")
 router.register("", EvidenceViewSet)
 
 urlpatterns = router.urls
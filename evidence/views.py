@@ -1,9 +1,30 @@
-from rest_framework.viewsets import ModelViewSet
+import os
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework import mixins, status
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
+from rest_framework.exceptions import NotFound, ValidationError
 
-from .models import Evidence
-from .serializers import EvidenceSerializer
+from . import blobs, bundles, downloads, expiry, pipeline, uploads
+from .models import Evidence, EvidenceUpload
+from .serializers import EvidenceSerializer, EvidenceUploadSerializer
+from assessments.models import Assessment
 from audit.services import log_event
+from vendors.models import Vendor
+
+
+class ExpiringEvidencePagination(CursorPagination):
+    ordering = ("expiry_date", "pk")
+    page_size = 100
+    max_page_size = 500
+    page_size_query_param = "page_size"
 
 
 class EvidenceViewSet(ModelViewSet):
@@ -16,29 +37,55 @@ class EvidenceViewSet(ModelViewSet):
         user = self.request.user
         return Evidence.objects.filter(assessment__org=user.org)
 
+    def _store(self, serializer):
+        """Swap an uploaded file for a reference to its content-addressed blob"""
+        upload = serializer.validated_data.get("file")
+        if upload is None:
+            return {}
+        blob = blobs.store(upload)
+        return {
+            "blob": blob,
+            "file": blob.file.name,
+            "file_name": serializer.validated_data.get("file_name") or os.path.basename(upload.name),
+        }
+
+    def _save(self, serializer, **kwargs):
+        stored = self._store(serializer)
+        try:
+            with transaction.atomic():
+                return serializer.save(**kwargs, **stored)
+        except Exception:
+            if stored:
+                blobs.release(stored["blob"].pk)
+            raise
+
     def perform_create(self, serializer):
         """Log evidence creation"""
-        evidence = serializer.save(uploaded_by=self.request.user)
+        evidence = self._save(serializer, uploaded_by=self.request.user)
         log_event(
             user=self.request.user,
             action="evidence_created",
             object_id=evidence.id,
             metadata={
                 "assessment_id": evidence.assessment.id,
-                "file_name": evidence.file.name if evidence.file else None
+                "file_name": evidence.file_name or evidence.file.name
             }
         )
 
     def perform_update(self, serializer):
         """Log evidence update"""
-        evidence = serializer.save()
+        previous_blob = serializer.instance.blob_id
+        evidence = self._save(serializer)
+        if previous_blob and serializer.validated_data.get("file") is not None:
+            # The new file took its own reference, even when the content is unchanged
+            blobs.release(previous_blob)
         log_event(
             user=self.request.user,
             action="evidence_updated",
             object_id=evidence.id,
             metadata={
                 "assessment_id": evidence.assessment.id,
-                "file_name": evidence.file.name if evidence.file else None
+                "file_name": evidence.file_name or evidence.file.name
             }
         )
 
@@ -46,10 +93,143 @@ class EvidenceViewSet(ModelViewSet):
         """Log evidence deletion"""
         eid = instance.id
         assessment_id = instance.assessment.id
-        instance.delete()
+        # The post_delete handler releases the blob; its file goes with the last reference
+        with transaction.atomic():
+            instance.delete()
         log_event(
             user=self.request.user,
             action="evidence_deleted",
             object_id=eid,
             metadata={"assessment_id": assessment_id}
         )
+
+    @action(detail=False, methods=["get"], pagination_class=ExpiringEvidencePagination)
+    def expiring(self, request):
+        """
+        Evidence expiring within ?days= (default EVIDENCE_EXPIRY['WARNING_DAYS']),
+        soonest first; ?include_expired=1 adds already expired files.
+        """
+        try:
+            days = int(request.query_params.get("days", expiry.get_config()["WARNING_DAYS"]))
+        except ValueError:
+            raise ValidationError({"days": "Must be an integer."})
+        today, until = expiry.horizon(days=max(days, 0))
+
+        queryset = self.get_queryset().filter(expiry_date__isnull=False, expiry_date__lte=until)
+        if request.query_params.get("include_expired") != "1":
+            queryset = queryset.filter(expiry_date__gte=today)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @action(detail=False, methods=["get"], renderer_classes=[JSONRenderer, downloads.FileDownloadRenderer])
+    def bundle(self, request):
+        """
+        Stream a ZIP of every evidence file for ?assessment=ID or ?vendor=ID
+        (all of the vendor's assessments), plus a manifest.csv.
+        """
+        params = {key: request.query_params.get(key) for key in ("assessment", "vendor")}
+        if bool(params["assessment"]) == bool(params["vendor"]):
+            raise ValidationError("Pass exactly one of 'assessment' or 'vendor'.")
+        key, value = next((key, value) for key, value in params.items() if value)
+        if not value.isdigit():
+            raise ValidationError({key: "Must be an integer id."})
+
+        scope = {"assessment_id": int(value)} if key == "assessment" else {"assessment__vendor_id": int(value)}
+        queryset = self.get_queryset().filter(**scope)
+        if key == "assessment" and not Assessment.objects.filter(pk=value, org=request.user.org).exists():
+            raise NotFound("Assessment not found.")
+        if key == "vendor" and not Vendor.objects.filter(pk=value, org=request.user.org).exists():
+            raise NotFound("Vendor not found.")
+
+        log_event(
+            user=request.user,
+            action="evidence_bundle_downloaded",
+            object_id=int(value),
+            metadata={key + "_id": int(value), "files": queryset.count()},
+        )
+        response = StreamingHttpResponse(bundles.stream_zip(queryset), content_type="application/zip")
+        response["Content-Disposition"] = content_disposition_header(True, f"{key}-{value}-evidence.zip")
+        response["Cache-Control"] = "private, no-store"
+        return response
+
+    @action(detail=True, methods=["get"], renderer_classes=[JSONRenderer, downloads.FileDownloadRenderer])
+    def download(self, request, pk=None):
+        """
+        Stream the file. Supports Range (206 / 416), If-None-Match (304) and
+        If-Range; ?inline=1 lets browsers show PDFs in place.
+        """
+        evidence = self.get_object()
+        if evidence.processing_status == Evidence.PROCESSING_INFECTED:
+            return Response({"detail": "This file failed the virus scan."}, status=status.HTTP_409_CONFLICT)
+        return downloads.serve(request, evidence, as_attachment=request.query_params.get("inline") != "1")
+
+    @action(detail=True, methods=["post"])
+    def reprocess(self, request, pk=None):
+        """Queue the file for the processing pipeline again"""
+        evidence = self.get_object()
+        Evidence.objects.filter(pk=evidence.pk).update(processing_status=Evidence.PROCESSING_PENDING)
+        transaction.on_commit(lambda: pipeline.enqueue([evidence.pk], reuse=False))
+        evidence.refresh_from_db()
+        return Response(self.get_serializer(evidence).data, status=status.HTTP_202_ACCEPTED)
+
+
+class EvidenceUploadViewSet(mixins.CreateModelMixin,
+                            mixins.RetrieveModelMixin,
+                            mixins.DestroyModelMixin,
+                            GenericViewSet):
+    """
+    Chunked, resumable evidence upload (see evidence.uploads).
+
+    POST {"assessment", "question_id", "file_name", "file_type", "size", "sha256"}
+    PUT .../{id}/chunk/?offset=N with the raw bytes (X-Chunk-SHA256 optional)
+    POST .../{id}/complete/ creates the Evidence; GET .../{id}/ returns
+    "received", the offset to resume from; DELETE aborts.
+    """
+    serializer_class = EvidenceUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Only uploads for the user's org"""
+        return EvidenceUpload.objects.filter(assessment__org=self.request.user.org)
+
+    def perform_create(self, serializer):
+        serializer.instance = uploads.start(self.request.user, **serializer.validated_data)
+
+    def perform_destroy(self, instance):
+        uploads.abort(instance)
+
+    def _error(self, exc):
+        body = {"detail": str(exc)}
+        if exc.upload is not None:
+            body["received"] = exc.upload.received
+            body["size"] = exc.upload.size
+        return Response(body, status=exc.status_code)
+
+    @action(detail=True, methods=["put"])
+    def chunk(self, request, pk=None):
+        upload = self.get_object()
+        try:
+            offset = int(request.query_params.get("offset", ""))
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            raise ValidationError({"offset": "An integer byte offset is required."})
+
+        # Read the raw body stream; request.data would buffer the whole chunk
+        try:
+            uploads.write_chunk(upload, offset, request.stream, length, request.headers.get("X-Chunk-SHA256"))
+        except uploads.UploadError as exc:
+            return self._error(exc)
+        return Response({"id": upload.pk, "received": upload.received, "size": upload.size})
+
+    @action(detail=True, methods=["post"])
+    def complete(self, request, pk=None):
+        upload = self.get_object()
+        already_done = upload.status == EvidenceUpload.STATUS_COMPLETED
+        try:
+            evidence = uploads.complete(upload, request.user)
+        except uploads.UploadError as exc:
+            return self._error(exc)
+        return Response(
+            EvidenceSerializer(evidence, context={"request": request}).data,
+            status=status.HTTP_200_OK if already_done else status.HTTP_201_CREATED,
+        )
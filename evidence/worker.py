@@ -0,0 +1,41 @@
+"""
+Code that runs inside evidence processing worker processes.
+
+Kept free of model imports at module level: a spawned worker unpickles
+these functions before its initializer has called django.setup().
+"""
+from django.utils.module_loading import import_string
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def _open(job):
+    if job.get("path"):
+        return open(job["path"], "rb")
+    from .blobs import storage
+    return storage().open(job["name"], "rb")
+
+
+def run_job(job):
+    """Run every processor over one file; returns (evidence_id, file name, results, errors)"""
+    info = dict(job["info"])
+    results, errors = {}, {}
+    try:
+        handle = _open(job)
+    except OSError as exc:
+        return job["evidence_id"], job["name"], results, {"open": str(exc)}
+    with handle:
+        for dotted in job["processors"]:
+            name = dotted.rsplit(".", 1)[-1]
+            handle.seek(0)
+            try:
+                results[name] = import_string(dotted)(handle, info) or {}
+            except Exception as exc:
+                errors[name] = f"{type(exc).__name__}: {exc}"
+                continue
+            if results[name].get("mime_type"):
+                info["mime_type"] = results[name]["mime_type"]
+    return job["evidence_id"], job["name"], results, errors
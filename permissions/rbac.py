@@ -42,10 +42,17 @@ class CanCreateTemplateVersion(BasePermission):
         return True
 
 
+def requested_transition(request, view):
+    """Target status of a bulk assessment transition, or None"""
+    if view.action == 'bulk_transition' and isinstance(request.data, dict):
+        return request.data.get('status')
+    return None
+
+
 class CanSubmitAssessment(BasePermission):
     """Vendors, reviewers, and admins can submit assessments"""
     def has_permission(self, request, view):
-        if view.action == 'submit':
+        if view.action in ('submit', 'submit_all') or requested_transition(request, view) == 'submitted':
             user_role = getattr(request.user, 'role', None)
             if user_role not in [Roles.VENDOR, Roles.REVIEWER, Roles.ADMIN]:
                 # Provide a helpful message for denied permissions
@@ -58,7 +65,7 @@ class CanSubmitAssessment(BasePermission):
 class CanReviewAssessment(BasePermission):
     """Only reviewers and admins can review assessments"""
     def has_permission(self, request, view):
-        if view.action == 'review':
+        if view.action == 'review' or requested_transition(request, view) == 'reviewed':
             if getattr(request.user, 'role', None) not in [Roles.REVIEWER, Roles.ADMIN]:
                 self.message = "Only users with role 'REVIEWER' or 'ADMIN' can review assessments"
                 return False
@@ -69,7 +76,7 @@ class CanReviewAssessment(BasePermission):
 class CanApproveAssessment(BasePermission):
     """Only admins can approve assessments"""
     def has_permission(self, request, view):
-        if view.action == 'approve':
+        if view.action == 'approve' or requested_transition(request, view) == 'approved':
             if getattr(request.user, 'role', None) != Roles.ADMIN:
                 self.message = "Only users with role 'ADMIN' can approve assessments"
                 return False
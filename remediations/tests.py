@@ -1,3 +1,129 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+
+from assessments import scoring
+from assessments.models import Assessment, ScoringJob
+from audit.models import AuditLog
+from dashboard import counters
+from orgs.models import Organization
+from services.scoring_stub import StubScoringMixin, stub_score
+from templates.models import Template
+from vendors.models import Vendor
+from .models import Remediation
+
+User = get_user_model()
+
+
+class RemediationCloseScoringTests(StubScoringMixin, APITestCase):
+    scoring_overrides = {"RETRIES": 0, "BREAKER_THRESHOLD": 100}
+
+    def setUp(self):
+        super().setUp()
+        self.org = Organization.objects.create(name="Org")
+        self.user = User.objects.create_user(username="reviewer", password="pass", org=self.org, role="reviewer")
+        vendor = Vendor.objects.create(org=self.org, name="V")
+        template = Template.objects.create(org=self.org, name="T")
+        self.assessment = Assessment.objects.create(org=self.org, vendor=vendor, template=template)
+        self.remediation = Remediation.objects.create(
+            org_id=self.org.id, assessment=self.assessment, issue="MFA", status="responded"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def close(self, remediation=None):
+        remediation = remediation or self.remediation
+        return self.client.post(f"/api/remediations/{remediation.pk}/close/")
+
+    def test_close_queues_scoring_without_calling_the_service(self):
+        self.stub.delay = 5
+        response = self.close()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stub.requests, [])
+
+        job = ScoringJob.objects.get(pk=response.data["scoring_job_id"])
+        self.assertEqual((job.assessment_id, job.org_id, job.reason, job.status),
+                         (self.assessment.pk, self.org.pk, "remediation_closed", ScoringJob.STATUS_PENDING))
+        self.remediation.refresh_from_db()
+        self.assertEqual(self.remediation.status, "closed")
+        self.assertTrue(AuditLog.objects.filter(action="remediation_closed", object_id=self.remediation.pk).exists())
+
+    def test_close_moves_dashboard_counters(self):
+        self.close()
+        counts = counters.get_counts(self.org.id)
+        self.assertEqual(counts.get("remediations.status.responded"), 0)
+        self.assertEqual(counts.get("remediations.status.closed"), 1)
+        self.assertEqual(counters.check([self.org.id]), {})
+
+    def test_close_in_wrong_state_queues_nothing(self):
+        self.remediation.status = "open"
+        self.remediation.save()
+        self.assertEqual(self.close().status_code, 409)
+        self.assertFalse(ScoringJob.objects.exists())
+
+    def test_dispatch_coalesces_jobs_and_stores_the_score(self):
+        second = Remediation.objects.create(
+            org_id=self.org.id, assessment=self.assessment, issue="Backups", status="responded"
+        )
+        self.close()
+        self.close(second)
+
+        totals = scoring.dispatch()
+        self.assertEqual((totals["scored"], totals["jobs"]), (1, 2))
+        self.assertEqual(len(self.stub.requests), 1)
+
+        self.assessment.refresh_from_db()
+        expected = stub_score(self.assessment.pk)
+        self.assertEqual((self.assessment.score, self.assessment.risk_level), (expected["score"], expected["risk_level"]))
+        self.assertEqual(ScoringJob.objects.filter(status=ScoringJob.STATUS_DONE).count(), 2)
+        event = AuditLog.objects.get(action="scoring_completed")
+        self.assertEqual((event.org_id, event.object_id, event.metadata["jobs"]), (self.org.pk, self.assessment.pk, 2))
+
+    def test_failures_back_off_then_give_up(self):
+        self.close()
+        self.stub.fail_next = [503]
+        with self.settings(SCORING_OUTBOX={"AUTOSTART": False, "MAX_ATTEMPTS": 2, "BACKOFF": 60}):
+            self.assertEqual(scoring.dispatch()["retried"], 1)
+            job = ScoringJob.objects.get()
+            self.assertEqual((job.status, job.attempts), (ScoringJob.STATUS_PENDING, 1))
+            self.assertGreater(job.next_attempt_at, timezone.now() + timedelta(seconds=30))
+            # Not due yet
+            self.assertEqual(scoring.dispatch()["batches"], 0)
+
+            ScoringJob.objects.update(next_attempt_at=timezone.now())
+            self.stub.fail_next = [503]
+            self.assertEqual(scoring.dispatch()["failed"], 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ScoringJob.STATUS_FAILED, 2))
+        self.assertEqual(AuditLog.objects.get(action="scoring_failed").metadata["reason"], "http_503")
+        self.assertIsNone(Assessment.objects.get(pk=self.assessment.pk).score)
+
+        out = StringIO()
+        call_command("dispatch_scoring_jobs", "--retry-failed", stdout=out)
+        self.assertIn("Scored 1 assessments for 1 jobs", out.getvalue())
+        self.assertEqual(ScoringJob.objects.get().status, ScoringJob.STATUS_DONE)
+
+    def test_dispatcher_autostarts_only_in_web_processes(self):
+        with self.settings(SCORING_OUTBOX={"AUTOSTART": True}), \
+                mock.patch.object(scoring, "get_dispatcher") as get_dispatcher:
+            self.assertTrue(scoring.autostart())
+            with mock.patch("multiprocessing.parent_process", return_value=object()):
+                self.assertFalse(scoring.autostart())
+            self.assertEqual(get_dispatcher.return_value.wake.call_count, 1)
+        with self.settings(SCORING_OUTBOX={"AUTOSTART": False}):
+            self.assertFalse(scoring.autostart())
+
+    def test_expired_lease_is_picked_up_again(self):
+        self.close()
+        claimed = scoring.claim(10)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(scoring.claim(10), [])
+
+        # The dispatcher holding it died; once the lease ends another takes over
+        ScoringJob.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(scoring.dispatch()["jobs"], 1)
@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.decorators import action
@@ -6,8 +7,9 @@ from rest_framework.response import Response
 from .models import Remediation
 from .serializers import RemediationSerializer
 
+from assessments import scoring
 from audit.services import log_event
-from services.scoring_client import trigger_scoring
+from dashboard import counters
 
 
 class RemediationViewSet(viewsets.ModelViewSet):
@@ -23,7 +25,8 @@ class RemediationViewSet(viewsets.ModelViewSet):
         log_event(
             user=self.request.user,
             action="remediation_created",
-            obj=obj
+            object_id=obj.id,
+            metadata={"assessment_id": obj.assessment_id}
         )
 
     # vendor responds
@@ -41,7 +44,8 @@ class RemediationViewSet(viewsets.ModelViewSet):
         log_event(
             user=request.user,
             action="remediation_responded",
-            obj=obj
+            object_id=obj.id,
+            metadata={"assessment_id": obj.assessment_id}
         )
 
         return Response({"status": "responded"})
@@ -54,15 +58,24 @@ class RemediationViewSet(viewsets.ModelViewSet):
         if obj.status != "responded":
             return Response({"error": "invalid state"}, status=409)
 
-        obj.status = "closed"
-        obj.save()
-
-        trigger_scoring(obj.assessment.id)
+        # Close and queue the rescoring together; the scoring service is
+        # called later by the outbox dispatcher, never inside the request
+        with transaction.atomic():
+            closed = Remediation.objects.filter(pk=obj.pk, status="responded").update(status="closed")
+            if not closed:
+                return Response({"error": "invalid state"}, status=409)
+            # update() skips post_save, so move the dashboard counters here
+            counters.apply(obj.org_id, {
+                counters.counter_key("remediations.status", "responded"): -1,
+                counters.counter_key("remediations.status", "closed"): 1,
+            })
+            job = scoring.enqueue(obj.assessment_id, obj.org_id, "remediation_closed", request.user)
 
         log_event(
             user=request.user,
             action="remediation_closed",
-            obj=obj
+            object_id=obj.id,
+            metadata={"assessment_id": obj.assessment_id, "scoring_job_id": job.id}
         )
 
-        return Response({"status": "closed"})
+        return Response({"status": "closed", "scoring_job_id": job.id})
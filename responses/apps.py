@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class ResponsesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'responses'
+
+    def ready(self):
+        from . import signals
+        signals.connect()
@@ -0,0 +1,129 @@
+"""
+Differential saving of draft answers.
+
+Every Response stores a sha256 content_hash of its answer_text and a version
+that increases on each change. save_answers() reads the stored hash/version
+of the answers in a payload and writes only those whose text differs, so a
+repeated autosave of an unchanged form finishes with one SELECT and no
+write transaction (SQLite serializes writers, so an idle autosave must not
+take the write lock). Writes also adjust Assessment.answered_count.
+
+Clients may send, per answer:
+  * answer_text: the current text (omit it to send only content_hash)
+  * content_hash: hash of the text the client last saw stored
+  * version: version the client last saw; a newer stored version is a conflict
+"""
+from django.db import transaction
+
+from assessments.models import Assessment
+from .models import Response, content_hash
+from .signals import answers_saved
+
+UNCHANGED = "unchanged"
+CREATED = "created"
+UPDATED = "updated"
+CONFLICT = "conflict"
+LOCKED = "locked"
+
+EMPTY_HASH = content_hash("")
+
+
+def _load(assessment_id, question_ids, lock=False):
+    qs = Response.objects.filter(assessment_id=assessment_id, question_id__in=question_ids)
+    if lock:
+        qs = qs.select_for_update()
+    return {
+        row[0]: row[1:]
+        for row in qs.values_list("question_id", "id", "version", "content_hash", "submitted")
+    }
+
+
+def _classify(answer, stored):
+    """Result for one answer given its stored (id, version, hash, submitted) or None"""
+    text = answer.get("answer_text")
+    new_hash = content_hash(text) if text is not None else answer.get("content_hash")
+
+    if stored is None:
+        return CREATED if text is not None else CONFLICT
+    _, version, stored_hash, submitted = stored
+    if stored_hash == new_hash:
+        return UNCHANGED
+    if submitted:
+        return LOCKED
+    if text is None:
+        # Hash-only entry that no longer matches: the client is behind
+        return CONFLICT
+    if answer.get("version") is not None and answer["version"] != version:
+        return CONFLICT
+    if answer.get("content_hash") and answer["content_hash"] != stored_hash:
+        return CONFLICT
+    return UPDATED
+
+
+def _was_answered(stored):
+    return stored is not None and stored[2] != EMPTY_HASH
+
+
+def classify(assessment_id, answers, lock=False):
+    """{question_id: (result, stored state or None)} for a {question_id: answer} payload"""
+    state = _load(assessment_id, list(answers), lock=lock)
+    return {
+        question_id: (_classify(answer, state.get(question_id)), state.get(question_id))
+        for question_id, answer in answers.items()
+    }
+
+
+def save_answers(assessment_id, answers, plan=None):
+    """
+    Write the answers that changed. ``answers`` maps question_id to a dict
+    with answer_text and optional content_hash / version; ``plan`` is a
+    classify() result the caller already has. Returns
+    {question_id: {"result", "id", "version", "content_hash"}}.
+    """
+    plan = plan or classify(assessment_id, answers)
+    if any(result in (CREATED, UPDATED) for result, _ in plan.values()):
+        with transaction.atomic():
+            # Re-check under the write lock; another save may have landed meanwhile
+            plan = classify(assessment_id, answers, lock=True)
+            rows = [
+                Response(
+                    assessment_id=assessment_id,
+                    question_id=question_id,
+                    answer_text=answers[question_id]["answer_text"],
+                    content_hash=content_hash(answers[question_id]["answer_text"]),
+                    version=stored[1] + 1 if stored else 1,
+                )
+                for question_id, (result, stored) in plan.items()
+                if result in (CREATED, UPDATED)
+            ]
+            # The backend may split a large payload into several INSERTs
+            written = Response.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["assessment", "question_id"],
+                update_fields=["answer_text", "content_hash", "version"],
+            )
+            Assessment.add_answered(assessment_id, sum(
+                bool(row.answer_text) - _was_answered(plan[row.question_id][1]) for row in written
+            ))
+            answers_saved.send(
+                sender=Response, assessment_id=assessment_id, question_ids=[row.question_id for row in written]
+            )
+        written = {row.question_id: row for row in written}
+    else:
+        written = {}
+
+    results = {}
+    for question_id, (result, stored) in plan.items():
+        row = written.get(question_id)
+        if row is not None:
+            results[question_id] = {
+                "result": result, "id": row.pk, "version": row.version, "content_hash": row.content_hash,
+            }
+        elif stored is not None:
+            results[question_id] = {
+                "result": result, "id": stored[0], "version": stored[1], "content_hash": stored[2],
+            }
+        else:
+            results[question_id] = {"result": result, "id": None, "version": None, "content_hash": None}
+    return results
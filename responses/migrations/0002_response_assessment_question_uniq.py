@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:15
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def drop_duplicate_responses(apps, schema_editor):
+    """Keep one row per (assessment, question): the submitted one, else the newest"""
+    Response = apps.get_model('responses', 'Response')
+    duplicates = (
+        Response.objects.values('assessment_id', 'question_id')
+        .annotate(n=Count('id')).filter(n__gt=1).order_by()
+    )
+    for dup in duplicates.iterator():
+        rows = Response.objects.filter(
+            assessment_id=dup['assessment_id'], question_id=dup['question_id']
+        ).order_by('-submitted', '-id')
+        keep = rows.values_list('id', flat=True).first()
+        rows.exclude(id=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0007_assessmentcampaign'),
+        ('responses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_responses, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='response',
+            constraint=models.UniqueConstraint(fields=('assessment', 'question_id'), name='response_assessment_question_uniq'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:17
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_content_hashes(apps, schema_editor):
+    Response = apps.get_model('responses', 'Response')
+    batch = []
+    for response in Response.objects.only('id', 'answer_text').iterator(chunk_size=2000):
+        response.content_hash = hashlib.sha256((response.answer_text or '').encode('utf-8')).hexdigest()
+        batch.append(response)
+        if len(batch) >= 2000:
+            Response.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    if batch:
+        Response.objects.bulk_update(batch, ['content_hash'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('responses', '0002_response_assessment_question_uniq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='response',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(fill_content_hashes, migrations.RunPython.noop),
+    ]
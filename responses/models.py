@@ -1,8 +1,48 @@
-from django.db import models
+import hashlib
+
+from django.db import models, transaction
 from assessments.models import Assessment
 
+
+def content_hash(text):
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
 class Response(models.Model):
     assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE)
     question_id = models.UUIDField()
     answer_text = models.TextField(blank=True)
     submitted = models.BooleanField(default=False)
+    # sha256 of answer_text and a counter bumped on every change; autosave
+    # compares against these to skip unchanged answers (see drafts.py)
+    content_hash = models.CharField(max_length=64, blank=True, default="")
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            # One answer per question; bulk saves upsert on this key
+            models.UniqueConstraint(fields=["assessment", "question_id"], name="response_assessment_question_uniq"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Whether the stored row counts towards Assessment.answered_count
+        instance._answered = bool(instance.__dict__.get("answer_text"))
+        return instance
+
+    def save(self, *args, **kwargs):
+        new_hash = content_hash(self.answer_text)
+        if new_hash != self.content_hash:
+            if self.pk and self.content_hash:
+                self.version += 1
+            self.content_hash = new_hash
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "content_hash", "version"}
+
+        answered = bool(self.answer_text)
+        delta = answered - getattr(self, "_answered", False)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Assessment.add_answered(self.assessment_id, delta)
+        self._answered = answered
@@ -0,0 +1,71 @@
+"""
+Answered / total question counts per assessment.
+
+total is the number of TemplateQuestions in the active version(s) of the
+assessment's template; answered is the number of its Responses with a
+non-blank answer. Response.question_id is an opaque UUID rather than a key
+into TemplateQuestion, so completeness is count-based.
+
+Assessment.answered_count / question_count hold the same numbers
+denormalized for list views; recompute() repairs them from live rows (after
+template edits, raw SQL or queryset deletes of responses).
+"""
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from assessments.models import Assessment
+from templates.models import TemplateQuestion
+
+
+def question_count():
+    """Subquery: questions in the active template version(s) of the outer assessment"""
+    questions = (
+        TemplateQuestion.objects.filter(
+            section__template_version__template_id=OuterRef("template_id"),
+            section__template_version__is_active=True,
+        )
+        .order_by()
+        .values("section__template_version__template_id")
+        .annotate(n=Count("pk"))
+        .values("n")
+    )
+    return Coalesce(Subquery(questions, output_field=IntegerField()), Value(0))
+
+
+def progress(assessment_ids):
+    """{assessment_id: (answered, total)} in one aggregate query"""
+    rows = (
+        Assessment.objects.filter(pk__in=assessment_ids)
+        .order_by()
+        .annotate(
+            total=question_count(),
+            answered=Count("response", filter=~Q(response__answer_text="")),
+        )
+        .values_list("pk", "answered", "total")
+    )
+    return {pk: (answered, total) for pk, answered, total in rows}
+
+
+def recompute(org_ids=None, chunk_size=1000):
+    """Rewrite stored progress counters that differ from live counts; returns (checked, fixed)"""
+    qs = Assessment.objects.order_by("pk")
+    if org_ids:
+        qs = qs.filter(org_id__in=org_ids)
+
+    checked = fixed = 0
+    last_id = 0
+    while True:
+        rows = list(qs.filter(pk__gt=last_id).values_list("pk", "answered_count", "question_count")[:chunk_size])
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        live = progress([pk for pk, _, _ in rows])
+        stale = [
+            Assessment(pk=pk, answered_count=live[pk][0], question_count=live[pk][1])
+            for pk, answered, total in rows
+            if live[pk] != (answered, total)
+        ]
+        Assessment.objects.bulk_update(stale, ["answered_count", "question_count"])
+        checked += len(rows)
+        fixed += len(stale)
+    return checked, fixed
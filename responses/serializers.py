@@ -9,8 +9,39 @@ class ResponseSerializer(serializers.ModelSerializer):
         read_only_fields = [
             "id",
             "submitted",
+            "content_hash",
+            "version",
         ]
 
     def create(self, validated_data):
         # assessment should be provided in the payload (or set by the view)
         return super().create(validated_data)
+
+
+class AnswerSerializer(serializers.Serializer):
+    question_id = serializers.UUIDField()
+    answer_text = serializers.CharField(allow_blank=True, trim_whitespace=False)
+
+
+class BulkResponseSerializer(serializers.Serializer):
+    MAX_ANSWERS = 1000
+
+    assessment = serializers.IntegerField(min_value=1)
+    answers = AnswerSerializer(many=True, allow_empty=False, max_length=MAX_ANSWERS)
+
+
+class AutosaveAnswerSerializer(serializers.Serializer):
+    question_id = serializers.UUIDField()
+    answer_text = serializers.CharField(allow_blank=True, trim_whitespace=False, required=False)
+    content_hash = serializers.CharField(max_length=64, required=False)
+    version = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if "answer_text" not in attrs and "content_hash" not in attrs:
+            raise serializers.ValidationError("Send answer_text, content_hash, or both.")
+        return attrs
+
+
+class AutosaveSerializer(serializers.Serializer):
+    assessment = serializers.IntegerField(min_value=1)
+    answers = AutosaveAnswerSerializer(many=True, allow_empty=False, max_length=BulkResponseSerializer.MAX_ANSWERS)
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete
+from django.dispatch import Signal
+
+from assessments.models import Assessment
+from .models import Response
+
+# Sent after drafts.save_answers() wrote rows with bulk_create (post_save
+# does not fire). Arguments: assessment_id, question_ids.
+answers_saved = Signal()
+
+
+def uncount_deleted(sender, instance, **kwargs):
+    if instance.answer_text:
+        Assessment.add_answered(instance.assessment_id, -1)
+
+
+def connect():
+    post_delete.connect(uncount_deleted, sender=Response, dispatch_uid="responses-uncount-deleted")
@@ -1,3 +1,160 @@
-from django.test import TestCase
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from assessments.models import Assessment
+from audit.models import AuditLog
+from orgs.models import Organization
+from templates.models import Template
+from vendors.models import Vendor
+from . import drafts
+from .models import Response
+
+User = get_user_model()
+
+BULK_URL = '/api/responses/responses/bulk/'
+
+
+class BulkResponseTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name='Org')
+        self.user = User.objects.create_user(username='vendor', password='pass', org=self.org, role='vendor')
+        self.assessment = Assessment.objects.create(
+            org=self.org,
+            vendor=Vendor.objects.create(org=self.org, name='V'),
+            template=Template.objects.create(org=self.org, name='T'),
+        )
+        self.questions = [uuid.uuid4() for _ in range(300)]
+        self.client.force_authenticate(user=self.user)
+
+    def save(self, answers, assessment=None):
+        return self.client.post(BULK_URL, {
+            'assessment': (assessment or self.assessment).pk,
+            'answers': [{'question_id': str(q), 'answer_text': text} for q, text in answers],
+        }, format='json')
+
+    def test_upserts_answers_with_one_audit_event(self):
+        response = self.save([(q, 'first') for q in self.questions])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['saved'], 300)
+
+        response = self.save([(self.questions[0], 'changed'), (self.questions[1], 'changed')])
+        self.assertEqual(response.data['saved'], 2)
+        self.assertEqual(Response.objects.filter(assessment=self.assessment).count(), 300)
+        self.assertEqual(Response.objects.get(question_id=self.questions[0]).answer_text, 'changed')
+        self.assertEqual(AuditLog.objects.filter(action='responses_bulk_saved').count(), 2)
+
+    def test_statement_count_is_constant(self):
+        self.save([(self.questions[0], 'warm up')])
+        with CaptureQueriesContext(connection) as queries:
+            self.save([(q, 'a') for q in self.questions])
+        statements = [q['sql'] for q in queries.captured_queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        # A few lookups, one upsert per backend batch and one audit batch; not one write per answer
+        self.assertLess(len(statements), 15)
+
+    def test_submitted_answers_are_locked(self):
+        Response.objects.create(
+            assessment=self.assessment, question_id=self.questions[0], answer_text='final', submitted=True
+        )
+        response = self.save([(self.questions[0], 'late')])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Response.objects.get(question_id=self.questions[0]).answer_text, 'final')
+
+    def test_answer_submitted_during_save_is_a_conflict(self):
+        classify = drafts.classify
+
+        def submit_meanwhile(assessment_id, answers, lock=False):
+            if lock:
+                Response.objects.create(
+                    assessment=self.assessment, question_id=self.questions[1], answer_text='final', submitted=True
+                )
+            return classify(assessment_id, answers, lock=lock)
+
+        with mock.patch('responses.drafts.classify', side_effect=submit_meanwhile):
+            response = self.save([(self.questions[0], 'new'), (self.questions[1], 'late')])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['question_ids'], [str(self.questions[1])])
+        self.assertFalse(Response.objects.filter(question_id=self.questions[0]).exists())
+
+    def test_unchanged_answers_are_not_counted_as_saved(self):
+        self.save([(self.questions[0], 'same'), (self.questions[1], 'old')])
+        response = self.save([(self.questions[0], 'same'), (self.questions[1], 'new')])
+        self.assertEqual(response.data['saved'], 1)
+
+    def test_other_orgs_assessment_is_not_found(self):
+        other_org = Organization.objects.create(name='Other')
+        other = Assessment.objects.create(
+            org=other_org,
+            vendor=Vendor.objects.create(org=other_org, name='W'),
+            template=Template.objects.create(org=other_org, name='U'),
+        )
+        self.assertEqual(self.save([(self.questions[0], 'x')], assessment=other).status_code, 404)
+
+
+class AutosaveTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name='Org')
+        self.user = User.objects.create_user(username='vendor', password='pass', org=self.org, role='vendor')
+        self.assessment = Assessment.objects.create(
+            org=self.org,
+            vendor=Vendor.objects.create(org=self.org, name='V'),
+            template=Template.objects.create(org=self.org, name='T'),
+        )
+        self.questions = [uuid.uuid4() for _ in range(50)]
+        self.client.force_authenticate(user=self.user)
+
+    def autosave(self, answers):
+        return self.client.post('/api/responses/responses/autosave/', {
+            'assessment': self.assessment.pk,
+            'answers': [{'question_id': str(q), **fields} for q, fields in answers],
+        }, format='json')
+
+    def results(self, response):
+        return {row['question_id']: row for row in response.data['responses']}
+
+    def test_only_changed_answers_are_written(self):
+        first = self.autosave([(q, {'answer_text': 'draft'}) for q in self.questions])
+        self.assertEqual(first.data['written'], 50)
+        state = self.results(first)
+
+        answers = [(q, {'answer_text': 'draft', 'version': state[str(q)]['version']}) for q in self.questions]
+        answers[0] = (self.questions[0], {'answer_text': 'edited', 'version': 1})
+        second = self.autosave(answers)
+        self.assertEqual(second.data['written'], 1)
+        self.assertEqual(self.results(second)[str(self.questions[0])]['version'], 2)
+        self.assertEqual(Response.objects.get(question_id=self.questions[0]).answer_text, 'edited')
+
+    def test_unchanged_autosave_issues_no_writes(self):
+        first = self.autosave([(q, {'answer_text': 'draft'}) for q in self.questions])
+        hashes = {row['question_id']: row['content_hash'] for row in first.data['responses']}
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.autosave([(q, {'content_hash': hashes[str(q)]}) for q in self.questions])
+        self.assertEqual(response.data['written'], 0)
+        statements = [q['sql'].split()[0] for q in queries.captured_queries]
+        self.assertEqual(statements, ['SELECT', 'SELECT'])
+
+    def test_stale_version_is_a_conflict(self):
+        question = self.questions[0]
+        self.autosave([(question, {'answer_text': 'v1'})])
+        self.autosave([(question, {'answer_text': 'v2', 'version': 1})])
+
+        response = self.autosave([(question, {'answer_text': 'from old tab', 'version': 1})])
+        self.assertEqual(response.data['written'], 0)
+        self.assertEqual(self.results(response)[str(question)]['result'], 'conflict')
+        self.assertEqual(Response.objects.get(question_id=question).answer_text, 'v2')
+
+    def test_single_updates_keep_hash_and_version(self):
+        self.autosave([(self.questions[0], {'answer_text': 'v1'})])
+        row = Response.objects.get(question_id=self.questions[0])
+        row.answer_text = 'v2'
+        row.save()
+        row.refresh_from_db()
+        self.assertEqual(row.version, 2)
+
+        response = self.autosave([(self.questions[0], {'answer_text': 'v2'})])
+        self.assertEqual(response.data['written'], 0)
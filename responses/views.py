@@ -3,10 +3,13 @@ from rest_framework.decorators import action
 from rest_framework.response import Response as DRFResponse
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from django.db import transaction
 from django.utils import timezone
 
+from assessments.models import Assessment
 from .models import Response
-from .serializers import ResponseSerializer
+from . import drafts
+from .serializers import AutosaveSerializer, BulkResponseSerializer, ResponseSerializer
 from audit.services import log_event
 
 
@@ -48,6 +51,107 @@ class ResponseViewSet(ModelViewSet):
 
     # Save draft = normal create/update already works
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_save(self, request):
+        """
+        Save many draft answers for one assessment in a single upsert keyed
+        on (assessment, question_id), with one summarized audit event.
+        Answers identical to the stored text are not rewritten.
+        Body: {"assessment": id, "answers": [{"question_id": uuid, "answer_text": "..."}]}
+        """
+        serializer = BulkResponseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        assessment_id = serializer.validated_data["assessment"]
+        # Later duplicates of a question win, as if the answers were saved in order
+        answers = {
+            answer["question_id"]: {"answer_text": answer["answer_text"]}
+            for answer in serializer.validated_data["answers"]
+        }
+
+        if not Assessment.objects.filter(pk=assessment_id, org=request.user.org).exists():
+            return DRFResponse({"error": "Assessment not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        plan = drafts.classify(assessment_id, answers)
+        locked = [str(question_id) for question_id, (result, _) in plan.items() if result == drafts.LOCKED]
+        if locked:
+            return DRFResponse(
+                {"error": "Already submitted", "question_ids": locked},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        with transaction.atomic():
+            results = drafts.save_answers(assessment_id, answers, plan)
+            # save_answers re-classifies under lock; an answer submitted meanwhile undoes the whole save
+            locked = [str(question_id) for question_id, result in results.items() if result["result"] == drafts.LOCKED]
+            if locked:
+                transaction.set_rollback(True)
+                return DRFResponse(
+                    {"error": "Already submitted", "question_ids": locked},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            saved = sum(result["result"] in (drafts.CREATED, drafts.UPDATED) for result in results.values())
+            log_event(
+                user=request.user,
+                action="responses_bulk_saved",
+                object_id=assessment_id,
+                metadata={
+                    "assessment_id": assessment_id,
+                    "count": saved,
+                }
+            )
+
+        return DRFResponse({
+            "assessment": assessment_id,
+            "saved": saved,
+            "responses": [
+                {"id": result["id"], "question_id": str(question_id), "version": result["version"]}
+                for question_id, result in results.items()
+            ],
+        })
+
+    @action(detail=False, methods=["post"])
+    def autosave(self, request):
+        """
+        Differential draft save: only answers whose content changed are
+        written. Each answer may carry the content_hash / version the client
+        last saw; a stale one is reported as a conflict and not written.
+        An autosave with nothing changed performs no writes at all.
+        Body: {"assessment": id, "answers": [{"question_id": uuid, "answer_text": "...",
+               "content_hash": "...", "version": 3}]}
+        """
+        serializer = AutosaveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        assessment_id = serializer.validated_data["assessment"]
+        answers = {answer.pop("question_id"): answer for answer in serializer.validated_data["answers"]}
+
+        if not Assessment.objects.filter(pk=assessment_id, org=request.user.org).exists():
+            return DRFResponse({"error": "Assessment not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        results = drafts.save_answers(assessment_id, answers)
+        written = [
+            question_id for question_id, result in results.items()
+            if result["result"] in (drafts.CREATED, drafts.UPDATED)
+        ]
+        if written:
+            log_event(
+                user=request.user,
+                action="responses_autosaved",
+                object_id=assessment_id,
+                metadata={
+                    "assessment_id": assessment_id,
+                    "count": len(written),
+                }
+            )
+
+        return DRFResponse({
+            "assessment": assessment_id,
+            "written": len(written),
+            "responses": [
+                {"question_id": str(question_id), **result}
+                for question_id, result in results.items()
+            ],
+        })
+
     @action(detail=True, methods=["post"])
     def submit(self, request, pk=None):
         obj = self.get_object()
@@ -63,7 +167,9 @@ class ResponseViewSet(ModelViewSet):
             action="response_submitted",
             object_id=obj.id,
             metadata={
-                "assessment_id": obj.assessment.id,
+                "assessment_id": obj.assessment_id,
                 "question_id": str(obj.question_id)
             }
         )
+
+        return DRFResponse(self.get_serializer(obj).data)
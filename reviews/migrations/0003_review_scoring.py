@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0010_scoringjob'),
+        ('reviews', '0002_alter_review_options_remove_review_org_id_review_org_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='scoring_job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to='assessments.scoringjob'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='scoring_status',
+            field=models.CharField(blank=True, choices=[('', 'Not scored'), ('scoring_pending', 'Scoring pending'), ('scored', 'Scored'), ('scoring_failed', 'Scoring failed')], default='', max_length=20),
+        ),
+    ]
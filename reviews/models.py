@@ -1,6 +1,6 @@
 from django.db import models
 from django.conf import settings
-from assessments.models import Assessment
+from assessments.models import Assessment, ScoringJob
 from orgs.models import Organization
 
 
@@ -11,12 +11,28 @@ class Review(models.Model):
         ('rejected', 'Rejected'),
     ]
 
+    # Scoring of an approval (see REVIEW_SCORING); "" when nothing was scored
+    SCORING_PENDING = "scoring_pending"
+    SCORING_DONE = "scored"
+    SCORING_FAILED = "scoring_failed"
+
+    SCORING_STATUS = [
+        ("", "Not scored"),
+        (SCORING_PENDING, "Scoring pending"),
+        (SCORING_DONE, "Scored"),
+        (SCORING_FAILED, "Scoring failed"),
+    ]
+
     org = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True)
     assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE)
     reviewer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
     comments = models.TextField(blank=True, null=True)
     decision = models.CharField(max_length=20, choices=DECISION_CHOICES, default='pending')
+    scoring_status = models.CharField(max_length=20, choices=SCORING_STATUS, default="", blank=True)
+    scoring_job = models.ForeignKey(
+        ScoringJob, on_delete=models.SET_NULL, null=True, blank=True, related_name="reviews"
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
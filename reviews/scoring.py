@@ -0,0 +1,72 @@
+"""
+Scoring of review approvals.
+
+By default an approval is recorded at once with scoring_status
+"scoring_pending" and a ScoringJob in the same transaction; the scoring
+outbox (assessments.scoring) scores the assessment in the background and the
+receivers below move the review to "scored" or "scoring_failed". Orgs listed
+in REVIEW_SCORING["SYNC_ORGS"] (or every org with MODE "sync") keep the
+blocking behaviour: the service is called inside the request and the
+approval is refused with 502 if scoring fails.
+"""
+from django.conf import settings
+
+from assessments.models import Assessment
+from assessments.signals import assessment_scored, scoring_failed
+from .models import Review
+
+DEFAULTS = {
+    "MODE": "async",  # or "sync"
+    "SYNC_ORGS": [],  # org ids that always score synchronously
+    "MAX_WAIT": 30,  # seconds GET /api/reviews/{id}/score/?wait= may hold a request
+    "POLL_INTERVAL": 0.5,
+}
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "REVIEW_SCORING", {}))
+    return config
+
+
+def is_sync(org_id):
+    config = get_config()
+    return config["MODE"] == "sync" or org_id in config["SYNC_ORGS"]
+
+
+def mark_scored(sender, results, jobs, **kwargs):
+    Review.objects.filter(
+        scoring_job__in=[job.pk for job in jobs],
+        scoring_status__in=[Review.SCORING_PENDING, Review.SCORING_FAILED],
+    ).update(scoring_status=Review.SCORING_DONE)
+
+
+def mark_failed(sender, jobs, **kwargs):
+    Review.objects.filter(
+        scoring_job__in=[job.pk for job in jobs], scoring_status=Review.SCORING_PENDING
+    ).update(scoring_status=Review.SCORING_FAILED)
+
+
+def status(review):
+    """Scoring state of one review for the score endpoint"""
+    job = review.scoring_job
+    return {
+        "review_id": review.id,
+        "assessment_id": review.assessment_id,
+        "decision": review.decision,
+        "scoring_status": review.scoring_status,
+        "score": review.assessment.score,
+        "risk_level": review.assessment.risk_level,
+        "job": None if job is None else {
+            "id": job.id,
+            "status": job.status,
+            "attempts": job.attempts,
+            "next_attempt_at": job.next_attempt_at,
+            "last_error": job.last_error,
+        },
+    }
+
+
+def connect():
+    assessment_scored.connect(mark_scored, sender=Assessment, dispatch_uid="reviews_mark_scored")
+    scoring_failed.connect(mark_failed, sender=Assessment, dispatch_uid="reviews_mark_failed")
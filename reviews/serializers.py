@@ -4,8 +4,9 @@ from .models import Review
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
-        fields = ['id', 'org', 'assessment', 'reviewer', 'comments', 'decision', 'created_at', 'updated_at']
-        read_only_fields = ['reviewer', 'org', 'decision', 'created_at', 'updated_at']
+        fields = ['id', 'org', 'assessment', 'reviewer', 'comments', 'decision', 'scoring_status', 'scoring_job',
+                  'created_at', 'updated_at']
+        read_only_fields = ['reviewer', 'org', 'decision', 'scoring_status', 'scoring_job', 'created_at', 'updated_at']
 
 
 class ReviewDecisionSerializer(serializers.Serializer):
@@ -1,3 +1,200 @@
-from django.test import TestCase
+import time
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from assessments import scoring as scoring_outbox
+from assessments.models import Assessment, ScoringJob
+from audit.models import AuditLog
+from orgs.models import Organization
+from services import scoring
+from services.scoring_stub import StubScoringMixin, stub_score
+from templates.models import Template
+from vendors.models import Vendor
+from .models import Review
+
+User = get_user_model()
+
+
+class ScoringClientTests(StubScoringMixin, SimpleTestCase):
+    scoring_overrides = {"RETRIES": 2, "BREAKER_THRESHOLD": 3, "BREAKER_RESET": 30}
+
+    def test_calls_share_one_keep_alive_connection(self):
+        for assessment_id in range(1, 6):
+            self.assertEqual(scoring.call_scoring_service(assessment_id)["score"], stub_score(assessment_id)["score"])
+        self.assertEqual(len(self.stub.requests), 5)
+        self.assertEqual(self.stub.connections, 1)
+
+    def test_transient_failures_are_retried(self):
+        self.stub.fail_next = [503, 502]
+        self.assertEqual(scoring.call_scoring_service(7)["risk_level"], stub_score(7)["risk_level"])
+        metrics = scoring.metrics()
+        self.assertEqual((metrics["calls"], metrics["attempts"], metrics["retries"]), (1, 3, 2))
+        self.assertEqual(metrics["errors"], {"http_503": 1, "http_502": 1})
+        self.assertEqual(metrics["latency_ms"]["count"], 3)
+        self.assertEqual(metrics["circuit"], "closed")
+
+    def test_client_errors_are_not_retried(self):
+        self.stub.fail_next = [422]
+        with self.assertRaises(scoring.ScoringError) as raised:
+            scoring.call_scoring_service(7)
+        self.assertEqual(raised.exception.kind, "http_422")
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual(scoring.metrics()["circuit"], "closed")
+
+    def test_circuit_opens_fails_fast_and_recovers(self):
+        self.stub.fail_next = [500] * 3
+        with self.assertRaises(scoring.ScoringError):
+            scoring.call_scoring_service(1)
+        breaker = scoring.get_client().breaker
+        self.assertEqual(breaker.state, "open")
+
+        with self.assertRaises(scoring.ScoringUnavailable):
+            scoring.call_scoring_service(1)
+        self.assertEqual(len(self.stub.requests), 3)
+
+        # After BREAKER_RESET one trial call goes through and closes the circuit
+        breaker.opened_at -= 31
+        self.assertEqual(breaker.state, "half_open")
+        self.assertEqual(scoring.call_scoring_service(1)["score"], stub_score(1)["score"])
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(scoring.metrics()["rejected"], 1)
+
+    def test_failed_trial_reopens_the_circuit(self):
+        breaker = scoring.CircuitBreaker(threshold=2, reset_after=10, clock=lambda: now[0])
+        now = [0]
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+        now[0] = 11
+        self.assertTrue(breaker.allow())
+        # Only one trial at a time
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+
+    def test_unexpected_request_errors_end_a_half_open_trial(self):
+        self.stub.fail_next = [500] * 3
+        with self.assertRaises(scoring.ScoringError):
+            scoring.call_scoring_service(1)
+        client = scoring.get_client()
+        client.breaker.opened_at -= 31
+
+        with mock.patch.object(client.session, "post", side_effect=requests.exceptions.ChunkedEncodingError("torn")):
+            # The failed trial re-opens the circuit, so the retry is rejected
+            with self.assertRaises(scoring.ScoringUnavailable):
+                scoring.call_scoring_service(1)
+        self.assertEqual(scoring.metrics()["errors"]["request"], 1)
+        self.assertEqual(client.breaker.state, "open")
+
+        with mock.patch.object(client.session, "post", side_effect=RuntimeError("bug")):
+            client.breaker.opened_at -= 31
+            with self.assertRaises(RuntimeError):
+                scoring.call_scoring_service(1)
+        # The trial flag was cleared, so the next trial is let through
+        client.breaker.opened_at -= 31
+        self.assertEqual(scoring.call_scoring_service(1)["score"], stub_score(1)["score"])
+        self.assertEqual(client.breaker.state, "closed")
+
+    @override_settings(SCORING_SERVICE={"URL": "http://127.0.0.1:9", "RETRIES": 1, "BACKOFF": 0})
+    def test_unreachable_service(self):
+        with self.assertRaises(scoring.ScoringError) as raised:
+            scoring.call_scoring_service(1)
+        self.assertEqual(raised.exception.kind, "connection")
+
+
+class ReviewDecisionScoringTests(StubScoringMixin, APITestCase):
+    scoring_overrides = {"RETRIES": 1}
+
+    def setUp(self):
+        super().setUp()
+        self.org = Organization.objects.create(name="Org")
+        self.user = User.objects.create_user(username="reviewer", password="pass", org=self.org, role="reviewer")
+        vendor = Vendor.objects.create(org=self.org, name="V")
+        template = Template.objects.create(org=self.org, name="T")
+        self.assessment = Assessment.objects.create(org=self.org, vendor=vendor, template=template)
+        self.review = Review.objects.create(org=self.org, assessment=self.assessment, reviewer=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def approve(self):
+        return self.client.post(f"/api/reviews/{self.review.pk}/decision/", {"decision": "approve"}, format="json")
+
+    @override_settings(REVIEW_SCORING={"MODE": "sync"})
+    def test_approval_stores_score(self):
+        response = self.approve()
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assessment.refresh_from_db()
+        expected = stub_score(self.assessment.pk)
+        self.assertEqual((self.assessment.score, self.assessment.risk_level), (expected["score"], expected["risk_level"]))
+        self.assertEqual(self.stub.requests, [("/score", {"assessment_id": self.assessment.pk})])
+        self.assertEqual(response.data["scoring_status"], Review.SCORING_DONE)
+
+    def test_sync_scoring_failure_blocks_approval(self):
+        self.stub.fail_next = [503, 503]
+        with self.settings(REVIEW_SCORING={"SYNC_ORGS": [self.org.pk]}):
+            response = self.approve()
+        self.assertEqual(response.status_code, 502)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.decision, "pending")
+        self.assertEqual(AuditLog.objects.get(action="scoring_failed").metadata["reason"], "http_503")
+
+    def test_async_approval_does_not_wait_for_scoring(self):
+        self.stub.fail_next = [503, 503]
+        response = self.approve()
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data["scoring_status"], Review.SCORING_PENDING)
+        self.assertEqual(self.stub.requests, [])
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.decision, self.review.scoring_job_id),
+                         ("approved", response.data["scoring_job_id"]))
+
+        status = self.client.get(f"/api/reviews/{self.review.pk}/score/").data
+        self.assertEqual((status["scoring_status"], status["job"]["status"]), (Review.SCORING_PENDING, "pending"))
+
+        # First delivery fails and is retried later; the approval stands
+        self.assertEqual(scoring_outbox.dispatch()["retried"], 1)
+        ScoringJob.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(scoring_outbox.dispatch()["scored"], 1)
+
+        status = self.client.get(f"/api/reviews/{self.review.pk}/score/").data
+        expected = stub_score(self.assessment.pk)
+        self.assertEqual(
+            (status["scoring_status"], status["score"], status["risk_level"]),
+            (Review.SCORING_DONE, expected["score"], expected["risk_level"]),
+        )
+        self.assertEqual(AuditLog.objects.get(action="scoring_completed").metadata["reasons"], ["review_approved"])
+
+    @override_settings(SCORING_OUTBOX={"AUTOSTART": False, "MAX_ATTEMPTS": 1})
+    def test_async_scoring_failure_is_reported(self):
+        self.stub.fail_next = [503, 503]
+        self.approve()
+        self.assertEqual(scoring_outbox.dispatch()["failed"], 1)
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.decision, self.review.scoring_status), ("approved", Review.SCORING_FAILED))
+
+    @override_settings(REVIEW_SCORING={"MAX_WAIT": 0.2, "POLL_INTERVAL": 0.05})
+    def test_score_wait_is_capped(self):
+        self.approve()
+        started = time.monotonic()
+        response = self.client.get(f"/api/reviews/{self.review.pk}/score/?wait=60")
+        self.assertEqual(response.data["scoring_status"], Review.SCORING_PENDING)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(self.client.get(f"/api/reviews/{self.review.pk}/score/?wait=soon").status_code, 400)
+        for value in ("nan", "inf", "-inf"):
+            self.assertEqual(self.client.get(f"/api/reviews/{self.review.pk}/score/?wait={value}").status_code, 400)
+        started = time.monotonic()
+        self.assertEqual(self.client.get(f"/api/reviews/{self.review.pk}/score/?wait=-5").status_code, 200)
+        self.assertLess(time.monotonic() - started, 1)
+
+    @override_settings(REVIEW_SCORING={"MODE": "sync"})
+    def test_scoring_health(self):
+        self.approve()
+        response = self.client.get("/api/reviews/scoring-health/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["circuit"], "closed")
+        self.assertEqual(response.data["succeeded"], 1)
@@ -1,3 +1,7 @@
+import math
+import time
+
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -5,8 +9,11 @@ from rest_framework.permissions import IsAuthenticated
 
 from .models import Review
 from .serializers import ReviewSerializer, ReviewDecisionSerializer
+from . import scoring as review_scoring
+from assessments import scoring as scoring_outbox
 from permissions.rbac import IsAdminOrReviewer
 from audit.services import log_event
+from services import scoring as scoring_service
 
 
 class ReviewViewSet(viewsets.ModelViewSet):
@@ -76,6 +83,9 @@ class ReviewViewSet(viewsets.ModelViewSet):
         # 🔴 NEW LOGIC STARTS HERE
         # ============================
 
+        scoring_status = ""
+        sync_scoring = decision == "approved" and review_scoring.is_sync(review.org_id)
+
         if decision == "approved":
             assessment = review.assessment
 
@@ -86,20 +96,17 @@ class ReviewViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_409_CONFLICT
                 )
 
-            # 2️⃣ Call scoring service (with safe failure)
+        if sync_scoring:
+            # 2️⃣ Call scoring service (with safe failure); orgs in REVIEW_SCORING sync mode only
             try:
-                from services.scoring import call_scoring_service
-                scoring_response = call_scoring_service(
-                    assessment.id,
-                    timeout=5
-                )
-            except Exception:
+                scoring_response = scoring_service.call_scoring_service(assessment.id)
+            except scoring_service.ScoringError as exc:
                 log_event(
-                user=request.user,
-                action="scoring_failed",
-                object_id=assessment.id,
-                metadata={"reason": "exception during scoring"}
-    )
+                    user=request.user,
+                    action="scoring_failed",
+                    object_id=assessment.id,
+                    metadata={"reason": exc.kind, "detail": str(exc)}
+                )
                 return Response(
                     {"detail": "Scoring service failed. Approval not completed."},
                     status=status.HTTP_502_BAD_GATEWAY
@@ -117,14 +124,23 @@ class ReviewViewSet(viewsets.ModelViewSet):
                 object_id=assessment.id,
                 metadata={"score": assessment.score}
             )
+            scoring_status = Review.SCORING_DONE
 
         # ============================
         # 🔴 NEW LOGIC ENDS HERE
         # ============================
 
         previous_decision = review.decision
-        review.decision = decision
-        review.save()
+        with transaction.atomic():
+            review.decision = decision
+            if decision == "approved" and not sync_scoring:
+                # Approval is recorded now; the outbox dispatcher scores it in the background
+                review.scoring_job = scoring_outbox.enqueue(
+                    review.assessment_id, review.assessment.org_id, "review_approved", request.user
+                )
+                scoring_status = Review.SCORING_PENDING
+            review.scoring_status = scoring_status
+            review.save()
 
         # Audit review decision
         log_event(
@@ -134,8 +150,42 @@ class ReviewViewSet(viewsets.ModelViewSet):
             metadata={
                 "assessment_id": review.assessment.id,
                 "previous_decision": previous_decision,
-                "new_decision": decision
+                "new_decision": decision,
+                "scoring_status": scoring_status
             }
         )
 
-        return Response({"status": decision})
+        return Response({
+            "status": decision,
+            "scoring_status": scoring_status,
+            "scoring_job_id": review.scoring_job_id
+        })
+
+    @action(detail=True, methods=['get'])
+    def score(self, request, pk=None):
+        """
+        Scoring state of the review's approval. ?wait=N holds the request up
+        to N seconds (capped at REVIEW_SCORING["MAX_WAIT"]) until scoring is
+        no longer pending.
+        """
+        review = self.get_object()
+        config = review_scoring.get_config()
+        try:
+            wait = float(request.query_params.get("wait", 0))
+        except ValueError:
+            wait = None
+        if wait is None or not math.isfinite(wait):
+            return Response({"detail": "wait must be a number of seconds"}, status=status.HTTP_400_BAD_REQUEST)
+        wait = max(0, min(wait, config["MAX_WAIT"]))
+
+        deadline = time.monotonic() + wait
+        while True:
+            review = Review.objects.select_related("assessment", "scoring_job").get(pk=review.pk)
+            if review.scoring_status != Review.SCORING_PENDING or time.monotonic() >= deadline:
+                return Response(review_scoring.status(review))
+            time.sleep(config["POLL_INTERVAL"])
+
+    @action(detail=False, methods=['get'], url_path='scoring-health')
+    def scoring_health(self, request):
+        """Circuit state, call counts and latency of the scoring client in this process"""
+        return Response(scoring_service.metrics())
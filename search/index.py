@@ -0,0 +1,80 @@
+"""
+Keeping SearchDocument rows in step with responses and evidence.
+
+Single saves and deletes arrive through the signal handlers in signals.py;
+bulk response writes send responses.signals.answers_saved. rebuild()
+re-indexes everything (or one org) from scratch.
+"""
+import os
+
+from django.db import transaction
+
+from evidence.models import Evidence
+from responses.models import Response
+from .models import SearchDocument
+
+BATCH_SIZE = 2000
+
+
+def _upsert(kind, rows):
+    """rows: (object_id, org_id, assessment_id, body); blank bodies drop the document"""
+    keep = [row for row in rows if row[1] and row[3].strip()]
+    drop = [row[0] for row in rows if not (row[1] and row[3].strip())]
+    with transaction.atomic():
+        if drop:
+            SearchDocument.objects.filter(kind=kind, object_id__in=drop).delete()
+        SearchDocument.objects.bulk_create(
+            [
+                SearchDocument(kind=kind, object_id=object_id, org_id=org_id, assessment_id=assessment_id, body=body)
+                for object_id, org_id, assessment_id, body in keep
+            ],
+            update_conflicts=True,
+            unique_fields=["kind", "object_id"],
+            update_fields=["org", "assessment", "body", "updated_at"],
+            batch_size=BATCH_SIZE,
+        )
+
+
+def evidence_body(file_name, file_type, text=""):
+    return " ".join(part for part in (os.path.basename(file_name or ""), file_type or "", text or "") if part)
+
+
+def index_responses(queryset):
+    rows = queryset.values_list("id", "assessment__org_id", "assessment_id", "answer_text")
+    _upsert(SearchDocument.KIND_RESPONSE, list(rows))
+
+
+def index_evidence(queryset):
+    rows = [
+        (pk, org_id, assessment_id, evidence_body(file_name or file, file_type, text))
+        for pk, org_id, assessment_id, file_name, file, file_type, text in queryset.values_list(
+            "id", "assessment__org_id", "assessment_id", "file_name", "file", "file_type", "extracted_text"
+        )
+    ]
+    _upsert(SearchDocument.KIND_EVIDENCE, rows)
+
+
+def remove(kind, object_ids):
+    SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def rebuild(org_ids=None):
+    """Re-index every response and evidence row; returns the number of documents"""
+    documents = SearchDocument.objects.all()
+    responses = Response.objects.order_by("pk")
+    evidence = Evidence.objects.order_by("pk")
+    if org_ids:
+        documents = documents.filter(org_id__in=org_ids)
+        responses = responses.filter(assessment__org_id__in=org_ids)
+        evidence = evidence.filter(assessment__org_id__in=org_ids)
+
+    documents.delete()
+    for queryset, index in ((responses, index_responses), (evidence, index_evidence)):
+        last_id = 0
+        while True:
+            ids = list(queryset.filter(pk__gt=last_id).values_list("pk", flat=True)[:BATCH_SIZE])
+            if not ids:
+                break
+            last_id = ids[-1]
+            index(queryset.model.objects.filter(pk__in=ids))
+    return documents.count()
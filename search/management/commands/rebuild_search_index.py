@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from search import index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from responses and evidence (all orgs, or --org)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--org", type=int, action="append", help="Only rebuild this org (repeatable)")
+
+    def handle(self, *args, **options):
+        documents = index.rebuild(options["org"])
+        self.stdout.write(self.style.SUCCESS(f"✅ Indexed {documents} documents"))
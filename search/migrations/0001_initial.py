@@ -0,0 +1,79 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    # Standalone FTS5 table; rowid = SearchDocument.id, org holds "o<org_id>" so
+    # the org filter is part of the MATCH instead of a post-filter
+    "CREATE VIRTUAL TABLE search_fts USING fts5(body, org, tokenize='porter unicode61')",
+    """CREATE TRIGGER search_document_ai AFTER INSERT ON search_searchdocument BEGIN
+        INSERT INTO search_fts(rowid, body, org) VALUES (new.id, new.body, 'o' || new.org_id);
+    END""",
+    """CREATE TRIGGER search_document_au AFTER UPDATE ON search_searchdocument BEGIN
+        UPDATE search_fts SET body = new.body, org = 'o' || new.org_id WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER search_document_ad AFTER DELETE ON search_searchdocument BEGIN
+        DELETE FROM search_fts WHERE rowid = old.id;
+    END""",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS search_document_ad",
+    "DROP TRIGGER IF EXISTS search_document_au",
+    "DROP TRIGGER IF EXISTS search_document_ai",
+    "DROP TABLE IF EXISTS search_fts",
+]
+
+POSTGRES_FORWARD = [
+    """ALTER TABLE search_searchdocument ADD COLUMN body_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', body)) STORED""",
+    "CREATE INDEX search_document_tsv_idx ON search_searchdocument USING GIN (body_tsv)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS search_document_tsv_idx",
+    "ALTER TABLE search_searchdocument DROP COLUMN IF EXISTS body_tsv",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD})
+
+
+def drop_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('assessments', '0008_assessment_progress_counters'),
+        ('orgs', '0003_remove_organization_is_active_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('response', 'Response'), ('evidence', 'Evidence')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('body', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assessment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='assessments.assessment')),
+                ('org', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='orgs.organization')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_document_kind_object_uniq')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,34 @@
+from django.db import models
+from assessments.models import Assessment
+from orgs.models import Organization
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text for one response answer or evidence file, denormalized
+    with its org and assessment. The full-text index over ``body`` lives
+    outside the ORM: an FTS5 table kept in sync by triggers on SQLite, a
+    generated tsvector column on Postgres (see migrations/0001_initial.py).
+    """
+    KIND_RESPONSE = "response"
+    KIND_EVIDENCE = "evidence"
+
+    KINDS = [
+        (KIND_RESPONSE, "Response"),
+        (KIND_EVIDENCE, "Evidence"),
+    ]
+
+    org = models.ForeignKey(Organization, on_delete=models.CASCADE)
+    assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    object_id = models.BigIntegerField()
+    body = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="search_document_kind_object_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
@@ -0,0 +1,125 @@
+"""
+Ranked full-text queries over SearchDocument, scoped to one org.
+
+SQLite uses the FTS5 table (bm25 ranking, snippet()); Postgres uses the
+generated body_tsv column (websearch_to_tsquery, ts_rank, ts_headline).
+Other backends fall back to a substring scan, which is correct but slow.
+"""
+import re
+
+from django.db import connection
+
+from responses.models import Response
+from .models import SearchDocument
+
+SNIPPET_START = "["
+SNIPPET_END = "]"
+SNIPPET_WORDS = 12
+
+TOKEN_RE = re.compile(r"(\w+)(\*?)", re.UNICODE)
+
+
+def fts5_query(text, org_id):
+    """
+    Build a MATCH expression from free text: every word must appear (in
+    any order), "word*" is a prefix match, and the org column must match.
+    Returns None when the text has no searchable words.
+    """
+    terms = [f'"{word}"{" *" if star else ""}' for word, star in TOKEN_RE.findall(text)]
+    if not terms:
+        return None
+    return f"body : ({' '.join(terms)}) AND org : o{int(org_id)}"
+
+
+def _search_sqlite(org_id, text, kind, limit, offset):
+    match = fts5_query(text, org_id)
+    if match is None:
+        return []
+    sql = f"""
+        SELECT search_fts.rowid, bm25(search_fts) AS rank,
+               snippet(search_fts, 0, %s, %s, '…', {SNIPPET_WORDS})
+        FROM search_fts
+        {"JOIN search_searchdocument d ON d.id = search_fts.rowid" if kind else ""}
+        WHERE search_fts MATCH %s {"AND d.kind = %s" if kind else ""}
+        ORDER BY rank
+        LIMIT %s OFFSET %s
+    """
+    params = [SNIPPET_START, SNIPPET_END, match] + ([kind] if kind else []) + [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        # bm25 is lower-is-better; flip it so every backend ranks high-is-better
+        return [(pk, -rank, snippet) for pk, rank, snippet in cursor.fetchall()]
+
+
+def _search_postgres(org_id, text, kind, limit, offset):
+    # Rank and LIMIT first so ts_headline only runs on the returned page
+    sql = f"""
+        SELECT hit.id, hit.rank,
+               ts_headline('english', hit.body, hit.q,
+                           'StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, MaxFragments=1, MaxWords={SNIPPET_WORDS * 2}')
+        FROM (
+            SELECT d.id, d.body, q, ts_rank(d.body_tsv, q) AS rank
+            FROM search_searchdocument d, websearch_to_tsquery('english', %s) q
+            WHERE d.org_id = %s AND d.body_tsv @@ q {"AND d.kind = %s" if kind else ""}
+            ORDER BY rank DESC
+            LIMIT %s OFFSET %s
+        ) hit
+        ORDER BY hit.rank DESC
+    """
+    params = [text, org_id] + ([kind] if kind else []) + [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _search_scan(org_id, text, kind, limit, offset):
+    qs = SearchDocument.objects.filter(org_id=org_id, body__icontains=text)
+    if kind:
+        qs = qs.filter(kind=kind)
+    return [(pk, 0.0, body[:200]) for pk, body in qs.order_by("-updated_at").values_list("pk", "body")[offset:offset + limit]]
+
+
+BACKENDS = {
+    "sqlite": _search_sqlite,
+    "postgresql": _search_postgres,
+}
+
+
+def search(org_id, text, kind=None, limit=20, offset=0):
+    """
+    Best matches for ``text`` in one org, highest rank first. Each hit is a
+    dict with the document kind / object_id, its assessment and vendor, the
+    response question_id when kind is "response", a snippet and the rank.
+    """
+    backend = BACKENDS.get(connection.vendor, _search_scan)
+    hits = backend(org_id, text, kind, limit, offset)
+    if not hits:
+        return []
+
+    documents = {
+        row["pk"]: row
+        for row in SearchDocument.objects.filter(pk__in=[pk for pk, _, _ in hits]).values(
+            "pk", "kind", "object_id", "assessment_id", "assessment__status",
+            "assessment__vendor_id", "assessment__vendor__name",
+        )
+    }
+    response_ids = [row["object_id"] for row in documents.values() if row["kind"] == SearchDocument.KIND_RESPONSE]
+    questions = dict(Response.objects.filter(pk__in=response_ids).values_list("pk", "question_id"))
+
+    results = []
+    for pk, rank, snippet in hits:
+        row = documents.get(pk)
+        if row is None:
+            continue
+        results.append({
+            "kind": row["kind"],
+            "object_id": row["object_id"],
+            "question_id": questions.get(row["object_id"]) if row["kind"] == SearchDocument.KIND_RESPONSE else None,
+            "assessment_id": row["assessment_id"],
+            "assessment_status": row["assessment__status"],
+            "vendor_id": row["assessment__vendor_id"],
+            "vendor_name": row["assessment__vendor__name"],
+            "snippet": snippet,
+            "rank": rank,
+        })
+    return results
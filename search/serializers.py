@@ -0,0 +1,22 @@
+from rest_framework import serializers
+
+from .models import SearchDocument
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=200)
+    kind = serializers.ChoiceField(choices=SearchDocument.KINDS, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    offset = serializers.IntegerField(min_value=0, max_value=1000, default=0)
+
+
+class SearchHitSerializer(serializers.Serializer):
+    kind = serializers.CharField()
+    object_id = serializers.IntegerField()
+    question_id = serializers.CharField(allow_null=True)
+    assessment_id = serializers.IntegerField()
+    assessment_status = serializers.CharField()
+    vendor_id = serializers.IntegerField()
+    vendor_name = serializers.CharField()
+    snippet = serializers.CharField()
+    rank = serializers.FloatField()
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+
+from evidence.models import Evidence
+from evidence.signals import evidence_processed
+from responses.models import Response
+from responses.signals import answers_saved
+from . import index
+from .models import SearchDocument
+
+
+def response_saved(sender, instance, **kwargs):
+    index.index_responses(Response.objects.filter(pk=instance.pk))
+
+
+def response_deleted(sender, instance, **kwargs):
+    index.remove(SearchDocument.KIND_RESPONSE, [instance.pk])
+
+
+def responses_bulk_saved(sender, assessment_id, question_ids, **kwargs):
+    index.index_responses(Response.objects.filter(assessment_id=assessment_id, question_id__in=question_ids))
+
+
+def evidence_saved(sender, instance, **kwargs):
+    index.index_evidence(Evidence.objects.filter(pk=instance.pk))
+
+
+def evidence_bulk_processed(sender, evidence_ids, **kwargs):
+    index.index_evidence(Evidence.objects.filter(pk__in=evidence_ids))
+
+
+def evidence_deleted(sender, instance, **kwargs):
+    index.remove(SearchDocument.KIND_EVIDENCE, [instance.pk])
+
+
+def connect():
+    post_save.connect(response_saved, sender=Response, dispatch_uid="search-response-save")
+    post_delete.connect(response_deleted, sender=Response, dispatch_uid="search-response-delete")
+    answers_saved.connect(responses_bulk_saved, sender=Response, dispatch_uid="search-responses-bulk")
+    post_save.connect(evidence_saved, sender=Evidence, dispatch_uid="search-evidence-save")
+    post_delete.connect(evidence_deleted, sender=Evidence, dispatch_uid="search-evidence-delete")
+    evidence_processed.connect(evidence_bulk_processed, sender=Evidence, dispatch_uid="search-evidence-processed")
@@ -0,0 +1,91 @@
+import uuid
+
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from assessments.models import Assessment
+from evidence.models import Evidence
+from orgs.models import Organization
+from responses.models import Response
+from templates.models import Template
+from vendors.models import Vendor
+from .models import SearchDocument
+from .query import fts5_query
+
+User = get_user_model()
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name='Org')
+        self.user = User.objects.create_user(username='rev', password='pass', org=self.org, role='reviewer')
+        self.assessment = self.make_assessment(self.org, 'Acme')
+        self.client.force_authenticate(user=self.user)
+
+    def make_assessment(self, org, vendor_name):
+        return Assessment.objects.create(
+            org=org,
+            vendor=Vendor.objects.create(org=org, name=vendor_name),
+            template=Template.objects.create(org=org, name='T'),
+        )
+
+    def answer(self, assessment, text):
+        return Response.objects.create(assessment=assessment, question_id=uuid.uuid4(), answer_text=text)
+
+    def search(self, q, **params):
+        return self.client.get('/api/search/', {'q': q, **params})
+
+    def test_ranked_hits_with_context_and_snippet(self):
+        self.answer(self.assessment, 'We hold a SOC2 Type II report, renewed yearly.')
+        self.answer(self.assessment, 'No certifications.')
+        response = self.search('soc2 report')
+
+        self.assertEqual(response.status_code, 200)
+        [hit] = response.data['results']
+        self.assertEqual(hit['vendor_name'], 'Acme')
+        self.assertEqual(hit['assessment_id'], self.assessment.pk)
+        self.assertIn('[SOC2]', hit['snippet'])
+
+    def test_other_orgs_are_invisible(self):
+        other = self.make_assessment(Organization.objects.create(name='Other'), 'Globex')
+        self.answer(other, 'SOC2 attestation')
+        self.assertEqual(self.search('soc2').data['results'], [])
+
+    def test_index_follows_edits_bulk_saves_and_deletes(self):
+        row = self.answer(self.assessment, 'ISO 27001')
+        row.answer_text = 'SOC2 only'
+        row.save()
+        self.assertEqual(len(self.search('iso').data['results']), 0)
+        self.assertEqual(len(self.search('soc*').data['results']), 1)
+
+        self.client.post('/api/responses/responses/autosave/', {
+            'assessment': self.assessment.pk,
+            'answers': [{'question_id': str(uuid.uuid4()), 'answer_text': 'pentest by an external firm'}],
+        }, format='json')
+        self.assertEqual(len(self.search('pentest').data['results']), 1)
+
+        row.delete()
+        self.assertEqual(len(self.search('soc2').data['results']), 0)
+
+    def test_evidence_metadata_is_searchable(self):
+        Evidence.objects.create(
+            assessment=self.assessment, question_id=1, file='evidence/pentest-summary.pdf', file_type='pdf'
+        )
+        [hit] = self.search('pentest', kind='evidence').data['results']
+        self.assertEqual(hit['kind'], 'evidence')
+
+    def test_rebuild(self):
+        self.answer(self.assessment, 'SOC2')
+        SearchDocument.objects.all().delete()
+        call_command('rebuild_search_index', stdout=open('/dev/null', 'w'))
+        self.assertEqual(len(self.search('soc2').data['results']), 1)
+
+    def test_query_building(self):
+        self.assertEqual(fts5_query('SOC2 "type" ii*', 7), 'body : ("SOC2" "type" "ii" *) AND org : o7')
+        self.assertIsNone(fts5_query('"" **', 7))
+
+    def test_vendors_cannot_search(self):
+        vendor = User.objects.create_user(username='v', password='pass', org=self.org, role='vendor')
+        self.client.force_authenticate(user=vendor)
+        self.assertEqual(self.search('soc2').status_code, 403)
@@ -0,0 +1,30 @@
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from permissions.rbac import IsAdminOrReviewer
+from .query import search
+from .serializers import SearchHitSerializer, SearchQuerySerializer
+
+
+class SearchView(APIView):
+    """
+    Full-text search over response answers and evidence metadata in the
+    caller's org. ``q`` matches documents containing every word ("soc*" is a
+    prefix match); hits are ranked and carry assessment/vendor context and
+    a snippet with matches wrapped in [brackets].
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrReviewer]
+
+    def get(self, request):
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+
+        hits = search(request.user.org_id, data["q"], data.get("kind"), data["limit"], data["offset"])
+        next_offset = data["offset"] + data["limit"] if len(hits) == data["limit"] else None
+        return Response({
+            "query": data["q"],
+            "next_offset": next_offset,
+            "results": SearchHitSerializer(hits, many=True).data,
+        })
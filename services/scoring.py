@@ -1,16 +1,307 @@
+"""
+Scoring service client.
+
+Every call goes through one keep-alive requests.Session per process, whose
+connection pool (POOL_SIZE) is shared by all request threads, so a decision
+no longer pays for a TCP (and TLS) handshake. Connection errors, timeouts,
+429 and 5xx responses are retried up to RETRIES times with full-jitter
+exponential backoff; other 4xx responses fail at once.
+
+A circuit breaker counts consecutive failed attempts. After
+BREAKER_THRESHOLD of them it opens and calls fail fast with
+ScoringUnavailable for BREAKER_RESET seconds; then a single trial call is
+let through and closes the circuit again if it succeeds.
+
+score_batch() scores many assessments with one POST /score/batch.
+
+metrics() reports calls, retries, errors by kind, breaker state and
+attempt latency percentiles for this process. services/scoring_stub.py is a
+local stand-in for the service, used by the tests.
+"""
+import logging
+import random
+import threading
 import time
+from collections import Counter, deque
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "URL": "http://scoring-service:8001",
+    "CONNECT_TIMEOUT": 1.0,  # seconds
+    "TIMEOUT": 5.0,  # seconds to wait for a response
+    "RETRIES": 2,  # extra attempts after the first
+    "BACKOFF": 0.2,  # seconds, doubled per retry
+    "BACKOFF_MAX": 2.0,
+    "POOL_SIZE": 10,
+    "BREAKER_THRESHOLD": 5,
+    "BREAKER_RESET": 30,  # seconds
+    "BATCH_SIZE": 200,  # assessments per POST /score/batch
+    "BATCH_CONCURRENCY": 4,  # batches in flight
+    "BATCH_TIMEOUT": 30.0,  # seconds to wait for a batch response
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def get_config():
+    config = dict(DEFAULTS)
+    config.update(getattr(settings, "SCORING_SERVICE", {}))
+    return config
+
+
+class ScoringError(Exception):
+    """The scoring service could not produce a score"""
+
+    def __init__(self, message, kind="error", retryable=True):
+        super().__init__(message)
+        self.kind = kind
+        self.retryable = retryable
+
+
+class ScoringUnavailable(ScoringError):
+    """The circuit is open: the service failed recently and is not being called"""
+
+    def __init__(self, message="Scoring service unavailable (circuit open)"):
+        super().__init__(message, kind="circuit_open")
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold, reset_after, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return self.CLOSED
+            if self.clock() - self.opened_at < self.reset_after:
+                return self.OPEN
+            return self.HALF_OPEN
+
+    def allow(self):
+        """True if a call may go out; in half-open state only one at a time"""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at < self.reset_after or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            # A failed trial re-opens at once
+            if self.trial_running or (self.opened_at is None and self.failures >= self.threshold):
+                logger.warning("Scoring circuit opened after %s failures", self.failures)
+                self.opened_at = self.clock()
+            self.trial_running = False
+
+
+class Metrics:
+    """Thread-safe counters plus a window of recent attempt latencies"""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.errors = Counter()
+        self.latencies = deque(maxlen=window)
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counts[name] += amount
+
+    def error(self, kind):
+        with self.lock:
+            self.errors[kind] += 1
+
+    def observe(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            data = {key: self.counts[key] for key in ("calls", "succeeded", "failed", "attempts", "retries", "rejected")}
+            data["errors"] = dict(self.errors)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        data["latency_ms"] = {
+            "count": len(latencies),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": round(latencies[-1] * 1000, 1) if latencies else None,
+        }
+        return data
+
+
+class ScoringClient:
+    def __init__(self, config=None):
+        self.config = config or get_config()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.config["POOL_SIZE"], pool_block=False, max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breaker = CircuitBreaker(self.config["BREAKER_THRESHOLD"], self.config["BREAKER_RESET"])
+        self.metrics = Metrics()
+
+    def backoff(self, attempt):
+        """Full jitter: uniform in [0, min(BACKOFF_MAX, BACKOFF * 2**attempt)]"""
+        return random.uniform(0, min(self.config["BACKOFF_MAX"], self.config["BACKOFF"] * 2 ** attempt))
+
+    def _attempt(self, path, payload, timeout):
+        started = time.monotonic()
+        try:
+            response = self.session.post(
+                self.config["URL"].rstrip("/") + path,
+                json=payload,
+                timeout=(self.config["CONNECT_TIMEOUT"], timeout),
+            )
+        except requests.Timeout as exc:
+            raise ScoringError(f"Scoring service timed out: {exc}", kind="timeout")
+        except requests.ConnectionError as exc:
+            raise ScoringError(f"Cannot reach scoring service: {exc}", kind="connection")
+        except requests.RequestException as exc:
+            # Broken bodies, redirect loops, bad URLs...: still a failed attempt for the breaker
+            raise ScoringError(f"Scoring request failed: {exc}", kind="request")
+        finally:
+            self.metrics.observe(time.monotonic() - started)
+
+        if response.status_code in RETRY_STATUSES:
+            raise ScoringError(f"Scoring service returned {response.status_code}", kind=f"http_{response.status_code}")
+        if response.status_code >= 400:
+            # The request itself is wrong; retrying will not help and the service is up
+            raise ScoringError(f"Scoring service rejected the request ({response.status_code})",
+                               kind=f"http_{response.status_code}", retryable=False)
+        try:
+            return response.json()
+        except ValueError:
+            raise ScoringError("Scoring service returned invalid JSON", kind="bad_response", retryable=False)
+
+    def post(self, path, payload, timeout=None):
+        """POST JSON to the service with retries and the circuit breaker; returns the decoded body"""
+        timeout = timeout or self.config["TIMEOUT"]
+        self.metrics.incr("calls")
+        attempts = self.config["RETRIES"] + 1
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self.metrics.incr("rejected")
+                self.metrics.incr("failed")
+                self.metrics.error("circuit_open")
+                raise ScoringUnavailable()
+            if attempt:
+                self.metrics.incr("retries")
+            self.metrics.incr("attempts")
+            recorded = False
+            try:
+                body = self._attempt(path, payload, timeout)
+            except ScoringError as exc:
+                self.metrics.error(exc.kind)
+                recorded = True
+                if not exc.retryable:
+                    self.breaker.record_success()
+                    self.metrics.incr("failed")
+                    raise
+                self.breaker.record_failure()
+                if attempt + 1 >= attempts:
+                    self.metrics.incr("failed")
+                    raise
+                logger.info("Scoring attempt %s failed (%s), retrying", attempt + 1, exc.kind)
+                time.sleep(self.backoff(attempt))
+                continue
+            else:
+                recorded = True
+                self.breaker.record_success()
+                self.metrics.incr("succeeded")
+                return body
+            finally:
+                if not recorded:
+                    # Anything unexpected still ends the attempt, including a half-open trial
+                    self.breaker.record_failure()
+                    self.metrics.incr("failed")
+
+    def score(self, assessment_id, timeout=None):
+        """{"score": float, "risk_level": str} for one assessment"""
+        body = self.post("/score", {"assessment_id": assessment_id}, timeout=timeout)
+        if not isinstance(body, dict) or "score" not in body:
+            raise ScoringError("Scoring response has no score", kind="bad_response", retryable=False)
+        return {"score": body.get("score"), "risk_level": body.get("risk_level")}
+
+    def score_batch(self, assessment_ids, timeout=None):
+        """
+        {assessment_id: {"score", "risk_level"}} for many assessments in one
+        call; ids the service could not score are left out.
+        """
+        body = self.post(
+            "/score/batch", {"assessment_ids": list(assessment_ids)}, timeout=timeout or self.config["BATCH_TIMEOUT"]
+        )
+        results = body.get("results") if isinstance(body, dict) else None
+        if not isinstance(results, list):
+            raise ScoringError("Batch scoring response has no results", kind="bad_response", retryable=False)
+        return {
+            item["assessment_id"]: {"score": item.get("score"), "risk_level": item.get("risk_level")}
+            for item in results
+            if isinstance(item, dict) and item.get("assessment_id") is not None and "score" in item
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide client; rebuilt if SCORING_SERVICE changes (tests)"""
+    global _client
+    config = get_config()
+    with _client_lock:
+        if _client is None or _client.config != config:
+            if _client is not None:
+                _client.close()
+            _client = ScoringClient(config)
+        return _client
+
+
+def call_scoring_service(assessment_id, timeout=None):
+    """Score one assessment; raises ScoringError (ScoringUnavailable when the circuit is open)"""
+    return get_client().score(assessment_id, timeout=timeout)
+
 
-def call_scoring_service(assessment_id, timeout=5):
-    """
-    Dummy scoring service call.
-    Replace this later with real HTTP call.
-    """
+def score_batch(assessment_ids, timeout=None):
+    """Score many assessments in one call; raises ScoringError for the whole batch"""
+    return get_client().score_batch(assessment_ids, timeout=timeout)
 
-    # simulate delay
-    time.sleep(1)
 
-    # fake scoring response
-    return {
-        "score": 75.0,
-        "risk_level": "MEDIUM"
-    }
+def metrics():
+    client = get_client()
+    return {"url": client.config["URL"], "circuit": client.breaker.state, **client.metrics.snapshot()}
@@ -0,0 +1,155 @@
+"""
+Local stand-in for the scoring service.
+
+    python -m services.scoring_stub [--port 8001]
+
+POST /score {"assessment_id": N} answers {"assessment_id", "score",
+"risk_level"}; the score is derived from the id, so it is stable across
+calls. POST /score/batch {"assessment_ids": [...]} answers {"results":
+[...]} with one such object per id; ids in ``unknown`` are reported under
+"errors" instead. Tests start it on a free port with StubScoringServer and
+script failures (fail_next, delay, unknown), then check what it saw
+(requests, connections); StubScoringMixin does this for a TestCase.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def stub_score(assessment_id):
+    score = float((int(assessment_id) * 37) % 101)
+    if score >= 70:
+        risk_level = "LOW"
+    elif score >= 40:
+        risk_level = "MEDIUM"
+    else:
+        risk_level = "HIGH"
+    return {"assessment_id": assessment_id, "score": score, "risk_level": risk_level}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"detail": "invalid JSON"})
+
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, payload))
+            status = server.fail_next.pop(0) if server.fail_next else None
+        if server.delay:
+            time.sleep(server.delay)
+        if status:
+            return self._send(status, {"detail": "stub failure"})
+
+        if self.path.rstrip("/") == "/score":
+            if "assessment_id" not in payload:
+                return self._send(400, {"detail": "assessment_id is required"})
+            return self._send(200, stub_score(payload["assessment_id"]))
+        if self.path.rstrip("/") == "/score/batch":
+            ids = payload.get("assessment_ids")
+            if not isinstance(ids, list):
+                return self._send(400, {"detail": "assessment_ids must be a list"})
+            return self._send(200, {
+                "results": [stub_score(aid) for aid in ids if aid not in server.unknown],
+                "errors": [{"assessment_id": aid, "detail": "unknown assessment"} for aid in ids if aid in server.unknown],
+            })
+        return self._send(404, {"detail": "not found"})
+
+
+class StubScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.connections = 0
+        self.fail_next = []  # HTTP statuses to answer the next requests with
+        self.delay = 0  # seconds before every answer
+        self.unknown = set()  # assessment ids batch scoring reports as errors
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name="scoring-stub", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+            self.connections = 0
+            self.fail_next.clear()
+            self.delay = 0
+            self.unknown.clear()
+
+
+class StubScoringMixin:
+    """TestCase mixin: runs a stub for the class and points SCORING_SERVICE at it"""
+    scoring_overrides = {}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stub = StubScoringServer().start()
+        cls.addClassCleanup(cls.stub.stop)
+
+    def setUp(self):
+        from django.test import override_settings
+
+        from services import scoring
+
+        super().setUp()
+        self.stub.reset()
+        overrides = override_settings(SCORING_SERVICE={
+            "URL": self.stub.url, "BACKOFF": 0, "BACKOFF_MAX": 0, **self.scoring_overrides,
+        })
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Fresh breaker and metrics for every test
+        scoring._client = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub of the scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    server = StubScoringServer(args.host, args.port)
+    print(f"Stub scoring service on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,13 @@ class Template(models.Model):
     def __str__(self):
         return self.name
 
+    def question_count(self):
+        """Number of questions in the active version(s)"""
+        return TemplateQuestion.objects.filter(
+            section__template_version__template=self,
+            section__template_version__is_active=True,
+        ).count()
+
 
 # Version of Template
 class TemplateVersion(models.Model):